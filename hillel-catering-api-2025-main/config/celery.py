@@ -8,4 +8,10 @@ app = Celery('your_project_name')
 
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# the signals of the logging, the task metrics, the query budgets and the slow queries
+import shared.log  # noqa: E402, F401
+import shared.metrics  # noqa: E402, F401
+import shared.queries  # noqa: E402, F401
+import shared.slow_queries  # noqa: E402, F401
\ No newline at end of file
@@ -2,6 +2,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from shared.log import levels
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,6 +42,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "shared.queries.QueryBudgetMiddleware",
+    "shared.slow_queries.SlowQueryMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -175,6 +179,82 @@ CACHES = {
     }
 }
 
+# shared.log, written by a background thread, JSON lines with the order id
+LOGGING_CONFIG = "shared.log.configure"
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "shared.log.JsonFormatter"},
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s [order %(order_id)s] %(message)s"},
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": os.getenv("LOG_FORMAT", default="json"),
+        },
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "django": {"level": "WARNING"},
+        # food, users and shared, "food.polling=DEBUG,shared.queries=WARNING" per module
+        **levels(os.getenv("LOG_LEVEL", default="INFO"), os.getenv("LOG_LEVELS", default="")),
+    },
+}
+
+# shared.cache.CacheService, one connection pool per process
+CACHE_SERVICE_URL = os.getenv("CACHE_SERVICE_URL", default="redis://localhost:6379/0")
+
+# shared.metrics, `GET /metrics` requires `Authorization: Bearer <token>` if set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# shared.queries, SQL queries per request and Celery task against the budgets
+QUERY_BUDGET = {
+    # the share of requests and tasks counted
+    "SAMPLE_RATE": float(os.getenv("QUERY_BUDGET_SAMPLE_RATE", default=0.01)),
+    # raise on an exceeded budget instead of printing it (the tests)
+    "STRICT": os.getenv("QUERY_BUDGET_STRICT", default="") == "1",
+    # a query shape run this many times is an N+1
+    "REPEATED": int(os.getenv("QUERY_BUDGET_REPEATED", default=3)),
+}
+
+# shared.slow_queries, the slow queries with their plans on /admin/slow-queries/
+SLOW_QUERIES = {
+    "ENABLED": os.getenv("SLOW_QUERIES_ENABLED", default="") == "1",
+    "THRESHOLD_MS": float(os.getenv("SLOW_QUERIES_THRESHOLD_MS", default=200)),
+    # EXPLAIN ANALYZE runs the query again
+    "EXPLAIN_RATE": float(os.getenv("SLOW_QUERIES_EXPLAIN_RATE", default=0.1)),
+    "EXPLAIN_INTERVAL_SECONDS": 600,
+    "MAX_ENTRIES": 500,
+}
+
+# food.webhooks, provider webhooks deduped into Redis streams, applied by `consume_webhooks`
+WEBHOOKS = {
+    # a retry of an event within this time is dropped
+    "DEDUPE_TTL_SECONDS": int(os.getenv("WEBHOOKS_DEDUPE_TTL", default=60 * 60 * 24)),
+    "BATCH_SIZE": int(os.getenv("WEBHOOKS_BATCH_SIZE", default=500)),
+    # a failed event, or an event of a dead consumer, is taken over after this time
+    "CLAIM_IDLE_SECONDS": 60,
+    # then it goes to webhooks:<provider>:dead
+    "MAX_ATTEMPTS": 5,
+    "DEAD_MAX_LENGTH": 10_000,
+}
+
+# food.tracking.LocationHistory, capped stream per order
+COURIER_LOCATION_HISTORY = {
+    "MAX_POINTS": int(os.getenv("COURIER_LOCATION_MAX_POINTS", default=1000)),
+    "MIN_INTERVAL_SECONDS": float(os.getenv("COURIER_LOCATION_MIN_INTERVAL", default=0)),
+    "TTL_SECONDS": 60 * 60 * 24,
+}
+
+# food.importers, bigger uploads are imported by a background job
+DISH_IMPORT = {
+    "SYNC_MAX_BYTES": int(os.getenv("DISH_IMPORT_SYNC_MAX_BYTES", default=1024 * 1024)),
+    # shared with the Celery workers
+    "DIR": os.getenv("DISH_IMPORT_DIR", default="/tmp/dish_imports"),
+}
+
 CELERY_BROKER_URL = 'amqp://localhost' 
 CELERY_RESULT_BACKEND = 'django-db' 
 CELERY_ACCEPT_CONTENT = ['json']
@@ -4,28 +4,37 @@ from django.conf import settings
 from rest_framework_simplejwt.views import TokenObtainPairView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
-from food.views import import_dishes, kfc_webhook
+from food.views import import_dishes, import_dishes_progress, kfc_webhook, uber_webhook
 from food.views import router as food_router
-from food.views import UberWebhookView, CourierLocationView
+from food.views import OrderEventsView
+from shared.metrics import metrics_view
+from shared.slow_queries import slow_queries_view
 from users.views import router as users_router
 
 urlpatterns = [
     path("admin/food/dish/import-dishes/", import_dishes, name="import_dishes"),
+    path(
+        "admin/food/dish/import-dishes/<str:job_id>/",
+        import_dishes_progress,
+        name="import_dishes_progress",
+    ),
+    path("admin/slow-queries/", slow_queries_view, name="slow_queries"),
     path("admin/", admin.site.urls),
 
     path("auth/token/", TokenObtainPairView.as_view(), name="obtain_token"),
 
     path("users/", include(users_router.urls)),
+    path("food/orders/<int:id>/events", OrderEventsView.as_view()),
     path("food/", include(food_router.urls)),
 
     path(
         "webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/",
         kfc_webhook,
     ),
-    path("api/uber/webhook/", UberWebhookView.as_view()),
-    path("api/courier/location/", CourierLocationView.as_view()),
+    path("api/uber/webhook/", uber_webhook),
 
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("metrics", metrics_view),
 ]
 
 if settings.DEBUG:
@@ -1,24 +1,107 @@
 from django.contrib import admin
-from import_export.admin import ImportExportModelAdmin  
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from import_export.admin import ImportExportModelAdmin
 from .models import Dish, Order, OrderItem, Restaurant
+from .pagination import EXACT_COUNT_THRESHOLD, estimated_count
 
-admin.site.register(Restaurant)
-admin.site.register(OrderItem)
+
+class EstimatedCountPaginator(Paginator):
+    """The planner estimate instead of COUNT(*) on a large table.
+
+    The last pages may be empty or missing, the support team looks at the
+    first ones anyway.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+
+        return estimate
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # "5 results (5000000 total)" is another COUNT(*) of the whole table
+    show_full_result_count = False
+
+
+class PriceFilter(admin.SimpleListFilter):
+    """Fixed ranges, no query to build the filter (unlike the distinct names)."""
+
+    title = "price"
+    parameter_name = "price"
+    RANGES = {
+        "0-100": (0, 100),
+        "100-300": (100, 300),
+        "300-1000": (300, 1000),
+        "1000+": (1000, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, key) for key in self.RANGES]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.RANGES:
+            return queryset
+
+        low, high = self.RANGES[self.value()]
+        queryset = queryset.filter(price__gte=low)
+
+        return queryset if high is None else queryset.filter(price__lt=high)
+
+
+@admin.register(Restaurant)
+class RestaurantAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
 
 
 @admin.register(Dish)
-class DishAdmin(admin.ModelAdmin):
+class DishAdmin(LargeTableAdmin):
     list_display = ("name", "price", "restaurant")
+    list_select_related = ("restaurant",)
     search_fields = ("name",)
-    list_filter = ("name", "restaurant")
+    list_filter = (PriceFilter, "restaurant")
+    autocomplete_fields = ("restaurant",)
     # actions = ("import_csv",)
 
+    def changelist_view(self, request, extra_context=None):
+        # the id of a background import (food.views.import_dishes), not a list filter
+        import_job = request.GET.get("import_job")
+        if import_job:
+            request.GET = request.GET.copy()
+            del request.GET["import_job"]
+
+        return super().changelist_view(
+            request, extra_context={**(extra_context or {}), "import_job": import_job}
+        )
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ("__str__", "order", "dish", "quantity")
+    list_select_related = ("order__user", "dish")
+    autocomplete_fields = ("order", "dish")
+
 
 class DishOrderItemInline(admin.TabularInline):
     model = OrderItem
+    # a select box of every dish per row otherwise
+    autocomplete_fields = ("dish",)
+
+    def get_queryset(self, request):
+        # the row title is `OrderItem.__str__`
+        return super().get_queryset(request).select_related("dish")
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ("__str__", "id", "status")
+class OrderAdmin(LargeTableAdmin):
+    list_display = ("__str__", "id", "status", "eta", "delivery_provider")
+    list_select_related = ("user",)
+    list_filter = ("status",)
+    search_fields = ("=id",)
+    ordering = ("-id",)
+    autocomplete_fields = ("user",)
     inlines = (DishOrderItemInline,)
@@ -0,0 +1,204 @@
+"""
+Streaming dish import from a supplier CSV.
+
+    name,price,restaurant
+    Pizza,1200,silpo
+    Sushi,2500,pizza day
+
+Rows are read one by one, restaurants are resolved once into a lookup
+map and dishes are inserted with chunked `bulk_create`, so the import
+takes a few queries per chunk instead of two per row:
+
+    importer = DishImporter()
+    importer.run(open("dishes.csv", "rb")) -> ImportResult(created=4, skipped=0)
+
+Files bigger than DISH_IMPORT["SYNC_MAX_BYTES"] are imported by the
+`food.tasks.import_dishes_file` job, its progress is kept in the cache:
+
+    dish_imports:<job_id> = {"status": "running", "processed": 20000, "progress": 0.2, ...}
+"""
+
+import csv
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.db import transaction
+
+from shared.cache import CacheService
+
+from . import menu
+from .models import Dish, Restaurant
+
+CHUNK_SIZE = 2000
+PROGRESS_NAMESPACE = "dish_imports"
+PROGRESS_TTL = 60 * 60 * 24
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.skipped
+
+
+class RestaurantLookup:
+    """Restaurant id by the name from the CSV, with the former `icontains` matching.
+
+    All restaurants are read with one query, every distinct CSV name
+    is matched once and remembered.
+    """
+
+    def __init__(self):
+        self.names: dict[str, int] = {
+            name.lower(): pk for pk, name in Restaurant.objects.values_list("pk", "name")
+        }
+        self._resolved: dict[str, int | None] = {}
+
+    def get(self, name: str) -> int | None:
+        name = name.strip().lower()
+        if name not in self._resolved:
+            self._resolved[name] = self.names.get(name) or next(
+                (pk for full_name, pk in self.names.items() if name in full_name), None
+            )
+
+        return self._resolved[name]
+
+
+class DishImporter:
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def run(
+        self,
+        file: BinaryIO,
+        on_chunk: Callable[[ImportResult, int], None] | None = None,
+    ) -> ImportResult:
+        """Import the file, `on_chunk(result, bytes_read)` is called after every chunk."""
+
+        lookup = RestaurantLookup()
+        result = ImportResult()
+        reader = _ByteCounter(file)
+        chunk: list[Dish] = []
+
+        try:
+            for row in csv.DictReader(reader):
+                # the missing columns of a short row are None, it is skipped as invalid
+                restaurant_id = None
+                if row.get("name") and row.get("restaurant"):
+                    restaurant_id = lookup.get(row["restaurant"])
+                try:
+                    price = int(row.get("price"))
+                except (TypeError, ValueError):
+                    restaurant_id = None
+
+                if restaurant_id is None:
+                    result.skipped += 1
+                    continue
+
+                chunk.append(Dish(name=row["name"], price=price, restaurant_id=restaurant_id))
+                if len(chunk) >= self.chunk_size:
+                    self._save(chunk, result)
+                    if on_chunk is not None:
+                        on_chunk(result, reader.bytes_read)
+
+            self._save(chunk, result)
+            if on_chunk is not None:
+                on_chunk(result, reader.bytes_read)
+        finally:
+            # bulk_create sends no signals, so the menu cache is told here
+            if result.created:
+                menu.bump_version()
+
+        return result
+
+    @staticmethod
+    def _save(chunk: list[Dish], result: ImportResult) -> None:
+        if not chunk:
+            return
+
+        # a failed chunk rolls back alone, earlier chunks stay imported
+        with transaction.atomic():
+            Dish.objects.bulk_create(chunk)
+        result.created += len(chunk)
+        chunk.clear()
+
+
+class _ByteCounter:
+    """Decoded lines of a binary file, counting the bytes read for the progress."""
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.file:
+            self.bytes_read += len(line)
+            yield line.decode("utf-8")
+
+
+def get_config() -> dict:
+    return getattr(settings, "DISH_IMPORT", {})
+
+
+def storage_dir() -> Path:
+    path = Path(get_config().get("DIR", "/tmp/dish_imports"))
+    path.mkdir(parents=True, exist_ok=True)
+
+    return path
+
+
+def save_upload(chunks: Iterable[bytes]) -> str:
+    """Store the uploaded file for the background job, return the job id."""
+
+    job_id = uuid.uuid4().hex
+    with open(storage_dir() / f"{job_id}.csv", "wb") as file:
+        for chunk in chunks:
+            file.write(chunk)
+
+    set_progress(job_id, status="queued")
+
+    return job_id
+
+
+def run_job(job_id: str) -> ImportResult:
+    path = storage_dir() / f"{job_id}.csv"
+    total_bytes = path.stat().st_size
+
+    def on_chunk(result: ImportResult, bytes_read: int) -> None:
+        set_progress(
+            job_id,
+            status="running",
+            progress=round(bytes_read / total_bytes, 3) if total_bytes else 1.0,
+            processed=result.processed,
+            **asdict(result),
+        )
+
+    set_progress(job_id, status="running")
+    try:
+        with open(path, "rb") as file:
+            result = DishImporter().run(file, on_chunk=on_chunk)
+    except Exception as error:
+        set_progress(job_id, status="failed", error=repr(error))
+        raise
+    finally:
+        path.unlink(missing_ok=True)
+
+    set_progress(job_id, status="done", progress=1.0, processed=result.processed, **asdict(result))
+
+    return result
+
+
+def set_progress(job_id: str, **progress) -> None:
+    CacheService().set(
+        namespace=PROGRESS_NAMESPACE, key=job_id, value=progress, ttl=PROGRESS_TTL
+    )
+
+
+def get_progress(job_id: str) -> dict | None:
+    return CacheService().get(namespace=PROGRESS_NAMESPACE, key=job_id)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from food.webhooks import WebhookConsumer
+
+
+class Command(BaseCommand):
+    help = "Apply the KFC and Uber webhook events in batches, any number of consumers at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--name", help="the consumer in the group, host-pid by default")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--block-ms", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        consumer = WebhookConsumer(
+            name=options["name"],
+            batch_size=options["batch_size"],
+            block_ms=options["block_ms"],
+        )
+        self.stdout.write(f"Webhook consumer {consumer.name} started")
+
+        try:
+            consumer.serve()
+        except KeyboardInterrupt:
+            self.stdout.write(f"Webhook consumer {consumer.name} stopped")
@@ -0,0 +1,25 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from food.polling import SilpoTracker
+
+
+class Command(BaseCommand):
+    help = "Poll every in-flight Silpo order from a single asyncio event loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument("--scan-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        tracker = SilpoTracker(
+            poll_interval=options["poll_interval"],
+            scan_interval=options["scan_interval"],
+        )
+        self.stdout.write("Silpo tracker started")
+
+        try:
+            asyncio.run(tracker.serve())
+        except KeyboardInterrupt:
+            self.stdout.write("Silpo tracker stopped")
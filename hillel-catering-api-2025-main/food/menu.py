@@ -0,0 +1,175 @@
+"""
+Menu snapshot cache of `GET /food/dishes/`.
+
+    menu:version  = 42             # bumped on every menu change
+    menu:snapshot = {              # the rendered response, ready to be sent
+        "version": b"42",
+        "etag": b'"3f1c..."',
+        "identity": b'[{"id":1,"name":"Silpo","dishes":[...]}]',
+        "gzip": b"\\x1f\\x8b...",
+        "br": b"...",
+    }
+    menu:rebuild  = 1              # lock of the worker that rebuilds
+
+A request reads the version, the ETag and the body in the encoding the
+client accepts in one round trip, so neither the serializer nor the
+renderer runs on a cache hit:
+
+    get_menu(accept_encoding="gzip, br")
+    -> RenderedMenu(etag='"3f1c...-br"', body=b"...", encoding="br")
+
+Every encoding is a representation of its own, with its own strong ETag:
+`"3f1c..."` for plain JSON, `"3f1c...-gzip"`, `"3f1c...-br"`.
+
+A snapshot of an older version is stale. The first worker that sees it
+takes the lock and rebuilds, the others serve the stale snapshot until
+the new one is stored, so a menu change does not send every worker to
+the database at once. Dish/Restaurant signals (food.signals) and
+food.importers call `bump_version()`.
+"""
+
+import gzip
+import hashlib
+import logging
+from dataclasses import dataclass
+
+import brotli
+import redis
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from shared.cache import CacheService
+
+from .models import Restaurant
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "menu"
+VERSION = "version"
+SNAPSHOT = "snapshot"
+REBUILD_LOCK = "rebuild"
+# the lock expires if the rebuilding worker dies
+REBUILD_LOCK_TTL = 30
+# in case a version bump is lost while Redis is not available
+SNAPSHOT_TTL = 60 * 60
+# the preferred one first
+ENCODINGS = ("br", "gzip")
+
+
+@dataclass
+class RenderedMenu:
+    etag: str
+    body: bytes
+    encoding: str | None = None  # Content-Encoding, None for plain JSON
+
+
+def build_menu() -> list[dict]:
+    from .views import RestaurantSerializer
+
+    # two queries whatever the number of restaurants
+    restaurants = Restaurant.objects.prefetch_related("dishes").order_by("id")
+
+    return RestaurantSerializer(restaurants, many=True).data
+
+
+def render_menu(version: int) -> dict[str, bytes]:
+    """Snapshot fields: the JSON body in every encoding and the strong ETag of the plain one."""
+
+    body = JSONRenderer().render(build_menu())
+
+    return {
+        "version": str(version).encode(),
+        "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"'.encode(),
+        "identity": body,
+        # mtime=0, so the same menu is compressed to the same bytes
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        # compressed once per menu change, so the slowest and smallest level is fine
+        "br": brotli.compress(body, quality=11),
+    }
+
+
+def pick_encoding(accept_encoding: str) -> str:
+    """'gzip, br;q=0' -> 'gzip'"""
+
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        try:
+            weight = float(params.strip().removeprefix("q=") or 1)
+        except ValueError:
+            weight = 1.0
+        if weight > 0:
+            accepted.add(coding.strip())
+
+    return next((coding for coding in ENCODINGS if coding in accepted), "identity")
+
+
+def get_menu(accept_encoding: str = "", cache: CacheService | None = None) -> RenderedMenu:
+    cache = cache or CacheService()
+    encoding = pick_encoding(accept_encoding)
+
+    try:
+        with cache.pipeline() as pipe:
+            pipe.get(namespace=NAMESPACE, key=VERSION)
+            pipe.get_blobs(
+                namespace=NAMESPACE, key=SNAPSHOT, fields=["version", "etag", encoding]
+            )
+        version, snapshot = pipe.results
+    except redis.RedisError as error:
+        logger.warning("Menu cache is not available: %r", error)
+        return to_menu(render_menu(0), encoding)
+
+    version = version or 0
+    if snapshot["version"] is not None and int(snapshot["version"]) == version:
+        return to_menu(snapshot, encoding)
+
+    try:
+        locked = cache.add(namespace=NAMESPACE, key=REBUILD_LOCK, value=1, ttl=REBUILD_LOCK_TTL)
+    except redis.RedisError as error:
+        logger.warning("Menu rebuild lock is not available: %r", error)
+        return to_menu(render_menu(version), encoding)
+
+    if not locked:
+        if snapshot["version"] is not None:
+            return to_menu(snapshot, encoding)  # stale, another worker is rebuilding it
+
+        return to_menu(render_menu(version), encoding)  # the first snapshot is not ready yet
+
+    try:
+        # a change during the build bumps the version again, so the next request rebuilds
+        fields = render_menu(version)
+        cache.set_blobs(namespace=NAMESPACE, key=SNAPSHOT, mapping=fields, ttl=SNAPSHOT_TTL)
+    except redis.RedisError as error:
+        # the fresh body is sent anyway, the next request rebuilds again
+        logger.warning("Menu snapshot is not stored: %r", error)
+    finally:
+        try:
+            cache.delete(namespace=NAMESPACE, key=REBUILD_LOCK)
+        except redis.RedisError as error:
+            logger.warning("Menu rebuild lock is not released, it expires: %r", error)
+
+    return to_menu(fields, encoding)
+
+
+def to_menu(fields: dict[str, bytes], encoding: str) -> RenderedMenu:
+    etag = fields["etag"].decode()
+    if encoding != "identity":
+        etag = f'{etag[:-1]}-{encoding}"'
+
+    return RenderedMenu(
+        etag=etag,
+        body=fields[encoding],
+        encoding=None if encoding == "identity" else encoding,
+    )
+
+
+def bump_version() -> None:
+    """Mark the snapshot stale once the current transaction is committed."""
+
+    def bump():
+        try:
+            CacheService().incr(namespace=NAMESPACE, key=VERSION)
+        except redis.RedisError as error:
+            logger.warning("Menu version is not bumped: %r", error)
+
+    transaction.on_commit(bump)
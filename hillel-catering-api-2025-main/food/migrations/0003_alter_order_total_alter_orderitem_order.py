@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 16:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("food", "0002_order_total_alter_dish_restaurant_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="order",
+            name="total",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="order",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="items",
+                to="food.order",
+            ),
+        ),
+    ]
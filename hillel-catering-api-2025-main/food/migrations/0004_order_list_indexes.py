@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 16:14
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY does not block the writes to orders,
+    # it can not run in a transaction
+    atomic = False
+
+    dependencies = [
+        ("food", "0003_alter_order_total_alter_orderitem_order"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["status", "-id"], name="orders_status_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(
+                fields=["delivery_provider", "-id"], name="orders_provider_id_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["eta", "-id"], name="orders_eta_id_idx"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 16:20
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY does not block the writes to orders and
+    # restaurants, it can not run in a transaction
+    atomic = False
+
+    dependencies = [
+        ("food", "0004_order_list_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["user", "-id"], name="orders_user_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="order",
+            index=models.Index(fields=["status", "eta"], name="orders_status_eta_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="restaurant",
+            index=models.Index(fields=["name"], name="restaurants_name_idx"),
+        ),
+    ]
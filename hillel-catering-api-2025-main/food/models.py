@@ -1,3 +1,5 @@
+from typing import NamedTuple
+
 from django.conf import settings
 from django.db import models
 
@@ -7,6 +9,8 @@ from .enums import OrderStatus
 class Restaurant(models.Model):
     class Meta:
         db_table = "restaurants"
+        # the provider tasks look their restaurant up by name
+        indexes = [models.Index(fields=["name"], name="restaurants_name_idx")]
 
     name = models.CharField(max_length=255, null=False)
     address = models.TextField(null=False)
@@ -32,6 +36,16 @@ class Dish(models.Model):
 class Order(models.Model):
     class Meta:
         db_table = "orders"
+        # the admin orders list: filters + keyset pagination by -id (food.pagination)
+        indexes = [
+            models.Index(fields=["status", "-id"], name="orders_status_id_idx"),
+            models.Index(fields=["delivery_provider", "-id"], name="orders_provider_id_idx"),
+            models.Index(fields=["eta", "-id"], name="orders_eta_id_idx"),
+            # the orders of a user, newest first (`visible_orders`)
+            models.Index(fields=["user", "-id"], name="orders_user_id_idx"),
+            # ?status=...&eta_from=...&eta_to=...
+            models.Index(fields=["status", "eta"], name="orders_status_eta_idx"),
+        ]
 
     status = models.CharField(
         max_length=50, choices=OrderStatus.choices(), default=OrderStatus.NOT_STARTED
@@ -44,19 +58,34 @@ class Order(models.Model):
     def __str__(self) -> str:
         return f"[{self.pk}] {self.status} for {self.user.email}"
 
-    def items_by_restaurant(self) -> dict[Restaurant, models.QuerySet["OrderItem"]]:
-        results = {}
+    def items_by_restaurant(self) -> dict[Restaurant, list["OrderItemRow"]]:
+        """One query, items grouped per restaurant.
 
-        # get all items for this order, optimize the query
-        qs = self.items.select_related("dish__restaurant")
+        {<Restaurant: KFC>: [OrderItemRow(dish="Burger", quantity=2, price=150)], ...}
 
-        # N+1
-        restaurants = {item.dish.restaurant for item in qs}
+        The rows are plain tuples, so they can be passed to Celery tasks as they are.
+        """
 
-        for restaurant in restaurants:
-            results[restaurant] = qs.filter(dish__restaurant=restaurant)
+        results: dict[int, tuple[Restaurant, list[OrderItemRow]]] = {}
 
-        return results
+        rows = (
+            self.items.order_by("id")
+            .values_list(
+                "dish__restaurant_id",
+                "dish__restaurant__name",
+                "dish__restaurant__address",
+                "dish__name",
+                "quantity",
+                "dish__price",
+            )
+        )
+        for restaurant_id, name, address, dish, quantity, price in rows:
+            if restaurant_id not in results:
+                restaurant = Restaurant(id=restaurant_id, name=name, address=address)
+                results[restaurant_id] = (restaurant, [])
+            results[restaurant_id][1].append(OrderItemRow(dish, quantity, price))
+
+        return dict(results.values())
 
     def delivery_meta(self) -> tuple[str, str]:
         """Return addresses without duplicates."""
@@ -71,6 +100,12 @@ class Order(models.Model):
         )
 
 
+class OrderItemRow(NamedTuple):
+    dish: str  # the dish name, the restaurant APIs know no ids
+    quantity: int
+    price: int
+
+
 class OrderItem(models.Model):
     class Meta:
         db_table = "order_items"
@@ -80,4 +115,4 @@ class OrderItem(models.Model):
     order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="items")
 
     def __str__(self) -> str:
-        return f"[{self.order.pk}] {self.dish.name}: {self.quantity}"
\ No newline at end of file
+        return f"[{self.order_id}] {self.dish.name}: {self.quantity}"
\ No newline at end of file
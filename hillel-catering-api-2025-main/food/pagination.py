@@ -0,0 +1,76 @@
+"""
+Pagination of the orders list (`GET /food/orders/`, admins only).
+
+    ?limit=100&offset=200                      COUNT(*) + OFFSET, fine for the first pages
+    ?limit=100&offset=200&count=estimated      the count from the Postgres planner statistics
+    ?pagination=cursor&limit=100               keyset: WHERE id < <last id> ORDER BY id DESC,
+                                               follow the `next` link, no COUNT, no OFFSET
+
+Order has no creation timestamp, `id` grows with every new order, so
+"newest first" is "-id".
+"""
+
+import json
+
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.request import Request
+
+# below it the exact COUNT(*) is cheap and the estimate is not precise
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+class OrderCursorPagination(CursorPagination):
+    ordering = "-id"
+    page_size = 100
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+
+class OrderLimitOffsetPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+    def paginate_queryset(self, queryset, request: Request, view=None):
+        self.estimated = request.query_params.get("count") == "estimated"
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset: QuerySet) -> int:
+        if not self.estimated:
+            return super().get_count(queryset)
+
+        estimate = estimated_count(queryset)
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().get_count(queryset)
+
+        return estimate
+
+
+def estimated_count(queryset: QuerySet) -> int | None:
+    """Rows the Postgres planner expects the query to return, `None` on other databases."""
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        [explain] = cursor.fetchone()
+
+    if isinstance(explain, str):  # not decoded by the driver
+        explain = json.loads(explain)
+
+    return int(explain[0]["Plan"]["Plan Rows"])
+
+
+def get_paginator(request: Request) -> CursorPagination | LimitOffsetPagination:
+    if request.query_params.get("pagination") == "cursor":
+        return OrderCursorPagination()
+
+    return OrderLimitOffsetPagination()
+
+
+# not filters of the list
+PARAMS = {"limit", "offset", "count", "cursor", "pagination"}
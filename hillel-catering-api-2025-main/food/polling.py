@@ -0,0 +1,259 @@
+"""
+Asyncio multiplexer for Silpo order tracking.
+
+Silpo has no webhooks, so every order must be polled until it is cooked.
+Instead of holding a Celery worker slot per order, `order_in_silpo` only
+registers the order and one `SilpoTracker` process polls all of them
+concurrently over a single shared HTTP client.
+
+    order_in_silpo.delay(...)  ->  HSET tracking:silpo <order_id> <items>
+    SilpoTracker.serve()       ->  one coroutine per registered order
+                                   HDEL tracking:silpo <order_id> when cooked
+
+An order that fails MAX_ATTEMPTS times in a row is moved to
+`tracking:silpo:dead` (with the last error) instead of being retried forever.
+
+Redis is used through `redis.asyncio`, so polling does not hop to a thread.
+The few ORM calls run in Django's single sync thread and drop stale database
+connections first, so the process survives a Postgres restart.
+
+Run it with `python manage.py track_silpo`.
+"""
+
+import asyncio
+import json
+import logging
+
+import httpx
+import redis
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from shared.cache import AsyncCacheService, CacheService
+from shared.log import bind_order
+
+from .enums import OrderStatus
+from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
+from .models import Restaurant
+from .providers import silpo
+from .tracking import TrackingOrder, TrackingOrderStore
+from .transitions import atransition_restaurant, transition_order
+
+logger = logging.getLogger(__name__)
+
+SILPO_TRACKING_KEY = "tracking:silpo"
+SILPO_FAILURES_KEY = "tracking:silpo:failures"
+SILPO_DEAD_KEY = "tracking:silpo:dead"
+MAX_ATTEMPTS = 5
+
+
+def register_silpo_order(order_id: int, items: list[dict]) -> None:
+    """Hand the order over to the tracking engine.
+
+    items: [{"dish": "Salad", "quantity": 2}, ...]
+    """
+
+    CacheService().connection.hset(SILPO_TRACKING_KEY, str(order_id), json.dumps(items))
+
+
+@sync_to_async
+def _transition_order(order_id: int, expected, new: OrderStatus) -> bool:
+    # a long-living process: reconnect if the server has closed the connection
+    close_old_connections()
+    return transition_order(order_id, expected=expected, new=new)
+
+
+@sync_to_async
+def _silpo_restaurant_id() -> int:
+    close_old_connections()
+    return Restaurant.objects.get(name="Silpo").pk
+
+
+class SilpoTracker:
+    """
+    tracker = SilpoTracker()
+    asyncio.run(tracker.serve())  # forever
+    asyncio.run(tracker.track(order_id=17, items=[...]))  # single order
+    """
+
+    def __init__(
+        self,
+        client: silpo.AsyncClient | None = None,
+        poll_interval: float = 1.0,
+        scan_interval: float = 1.0,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.client: silpo.AsyncClient = client or silpo.AsyncClient()
+        self.cache = AsyncCacheService()
+        self.store = TrackingOrderStore(async_cache=self.cache)
+        self.poll_interval = poll_interval
+        self.scan_interval = scan_interval
+        self.max_attempts = max_attempts
+        self.in_flight: dict[int, asyncio.Task] = {}
+        self._restaurant_id: int | None = None
+
+    @staticmethod
+    def get_internal_status(status: silpo.OrderStatus) -> OrderStatus:
+        return RESTAURANT_EXTERNAL_TO_INTERNAL["silpo"][status]
+
+    async def restaurant_id(self) -> int:
+        if self._restaurant_id is None:
+            self._restaurant_id = await _silpo_restaurant_id()
+
+        return self._restaurant_id
+
+    async def serve(self) -> None:
+        """Pick up registered orders and track each of them in its own task."""
+
+        try:
+            while True:
+                try:
+                    registered = await self.cache.connection.hgetall(SILPO_TRACKING_KEY)
+                except redis.RedisError as error:
+                    # in-flight orders keep polling, the next scan tries again
+                    logger.warning("Silpo tracking scan failed: %r", error)
+                    registered = {}
+
+                for raw_order_id, raw_items in registered.items():
+                    order_id = int(raw_order_id)
+                    if order_id in self.in_flight:
+                        continue
+
+                    self.in_flight[order_id] = asyncio.create_task(
+                        self._track_and_release(order_id, json.loads(raw_items))
+                    )
+
+                await asyncio.sleep(self.scan_interval)
+        finally:
+            for task in self.in_flight.values():
+                task.cancel()
+            await self.client.aclose()
+            await self.cache.aclose()
+
+    async def _track_and_release(self, order_id: int, items: list[dict]) -> None:
+        # every record of this asyncio task carries the order id
+        with bind_order(order_id):
+            try:
+                await self.track(order_id, items)
+            except Exception as error:
+                logger.exception("Silpo tracking failed")
+                await self._record_failure(order_id, items, error)
+                await asyncio.sleep(self.poll_interval)
+            else:
+                async with self.cache.connection.pipeline(transaction=True) as pipe:
+                    pipe.hdel(SILPO_TRACKING_KEY, str(order_id))
+                    pipe.hdel(SILPO_FAILURES_KEY, str(order_id))
+                    await pipe.execute()
+            finally:
+                self.in_flight.pop(order_id, None)
+
+    async def _record_failure(self, order_id: int, items: list[dict], error: Exception) -> None:
+        """The order is retried on the next scan until it fails `max_attempts` times."""
+
+        try:
+            attempts = await self.cache.connection.hincrby(SILPO_FAILURES_KEY, str(order_id))
+            if attempts < self.max_attempts:
+                return
+
+            logger.error("Silpo order failed %s times, moved to %s", attempts, SILPO_DEAD_KEY)
+            async with self.cache.connection.pipeline(transaction=True) as pipe:
+                pipe.hset(
+                    SILPO_DEAD_KEY,
+                    str(order_id),
+                    json.dumps({"items": items, "error": repr(error)}),
+                )
+                pipe.hdel(SILPO_TRACKING_KEY, str(order_id))
+                pipe.hdel(SILPO_FAILURES_KEY, str(order_id))
+                await pipe.execute()
+        except redis.RedisError as redis_error:
+            logger.warning("Silpo order failure is not recorded: %r", redis_error)
+
+    async def track(self, order_id: int, items: list[dict]) -> None:
+        """Poll one Silpo order until it is cooked.
+
+        NOTES
+        get order from cache
+        is external_id?
+          no: make order
+          yes: get order
+        """
+
+        restaurant_key = str(await self.restaurant_id())
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+
+            tracking_order = await self.store.aget(order_id)
+            silpo_order = tracking_order.restaurants.get(restaurant_key)
+            if not silpo_order:
+                raise ValueError("No Silpo in orders processing")
+
+            try:
+                if not silpo_order["external_id"]:
+                    response = await self.client.create_order(
+                        silpo.OrderRequestBody(
+                            order=[silpo.OrderItem(**item) for item in items]
+                        )
+                    )
+                else:
+                    response = await self.client.get_order(silpo_order["external_id"])
+            except httpx.HTTPError as error:
+                logger.warning("Silpo request failed: %r", error)
+                continue
+
+            internal_status = self.get_internal_status(response.status)
+
+            if not silpo_order["external_id"]:
+                logger.info(
+                    "Silpo order is created",
+                    extra={"external_id": response.id, "status": internal_status},
+                )
+                await atransition_restaurant(
+                    order_id,
+                    restaurant_key,
+                    expected=silpo_order["status"],
+                    new=internal_status,
+                    cache=self.cache,
+                    external_id=response.id,
+                )
+                continue
+
+            if silpo_order["status"] != internal_status:  # STATUS HAS CHANGED
+                logger.info("Silpo order status changed", extra={"status": internal_status})
+                result = await atransition_restaurant(
+                    order_id,
+                    restaurant_key,
+                    expected=silpo_order["status"],
+                    new=internal_status,
+                    cache=self.cache,
+                )
+                if not result.applied:
+                    # somebody else has moved the status, read it again
+                    continue
+
+                if internal_status == OrderStatus.COOKING:
+                    await _transition_order(
+                        order_id, expected=OrderStatus.NOT_STARTED, new=OrderStatus.COOKING
+                    )
+
+                all_cooked = result.all_cooked
+            else:
+                all_cooked = self._is_cooked(tracking_order)
+
+            if internal_status == OrderStatus.COOKED:
+                logger.debug("Silpo order is cooked")
+
+                if all_cooked:
+                    await _transition_order(
+                        order_id,
+                        expected=(OrderStatus.NOT_STARTED, OrderStatus.COOKING),
+                        new=OrderStatus.COOKED,
+                    )
+
+                return
+
+    @staticmethod
+    def _is_cooked(tracking_order: TrackingOrder) -> bool:
+        from .services import is_cooked
+
+        return is_cooked(tracking_order)
@@ -1,12 +1,18 @@
+import logging
 import random
 import time
 import uuid
+from dataclasses import dataclass
 from typing import Literal
 import httpx
 from fastapi import BackgroundTasks, FastAPI
 from pydantic import BaseModel
 import enum
 
+from shared.metrics import provider_call
+
+from . import transport
+
 class OrderStatus(enum.StrEnum):
     NOT_STARTED = "not started"
     COOKING = "cooking"
@@ -15,6 +21,8 @@ class OrderStatus(enum.StrEnum):
 STORAGE: dict[str, OrderStatus] = {}
 CATERING_API_WEBHOOK_URL = "http://localhost:8000/webhooks/kfc/"
 
+logger = logging.getLogger(__name__)
+
 
 app = FastAPI()
 
@@ -32,12 +40,37 @@ class OrderRequestBody(BaseModel):
     order: list[OrderItem]
 
 
+@dataclass
+class OrderResponse:
+    id: str
+    status: OrderStatus
+
+
+class Client:
+    # the url of running service
+    BASE_URL = "http://localhost:8002/api/orders"
+    PROVIDER = "kfc"
+
+    @classmethod
+    @provider_call("kfc", "create_order")
+    def create_order(
+        cls, order: OrderRequestBody, timeout: httpx.Timeout | None = None
+    ) -> OrderResponse:
+        response: httpx.Response = transport.get_client(cls.PROVIDER).post(
+            cls.BASE_URL,
+            json=order.model_dump(),
+            timeout=timeout or transport.deadline(cls.PROVIDER),
+        )
+        response.raise_for_status()
+        return OrderResponse(**response.json())
+
+
 async def update_order_status(order_id: str):
     ORDER_STATUSES: tuple[OrderStatus, ...] = ("cooking", "cooked", "finished")
     for status in ORDER_STATUSES:
         time.sleep(random.randint(4, 6))
         STORAGE[order_id] = status
-        print(f"KFC: [{order_id}] --> {status}")
+        logger.debug("KFC: [%s] --> %s", order_id, status)
 
         if status == "finished":
             async with httpx.AsyncClient() as client:
@@ -46,11 +79,13 @@ async def update_order_status(order_id: str):
                         CATERING_API_WEBHOOK_URL,
                         data={"id": order_id, "status": status},
                     )
-                except httpx.ConnectError as error:
-                    print("API connection failed")
+                except httpx.ConnectError:
+                    logger.warning("KFC: API connection failed")
                 else:
-                    print(
-                        f"KFC: Web hook sent to the {CATERING_API_WEBHOOK_URL}. Status: {status}"
+                    logger.debug(
+                        "KFC: Web hook sent to the %s. Status: %s",
+                        CATERING_API_WEBHOOK_URL,
+                        status,
                     )
 
 
@@ -3,6 +3,10 @@ from dataclasses import dataclass, asdict
 
 import httpx
 
+from shared.metrics import provider_call
+
+from . import transport
+
 class SilpoOrder:
     def create_order(self, order_data):
         from food.tasks import order_in_silpo
@@ -35,15 +39,69 @@ class OrderResponse:
 class Client:
     # the url of running service
     BASE_URL = "http://localhost:8001/api/orders"
+    PROVIDER = "silpo"
 
     @classmethod
-    def create_order(cls, order: OrderRequestBody):
-        response: httpx.Response = httpx.post(cls.BASE_URL, json=asdict(order))
+    @provider_call("silpo", "create_order")
+    def create_order(
+        cls, order: OrderRequestBody, timeout: httpx.Timeout | None = None
+    ):
+        response: httpx.Response = transport.get_client(cls.PROVIDER).post(
+            cls.BASE_URL,
+            json=asdict(order),
+            timeout=timeout or transport.deadline(cls.PROVIDER),
+        )
         response.raise_for_status()
         return OrderResponse(**response.json())
 
     @classmethod
-    def get_order(cls, order_id: str):
-        response: httpx.Response = httpx.get(f"{cls.BASE_URL}/{order_id}")
+    @provider_call("silpo", "get_order")
+    def get_order(cls, order_id: str, timeout: httpx.Timeout | None = None):
+        response: httpx.Response = transport.get_client(cls.PROVIDER).get(
+            f"{cls.BASE_URL}/{order_id}",
+            timeout=timeout or transport.deadline(cls.PROVIDER),
+        )
         response.raise_for_status()
-        return OrderResponse(**response.json())
\ No newline at end of file
+        return OrderResponse(**response.json())
+
+
+class AsyncClient:
+    """Non-blocking twin of `Client`.
+
+    One instance is shared by every coroutine of the tracking engine,
+    so all polls reuse the same pool of keep-alive connections.
+    """
+
+    BASE_URL = Client.BASE_URL
+    PROVIDER = Client.PROVIDER
+
+    def __init__(self, http: httpx.AsyncClient | None = None):
+        self.http: httpx.AsyncClient = http or transport.create_async_client(
+            self.PROVIDER
+        )
+
+    @provider_call("silpo", "create_order")
+    async def create_order(
+        self, order: OrderRequestBody, timeout: httpx.Timeout | None = None
+    ) -> OrderResponse:
+        response: httpx.Response = await self.http.post(
+            self.BASE_URL,
+            json=asdict(order),
+            timeout=timeout or transport.deadline(self.PROVIDER),
+        )
+        response.raise_for_status()
+        return OrderResponse(**response.json())
+
+    @provider_call("silpo", "get_order")
+    async def get_order(
+        self, order_id: str, timeout: httpx.Timeout | None = None
+    ) -> OrderResponse:
+        response: httpx.Response = await self.http.get(
+            f"{self.BASE_URL}/{order_id}",
+            timeout=timeout or transport.deadline(self.PROVIDER),
+        )
+        response.raise_for_status()
+        return OrderResponse(**response.json())
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
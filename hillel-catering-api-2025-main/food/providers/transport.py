@@ -0,0 +1,109 @@
+"""
+Shared HTTP transport for restaurant and delivery providers.
+
+Every provider gets one bounded pool of keep-alive connections per process
+instead of opening a new TCP connection for each request:
+
+    http = transport.get_client("silpo")            # sync, shared per process
+    http = transport.create_async_client("silpo")   # async, owned by the caller
+
+    http.get(url, timeout=transport.deadline("silpo"))  # per-call deadline
+"""
+
+from dataclasses import dataclass
+from threading import Lock
+
+import httpx
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 1.0
+    read_timeout: float = 5.0
+    # how long a request may queue for a free connection of the pool
+    pool_timeout: float = 10.0
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.read_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+PROVIDERS: dict[str, TransportConfig] = {
+    "silpo": TransportConfig(max_connections=100, max_keepalive_connections=100),
+    "kfc": TransportConfig(),
+    "uber": TransportConfig(max_connections=50, max_keepalive_connections=50),
+}
+DEFAULT_CONFIG = TransportConfig()
+
+_clients: dict[str, httpx.Client] = {}
+_lock = Lock()
+
+
+def get_config(provider: str) -> TransportConfig:
+    return PROVIDERS.get(provider, DEFAULT_CONFIG)
+
+
+def deadline(
+    provider: str, connect: float | None = None, read: float | None = None
+) -> httpx.Timeout:
+    """Per-call timeout that overrides the provider defaults."""
+
+    config = get_config(provider)
+    connect = config.connect_timeout if connect is None else connect
+    read = config.read_timeout if read is None else read
+
+    return httpx.Timeout(
+        connect=connect, read=read, write=read, pool=config.pool_timeout
+    )
+
+
+def get_client(provider: str) -> httpx.Client:
+    """Return the process-wide sync client of the provider.
+
+    httpx.Client is thread safe, so Celery threads and Django views share it.
+    """
+
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+
+    with _lock:
+        if provider not in _clients:
+            config = get_config(provider)
+            _clients[provider] = httpx.Client(limits=config.limits, timeout=config.timeout)
+
+        return _clients[provider]
+
+
+def create_async_client(provider: str) -> httpx.AsyncClient:
+    """Return a new pooled async client of the provider.
+
+    Async clients are bound to the event loop they are used in,
+    so the caller owns one per loop and closes it with `aclose()`.
+    """
+
+    config = get_config(provider)
+    return httpx.AsyncClient(limits=config.limits, timeout=config.timeout)
+
+
+def close_clients() -> None:
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -1,20 +1,36 @@
-import os
-import subprocess
+import httpx
+
+from shared.metrics import provider_call
+
+from . import transport
+
 
 class UberClient:
+    """Talks to the delivery simulator (tests/providers/uber.py, `make uber_mock`)."""
+
+    # the url of running service
+    BASE_URL = "http://localhost:8004/api/deliveries"
+    PROVIDER = "uber"
+
     def __init__(self, order_id: int):
         self.order_id = order_id
-        self.simulator_process = None
 
-    def start_delivery(self):
-        simulator_path = os.path.join(
-            os.path.dirname(__file__),
-            "../../tests/providers/uber.py"
-        )
-        self.simulator_process = subprocess.Popen(
-            ["python", simulator_path, str(self.order_id)]
+    @provider_call("uber", "start_delivery")
+    def start_delivery(self, points: int | None = None, speed: float | None = None) -> dict:
+        response: httpx.Response = transport.get_client(self.PROVIDER).post(
+            self.BASE_URL,
+            json={"order_id": self.order_id, "points": points, "speed": speed},
+            timeout=transport.deadline(self.PROVIDER),
         )
+        response.raise_for_status()
+        return response.json()
 
-    def stop_delivery(self):
-        if self.simulator_process:
-            self.simulator_process.terminate()
+    @provider_call("uber", "stop_delivery")
+    def stop_delivery(self) -> None:
+        response: httpx.Response = transport.get_client(self.PROVIDER).delete(
+            f"{self.BASE_URL}/{self.order_id}",
+            timeout=transport.deadline(self.PROVIDER),
+        )
+        # 404: the courier has already arrived
+        if response.status_code != 404:
+            response.raise_for_status()
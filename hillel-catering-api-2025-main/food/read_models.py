@@ -0,0 +1,123 @@
+"""
+Read-only representation of orders, the JSON of `OrderSerializer`
+without a query per order:
+
+    orders = Order.objects.filter(...).values(*ORDER_FIELDS)  # 1 query for the page
+    with_items(orders) -> [{"id": 17, "items": [...], "eta": ..., ...}]  # +1 query for all items
+
+Rows are plain dicts, no model instances are created, so a page of
+1000 orders costs 2 queries instead of 1001.
+
+The order detail is the DB row merged with the live `TrackingOrder`.
+The DB part is cached for a few seconds next to the tracking hash, so
+both come back in one Redis round trip and the database is only read
+on a miss:
+
+    order_details:17 = {"order": {...}, "user_id": 3}  # dropped on every status write
+    orders:17        = {"restaurants:1:status": ..., "delivery:location": ...}
+
+    get_order_detail(17) -> OrderDetail(order={...}, user_id=3, tracking=TrackingOrder(...))
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+from django.db import transaction
+
+from shared.cache import CacheService
+
+from .models import Order, OrderItem
+from .tracking import TrackingOrder, TrackingOrderStore
+
+ORDER_FIELDS = ("id", "eta", "total", "status", "delivery_provider")
+DETAIL_NAMESPACE = "order_details"
+DETAIL_TTL = 30
+
+
+@dataclass
+class OrderDetail:
+    order: dict  # the OrderSerializer shape
+    user_id: int
+    tracking: TrackingOrder
+
+
+def with_items(orders: Iterable[dict]) -> list[dict]:
+    """Order rows (`values(*ORDER_FIELDS)`) with their items, the `OrderSerializer` shape."""
+
+    orders = list(orders)
+    items: dict[int, list[dict]] = defaultdict(list)
+
+    if orders:
+        rows = (
+            OrderItem.objects.filter(order_id__in=[order["id"] for order in orders])
+            .order_by("id")
+            .values_list("order_id", "dish_id", "quantity")
+        )
+        for order_id, dish_id, quantity in rows:
+            items[order_id].append({"dish": dish_id, "quantity": quantity})
+
+    return [
+        {
+            "id": order["id"],
+            "items": items[order["id"]],
+            "eta": order["eta"],
+            "total": order["total"],
+            "status": order["status"],
+            "delivery_provider": order["delivery_provider"],
+        }
+        for order in orders
+    ]
+
+
+def get_order_detail(order_id: int, cache: CacheService | None = None) -> OrderDetail | None:
+    cache = cache or CacheService()
+
+    with cache.pipeline() as pipe:
+        pipe.get(namespace=DETAIL_NAMESPACE, key=str(order_id))
+        pipe.get_fields(namespace=TrackingOrderStore.NAMESPACE, key=str(order_id))
+    cached, tracking_fields = pipe.results
+
+    if cached is None:
+        cached = _load_order(order_id)
+        if cached is None:
+            return None
+        cache.set(namespace=DETAIL_NAMESPACE, key=str(order_id), value=cached, ttl=DETAIL_TTL)
+
+    return OrderDetail(
+        order=cached["order"],
+        user_id=cached["user_id"],
+        tracking=TrackingOrderStore.from_fields(tracking_fields),
+    )
+
+
+def _load_order(order_id: int) -> dict | None:
+    rows = list(Order.objects.filter(id=order_id).values(*ORDER_FIELDS, "user_id"))
+    if not rows:
+        return None
+
+    [order] = with_items(rows)
+    order["eta"] = order["eta"].isoformat()
+
+    return {"order": order, "user_id": rows[0]["user_id"]}
+
+
+def invalidate_order(order_id: int) -> None:
+    """Drop the cached detail once the status write is committed."""
+
+    transaction.on_commit(
+        lambda: CacheService().delete(namespace=DETAIL_NAMESPACE, key=str(order_id))
+    )
+
+
+def invalidate_orders(order_ids: Iterable[int]) -> None:
+    """`invalidate_order()` of a batch, one round trip."""
+
+    keys = [str(order_id) for order_id in order_ids]
+
+    def delete():
+        with CacheService().pipeline() as pipe:
+            for key in keys:
+                pipe.delete(namespace=DETAIL_NAMESPACE, key=key)
+
+    transaction.on_commit(delete)
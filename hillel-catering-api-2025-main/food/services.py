@@ -1,155 +1,102 @@
-from dataclasses import asdict, dataclass, field
-from threading import Thread
-from time import sleep
+import logging
+
 from .providers.uber import UberClient
-from django.db.models import QuerySet
 
 from config import celery_app
 from shared.cache import CacheService
 
 from .enums import OrderStatus
 from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
-from .models import Order, OrderItem, Restaurant
-from .providers import kfc, silpo
-
-@dataclass
-class TrackingOrder:
-    """
-    {
-        17: {
-            restaurants: {
-                1: {  // internal restaurant id
-                    status: NOT_STARTED, // internal
-                    external_id: 13,
-                    request_body: {...},
-                },
-                2: {  // internal restaurant id
-                    status: NOT_STARTED, // internal
-                    external_id: edf055b8-06e8-40ed-ab35-300fef3e0a5d,
-                    request_body: {...},
-                },
-            },
-            delivery: {...}
-        },
-        18: ...
-    }
-    """
-
-    restaurants: dict = field(default_factory=dict)
-    delivery: dict = field(default_factory=dict)
-
-
-def all_orders_cooked(order_id: int):
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get(namespace="orders", key=str(order_id)))
-    print(f"Checking if al orders are cooked: {tracking_order.restaurants}")
-
-    results = all(
+from .models import Order, OrderItemRow, Restaurant
+from .polling import register_silpo_order
+from .providers import kfc
+from .tracking import TrackingOrder, TrackingOrderStore
+from .transitions import (
+    RESTAURANT_TRANSITION_LUA,
+    RestaurantTransition,
+    restaurant_transition_args,
+    transition_order,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def is_cooked(tracking_order: TrackingOrder) -> bool:
+    return all(
         (
             payload["status"] == OrderStatus.COOKED
             for _, payload in tracking_order.restaurants.items()
         )
     )
 
-    return results
+
+def all_orders_cooked(order_id: int):
+    tracking_order = TrackingOrderStore().get(order_id)
+    logger.debug(
+        "Checking if all orders are cooked", extra={"restaurants": tracking_order.restaurants}
+    )
+
+    return is_cooked(tracking_order)
 
 
 @celery_app.task(queue="high_priority")
-def order_in_silpo(order_id: int, items: QuerySet[OrderItem]):
-    """Short polling requests to the Silpo API
-
-    NOTES
-    get order from cache
-    is external_id?
-      no: make order
-      yes: get order
+def order_in_silpo(order_id: int, items: list[OrderItemRow]):
+    """Register the order in the Silpo tracking engine.
+
+    Polling itself happens in `food.polling.SilpoTracker`, so the worker
+    slot is released right away.
+
+    items: [("Salad", 2, 120), ...]  # `Order.items_by_restaurant()` rows
     """
 
-    client = silpo.Client()
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="Silpo")
+    register_silpo_order(
+        order_id=order_id,
+        items=[{"dish": dish, "quantity": quantity} for dish, quantity, _ in items],
+    )
 
-    def get_internal_status(status: silpo.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["silpo"][status]
 
-    cooked = False
-    while not cooked:
-        sleep(1)  # just a delay
+def save_kfc_order(
+    cache: CacheService,
+    order_id: int,
+    restaurant_id: int,
+    external_id: str,
+    status: OrderStatus,
+) -> RestaurantTransition:
+    """ONE ROUND TRIP: move KFC status (compare-and-set) and save the mapping."""
+
+    with cache.pipeline() as pipe:
+        # UPDATE CACHE WITH EXTERNAL ID AND STATE
+        pipe.run_script(
+            RESTAURANT_TRANSITION_LUA,
+            namespace=TrackingOrderStore.NAMESPACE,
+            key=str(order_id),
+            args=restaurant_transition_args(
+                restaurant_id,
+                expected=OrderStatus.NOT_STARTED,
+                new=status,
+                external_id=external_id,
+            ),
+        )
 
-        # GET ITEM FROM THE CACHE
-        tracking_order = TrackingOrder(
-            **cache.get(namespace="orders", key=str(order_id))
+        # save another item for MAPPING to the INTERNAL ORDER
+        pipe.set(
+            namespace="kfc_orders",
+            key=external_id,
+            value={
+                "internal_order_id": order_id,
+                "restaurant_id": restaurant_id,
+            },
         )
-        # validate
-        silpo_order = tracking_order.restaurants.get(str(restaurant.pk))
-        if not silpo_order:
-            raise ValueError("No Silpo in orders processing")
-
-        # PRINT CURRENT STATUS
-        print(f"CURRENT SILPO ORDER STATUS: {silpo_order['status']}")
-
-        if not silpo_order["external_id"]:
-            # ✨ MAKE THE FIRST REQUEST IF NOT STARTED
-            response: silpo.OrderResponse = client.create_order(
-                silpo.OrderRequestBody(
-                    order=[
-                        silpo.OrderItem(dish=item.dish.name, quantity=item.quantity)
-                        for item in items
-                    ]
-                )
-            )
-            internal_status: OrderStatus = get_internal_status(response.status)
-
-            # UPDATE CACHE WITH EXTERNAL ID AND STATE
-            tracking_order.restaurants[str(restaurant.pk)] |= {
-                "external_id": response.id,
-                "status": internal_status,
-            }
-            print(
-                f"Created Silpo Order. External ID: {response.id}, Status: {internal_status}"
-            )
-            cache.set(
-                namespace="orders", key=str(order_id), value=asdict(tracking_order)
-            )
-        else:
-            # ✨ IF ALREADY HAVE EXTERNAL ID - JUST RETRIEVE THE ORDER
-            response = client.get_order(silpo_order["external_id"])
-            internal_status = get_internal_status(response.status)
-
-            print(
-                f"Tracking for Silpo Order with HTTP GET /api/orders. Status: {internal_status}"
-            )
-
-            if silpo_order["status"] != internal_status:  # STATUS HAS CHANGED
-                tracking_order.restaurants[str(restaurant.pk)][
-                    "status"
-                ] = internal_status
-                print(f"Silpo order status changed to {internal_status}")
-                cache.set(
-                    namespace="orders", key=str(order_id), value=asdict(tracking_order)
-                )
-
-                # if started cooking
-                if internal_status == OrderStatus.COOKING:
-                    Order.objects.filter(id=order_id).update(status=OrderStatus.COOKING)
-
-            if internal_status == OrderStatus.COOKED:
-                print("🍳 ORDER IS COOKED")
-                cooked = True
-
-                # 🚧 CHECK IF ALL ORDERS ARE COOKED
-                if all_orders_cooked(order_id):
-                    cache.set(
-                        namespace="orders",
-                        key=str(order_id),
-                        value=asdict(tracking_order),
-                    )
-
-                    Order.objects.filter(id=order_id).update(status=OrderStatus.COOKED)
+
+    applied, all_cooked = pipe.results[0]
+
+    return RestaurantTransition(applied=bool(applied), all_cooked=bool(all_cooked))
 
 
 @celery_app.task(queue="default")
-def order_in_kfc(order_id: int, items):
+def order_in_kfc(order_id: int, items: list[OrderItemRow]):
+    """items: [("Burger", 2, 150), ...]  # `Order.items_by_restaurant()` rows"""
+
     client = kfc.Client()
     cache = CacheService()
     restaurant = Restaurant.objects.get(name="KFC")
@@ -157,50 +104,36 @@ def order_in_kfc(order_id: int, items):
     def get_internal_status(status: kfc.OrderStatus) -> OrderStatus:
         return RESTAURANT_EXTERNAL_TO_INTERNAL["kfc"][status]
 
-    # GET ITEM FROM THE CACHE
-    tracking_order = TrackingOrder(**cache.get(namespace="orders", key=str(order_id)))
-
     response: kfc.OrderResponse = client.create_order(
         kfc.OrderRequestBody(
             order=[
-                kfc.OrderItem(dish=item.dish.name, quantity=item.quantity)
-                for item in items
+                kfc.OrderItem(dish=dish, quantity=quantity)
+                for dish, quantity, _ in items
             ]
         )
     )
     internal_status: OrderStatus = get_internal_status(response.status)
-
-    # UPDATE CACHE WITH EXTERNAL ID AND STATE
-    tracking_order.restaurants[str(restaurant.pk)] |= {
-        "external_id": response.id,
-        "status": internal_status,
-    }
-    print(f"KFC Silpo Order. External ID: {response.id}, Status: {internal_status}")
-
-    print(f"Created KFC Order. External ID: {response.id}, Status: {response.status}")
-    cache.set(namespace="orders", key=str(order_id), value=asdict(tracking_order))
-
-    # save another item for MAPPING to the INTERNAL ORDER
-    cache.set(
-        namespace="kfc_orders",
-        key=response.id,  # external KFC ID
-        value={
-            "internal_order_id": order_id,
-        },
+    logger.info(
+        "KFC order is created", extra={"external_id": response.id, "status": response.status}
     )
 
-    if all_orders_cooked(order_id):
-        cache.set(namespace="orders", key=str(order_id), value=asdict(tracking_order))
-        Order.objects.filter(id=order_id).update(status=OrderStatus.COOKED)
+    all_cooked = save_kfc_order(
+        cache, order_id, restaurant.pk, external_id=response.id, status=internal_status
+    ).all_cooked
+    if all_cooked:
+        transition_order(
+            order_id,
+            expected=(OrderStatus.NOT_STARTED, OrderStatus.COOKING),
+            new=OrderStatus.COOKED,
+        )
 
 
-@celery_app.task
+@celery_app.task(query_budget=3)
 def order_delivery(order_id: int):
     """Start processing delivery orders with Uber simulator."""
 
-    print(f"🚚 DELIVERY PROCESSING STARTED")
+    logger.info("Delivery processing started")
 
-    cache = CacheService()
     order = Order.objects.get(id=order_id)
 
     order.status = OrderStatus.DELIVERY_LOOKUP
@@ -215,30 +148,44 @@ def order_delivery(order_id: int):
         order.status = OrderStatus.DELIVERY
         order.save()
 
-        tracking_order = TrackingOrder(**cache.get("orders", str(order_id)))
-        tracking_order.delivery = {
-            "provider": "uber",
-            "status": OrderStatus.DELIVERY,
-            "location": {"lat": 0, "lng": 0},
-        }
-        cache.set("orders", str(order_id), asdict(tracking_order))
+        TrackingOrderStore().update_delivery(
+            order_id,
+            provider="uber",
+            status=OrderStatus.DELIVERY,
+            location={"lat": 0, "lng": 0},
+        )
         return
 
     raise ValueError("Unsupported provider for delivery")
 
 
+# restaurant name -> the task that places the order there
+PROVIDER_TASKS = {
+    "silpo": order_in_silpo,
+    "kfc": order_in_kfc,
+}
+
+
 def schedule_order(order: Order):
-    """Prepare order and start delivery process."""
+    """Prepare order, send it to the restaurants and start delivery process."""
 
-    cache = CacheService()
     tracking_order = TrackingOrder()
 
+    # one query, the items are sent to the tasks as they are
     items_by_restaurants = order.items_by_restaurant()
-    for restaurant, items in items_by_restaurants.items():
+    for restaurant in items_by_restaurants:
         tracking_order.restaurants[str(restaurant.pk)] = {
             "external_id": None,
             "status": OrderStatus.NOT_STARTED,
         }
 
-    cache.set(namespace="orders", key=str(order.pk), value=asdict(tracking_order))
+    TrackingOrderStore().create(order_id=order.pk, tracking_order=tracking_order)
+
+    for restaurant, items in items_by_restaurants.items():
+        task = PROVIDER_TASKS.get(restaurant.name.lower())
+        if task is None:
+            logger.warning("No provider for the restaurant %s", restaurant.name)
+            continue
+        task.delay(order_id=order.pk, items=items)
+
     order_delivery.delay(order_id=order.pk)
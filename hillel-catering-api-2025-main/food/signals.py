@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import menu
+from .models import Dish, Order, Restaurant
+from .read_models import invalidate_order
+
+
+@receiver([post_save, post_delete], sender=Dish)
+@receiver([post_save, post_delete], sender=Restaurant)
+def menu_changed(sender, **kwargs):
+    menu.bump_version()
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance: Order, **kwargs):
+    invalidate_order(instance.pk)
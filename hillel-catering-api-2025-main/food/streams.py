@@ -0,0 +1,195 @@
+"""
+Server-push order tracking.
+
+Instead of polling the order every second, the client opens one
+Server-Sent Events stream and gets the changes as they happen:
+
+    GET /food/orders/17/events
+    Accept: text/event-stream
+
+    event: snapshot
+    data: {"restaurants": {...}, "delivery": {...}}
+
+    event: update
+    data: {"restaurants": {"1": {"status": "cooked"}}, "delivery": {}}
+
+    : ping
+
+Browser `EventSource` can not send the Authorization header, so the
+frontend first asks for a short-lived token bound to the order:
+
+    POST /food/orders/17/events/token/  (Authorization: Bearer ...) -> {"token": "..."}
+    new EventSource("/food/orders/17/events?token=...")
+
+and requests a new token when the EventSource fails to reconnect.
+
+Every `TrackingOrderStore` write publishes to `orders:<id>:events`.
+One `OrderEventHub` per process holds ONE Redis pub/sub connection and
+fans the messages out to in-memory queues, so an idle subscriber costs a
+coroutine and a queue instead of a thread or a Redis connection.
+The stream only works under ASGI (`make asgi`).
+"""
+
+import asyncio
+import json
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from typing import AsyncIterator
+
+import redis.asyncio
+from django.core import signing
+
+from shared import cache as cache_module
+
+from .tracking import TrackingOrderStore
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 15.0
+QUEUE_SIZE = 100
+TOKEN_MAX_AGE = 300
+TOKEN_SALT = "food.streams.order_events"
+
+
+def events_channel(order_id: int | str) -> str:
+    key = TrackingOrderStore.EVENTS.format(order_id=order_id)
+    return f"{TrackingOrderStore.NAMESPACE}:{key}"
+
+
+def issue_token(order_id: int) -> str:
+    """Only issue it after checking that the user may see the order."""
+
+    return signing.dumps({"order_id": int(order_id)}, salt=TOKEN_SALT)
+
+
+def is_valid_token(token: str, order_id: int) -> bool:
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:  # SignatureExpired included
+        return False
+
+    return payload["order_id"] == int(order_id)
+
+
+class OrderEventHub:
+    """
+    hub = OrderEventHub()
+    async with hub.subscribe(order_id=17) as queue:
+        message = await queue.get()  # 'event: update\ndata: {"restaurants": ...}\n\n'
+    """
+
+    def __init__(
+        self, connection: redis.asyncio.Redis | None = None, queue_size: int = QUEUE_SIZE
+    ):
+        self.connection = connection or cache_module.create_async_connection()
+        self.pubsub = self.connection.pubsub(ignore_subscribe_messages=True)
+        self.queue_size = queue_size
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+        self._reader: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def total(self) -> int:
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    @asynccontextmanager
+    async def subscribe(self, order_id: int | str) -> AsyncIterator[asyncio.Queue]:
+        channel = events_channel(order_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async with self._lock:
+            if channel not in self.subscribers:
+                await self.pubsub.subscribe(channel)
+                self.subscribers[channel] = set()
+            self.subscribers[channel].add(queue)
+
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+
+        try:
+            yield queue
+        finally:
+            async with self._lock:
+                queues = self.subscribers[channel]
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[channel]
+                    await self.pubsub.unsubscribe(channel)
+
+    async def _read(self, poll_timeout: float = 1.0) -> None:
+        while not self._closing:
+            try:
+                message = await self.pubsub.get_message(timeout=poll_timeout)
+            except redis.RedisError as error:
+                logger.warning("Order events connection failed: %r", error)
+                await asyncio.sleep(1.0)
+                continue
+
+            if message is None:
+                continue
+
+            # formatted once per message, not once per subscriber
+            event = format_message("update", message["data"].decode())
+            for queue in self.subscribers.get(message["channel"].decode(), ()):
+                if queue.full():
+                    # slow client: the oldest update is dropped, not the newest
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def close(self, timeout: float = 2.0) -> None:
+        self._closing = True
+        if self._reader is not None:
+            # the read timeout may swallow cancel() (Python < 3.12),
+            # then the reader stops on the flag after its current poll
+            self._reader.cancel()
+            await asyncio.wait({self._reader}, timeout=timeout)
+        await self.pubsub.aclose()
+        await self.connection.aclose()
+
+
+_hubs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderEventHub]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_hub() -> OrderEventHub:
+    """The hub of the running event loop, one per server process."""
+
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = OrderEventHub()
+
+    return hub
+
+
+def format_message(name: str, data: str) -> str:
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+async def order_events(
+    order_id: int,
+    hub: OrderEventHub | None = None,
+    heartbeat: float = HEARTBEAT_INTERVAL,
+) -> AsyncIterator[str]:
+    """SSE messages of one order: the current snapshot, then every update."""
+
+    hub = hub or get_hub()
+    store = TrackingOrderStore()
+
+    async with hub.subscribe(order_id) as queue:
+        # subscribed first, so nothing written after the snapshot is lost
+        snapshot = await asyncio.to_thread(store.get, order_id)
+        yield format_message("snapshot", json.dumps(asdict(snapshot)))
+
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle connection
+                message = ": ping\n\n"
+
+            yield message
@@ -1,47 +1,42 @@
+import logging
+
 from celery import shared_task
-import requests
-from shared.cache import CacheService
-from dataclasses import asdict
-import time
 from food.providers import kfc, silpo
 
-WEBHOOK_URL = "http://localhost:8000/api/uber/webhook/"
+logger = logging.getLogger(__name__)
 
-def get_tracking_order_classes():
-    from food.services import TrackingOrder, all_orders_cooked
-    return TrackingOrder, all_orders_cooked
+def get_tracking_order_store():
+    from food.tracking import TrackingOrderStore
+    return TrackingOrderStore()
 
-@shared_task
-def send_uber_location(order_id: int, lat: float, lng: float):
-    TrackingOrder, _ = get_tracking_order_classes()
-    requests.post(WEBHOOK_URL, json={"order_id": order_id, "lat": lat, "lng": lng})
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get("orders", str(order_id)))
-    tracking_order.delivery.setdefault("history", [])
-    tracking_order.delivery["location"] = {"lat": lat, "lng": lng}
-    tracking_order.delivery["history"].append({"lat": lat, "lng": lng, "timestamp": time.time()})
-    cache.set("orders", str(order_id), asdict(tracking_order))
+# the progress and the result are kept by food.importers
+@shared_task(ignore_result=True)
+def import_dishes_file(job_id: str):
+    from food.importers import run_job
+    result = run_job(job_id)
+    logger.info(
+        "Dishes imported",
+        extra={
+            "job_id": job_id,
+            "dishes_created": result.created,
+            "rows_skipped": result.skipped,
+        },
+    )
 
 @shared_task
 def order_in_kfc(order_id: int):
-    TrackingOrder, _ = get_tracking_order_classes()
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get("orders", str(order_id)))
+    store = get_tracking_order_store()
+    tracking_order = store.get(order_id)
     client = kfc.Client()
     restaurant = client.get_restaurant()
     response = client.create_order(tracking_order.restaurants[str(restaurant.pk)]["items"])
-    tracking_order.restaurants[str(restaurant.pk)]["external_id"] = response.id
-    tracking_order.restaurants[str(restaurant.pk)]["status"] = "COOKING"
-    cache.set("orders", str(order_id), asdict(tracking_order))
+    store.update_restaurant(order_id, restaurant.pk, external_id=response.id, status="COOKING")
 
 @shared_task
 def order_in_silpo(order_id: int):
-    TrackingOrder, _ = get_tracking_order_classes()
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get("orders", str(order_id)))
+    store = get_tracking_order_store()
+    tracking_order = store.get(order_id)
     client = silpo.Client()
     restaurant = client.get_restaurant()
     response = client.create_order(tracking_order.restaurants[str(restaurant.pk)]["items"])
-    tracking_order.restaurants[str(restaurant.pk)]["external_id"] = response.id
-    tracking_order.restaurants[str(restaurant.pk)]["status"] = "COOKING"
-    cache.set("orders", str(order_id), asdict(tracking_order))
+    store.update_restaurant(order_id, restaurant.pk, external_id=response.id, status="COOKING")
@@ -0,0 +1,300 @@
+"""
+TrackingOrder storage in Redis hashes.
+
+Every restaurant status and every delivery attribute is a separate hash
+field, so writers update only their own field with one atomic HSET and
+never overwrite each other:
+
+    orders:17 = {
+        "restaurants:1:status": "cooking",
+        "restaurants:1:external_id": "13",
+        "restaurants:2:status": "not_started",
+        "restaurants:2:external_id": null,
+        "delivery:provider": "uber",
+        "delivery:location": {"lat": 46.48, "lng": 30.72},  # the latest point only
+    }
+
+`TrackingOrderStore.get()` puts the hash back together as a `TrackingOrder`.
+
+Courier location history lives apart from the order in a capped stream,
+so the order payload does not grow during the delivery:
+
+    orders:17:locations = XADD MAXLEN <max_points> <timestamp ms>-* value {"lat": ..., "lng": ...}
+
+The entry id is the time of the point, not of its arrival: the webhooks
+are applied in batches (food.webhooks), later and many points at once.
+
+    LocationHistory().range(order_id=17, since=<unix seconds>, until=<unix seconds>)
+
+Every write also publishes the changed part of the order, so the order
+stream (`food.streams`) pushes it to the subscribers right away:
+
+    PUBLISH orders:17:events {"restaurants": {"1": {"status": "cooked"}}, "delivery": {}}
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterable
+
+from django.conf import settings
+
+from shared.cache import AsyncCacheService, CachePipeline, CacheService
+
+# KEYS[1]  orders:<id>
+# KEYS[2]  orders:<id>:locations
+# ARGV[1]  location field, ARGV[2] location
+# ARGV[3]  history point, ARGV[4] max points, ARGV[5] min interval (ms), ARGV[6] ttl (s)
+# ARGV[7]  event, published to orders:<id>:events
+# ARGV[8]  time of the point (ms), the entry id of the history
+APPEND_LOCATION_LUA = """
+local point_ms = tonumber(ARGV[8])
+local last_ms = nil
+local last = redis.call("XREVRANGE", KEYS[2], "+", "-", "COUNT", 1)
+if #last > 0 then
+    last_ms = tonumber(string.match(last[1][1], "^(%d+)"))
+end
+
+-- a late or a redelivered point, the history has a newer one
+if last_ms and point_ms <= last_ms then
+    return 0
+end
+
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+redis.call("PUBLISH", KEYS[1] .. ":events", ARGV[7])
+
+if last_ms and point_ms - last_ms < tonumber(ARGV[5]) then
+    return 0
+end
+
+redis.call("XADD", KEYS[2], "MAXLEN", ARGV[4], ARGV[8] .. "-*", "value", ARGV[3])
+redis.call("EXPIRE", KEYS[2], ARGV[6])
+return 1
+"""
+
+
+@dataclass
+class TrackingOrder:
+    """
+    {
+        17: {
+            restaurants: {
+                1: {  // internal restaurant id
+                    status: NOT_STARTED, // internal
+                    external_id: 13,
+                    request_body: {...},
+                },
+                2: {  // internal restaurant id
+                    status: NOT_STARTED, // internal
+                    external_id: edf055b8-06e8-40ed-ab35-300fef3e0a5d,
+                    request_body: {...},
+                },
+            },
+            delivery: {...}
+        },
+        18: ...
+    }
+    """
+
+    restaurants: dict = field(default_factory=dict)
+    delivery: dict = field(default_factory=dict)
+
+
+class TrackingOrderStore:
+    """
+    store = TrackingOrderStore()
+    store.create(order_id=17, tracking_order=TrackingOrder(...))
+    store.update_restaurant(order_id=17, restaurant_id=1, status=OrderStatus.COOKING)
+    store.update_delivery(order_id=17, location={"lat": 1, "lng": 2})
+    store.get(order_id=17) -> TrackingOrder(...)
+    """
+
+    NAMESPACE = "orders"
+    EVENTS = "{order_id}:events"
+
+    def __init__(
+        self, cache: CacheService | None = None, async_cache: AsyncCacheService | None = None
+    ):
+        self.cache: CacheService = cache or CacheService()
+        self.async_cache = async_cache
+
+    @staticmethod
+    def restaurant_fields(restaurant_id: int | str, **fields) -> dict[str, Any]:
+        return {f"restaurants:{restaurant_id}:{name}": value for name, value in fields.items()}
+
+    @staticmethod
+    def delivery_fields(**fields) -> dict[str, Any]:
+        return {f"delivery:{name}": value for name, value in fields.items()}
+
+    @staticmethod
+    def from_fields(fields: dict[str, Any]) -> TrackingOrder:
+        tracking_order = TrackingOrder()
+
+        for name, value in fields.items():
+            match name.split(":"):
+                case ["restaurants", restaurant_id, attribute]:
+                    tracking_order.restaurants.setdefault(restaurant_id, {})[attribute] = value
+                case ["delivery", attribute]:
+                    tracking_order.delivery[attribute] = value
+
+        return tracking_order
+
+    @classmethod
+    def event(cls, mapping: dict[str, Any]) -> dict:
+        """Changed fields as a partial `TrackingOrder`, the payload of the order stream."""
+
+        return asdict(cls.from_fields(mapping))
+
+    def to_fields(self, tracking_order: TrackingOrder) -> dict[str, Any]:
+        fields = {}
+
+        for restaurant_id, payload in tracking_order.restaurants.items():
+            fields |= self.restaurant_fields(restaurant_id, **payload)
+
+        fields |= self.delivery_fields(**tracking_order.delivery)
+
+        return fields
+
+    def create(self, order_id: int, tracking_order: TrackingOrder) -> None:
+        """Replace the whole tracking order. Only used when the order is scheduled."""
+
+        with self.cache.pipeline(transaction=True) as pipe:
+            pipe.delete(namespace=self.NAMESPACE, key=str(order_id))
+            pipe.delete(namespace=self.NAMESPACE, key=LocationHistory.key(order_id))
+            pipe.set_fields(
+                namespace=self.NAMESPACE,
+                key=str(order_id),
+                mapping=self.to_fields(tracking_order),
+            )
+
+    def get(self, order_id: int) -> TrackingOrder:
+        return self.from_fields(
+            self.cache.get_fields(namespace=self.NAMESPACE, key=str(order_id))
+        )
+
+    async def aget(self, order_id: int) -> TrackingOrder:
+        """`get()` for asyncio code, needs the store created with `async_cache`."""
+
+        assert self.async_cache is not None, "TrackingOrderStore(async_cache=...) is required"
+
+        return self.from_fields(
+            await self.async_cache.get_fields(namespace=self.NAMESPACE, key=str(order_id))
+        )
+
+    def update_restaurant(
+        self, order_id: int, restaurant_id: int | str, read_back: bool = False, **fields
+    ) -> TrackingOrder | None:
+        """Update fields of one restaurant.
+
+        With `read_back=True` the whole order is read in the same round trip,
+        so the caller can check other restaurants without another request.
+        """
+
+        mapping = self.restaurant_fields(restaurant_id, **fields)
+
+        with self.cache.pipeline() as pipe:
+            self._update(pipe, order_id, mapping)
+            if read_back:
+                pipe.get_fields(namespace=self.NAMESPACE, key=str(order_id))
+
+        return self.from_fields(pipe.results[-1]) if read_back else None
+
+    def update_delivery(self, order_id: int, **fields) -> None:
+        with self.cache.pipeline() as pipe:
+            self._update(pipe, order_id, self.delivery_fields(**fields))
+
+    def _update(self, pipe: CachePipeline, order_id: int, mapping: dict[str, Any]) -> None:
+        pipe.set_fields(namespace=self.NAMESPACE, key=str(order_id), mapping=mapping)
+        pipe.publish(
+            namespace=self.NAMESPACE,
+            key=self.EVENTS.format(order_id=order_id),
+            value=self.event(mapping),
+        )
+
+    def append_location(self, order_id: int, location: dict) -> bool:
+        """Set the latest courier location and add it to the history.
+
+        location: {"lat": 46.48, "lng": 30.72, "timestamp": 1700000000.0}
+        Returns `False` if the point was downsampled out of the history, or is
+        not newer than its last point (late or redelivered).
+        """
+
+        [stored] = self.append_locations([(order_id, location)])
+        return stored
+
+    def append_locations(self, locations: Iterable[tuple[int, dict]]) -> list[bool]:
+        """`append_location()` of a whole batch in one round trip.
+
+        store.append_locations([(17, {"lat": ..., "lng": ...}), (18, {...})]) -> [True, True]
+        """
+
+        history = LocationHistory(cache=self.cache)
+
+        with self.cache.pipeline() as pipe:
+            for order_id, location in locations:
+                latest = {"lat": location["lat"], "lng": location["lng"]}
+                [location_field] = self.delivery_fields(location=latest)
+                pipe.run_script(
+                    APPEND_LOCATION_LUA,
+                    namespace=self.NAMESPACE,
+                    key=str(order_id),
+                    extra_keys=[history.key(order_id)],
+                    args=[
+                        location_field,
+                        json.dumps(latest),
+                        json.dumps(location),
+                        history.max_points,
+                        history.min_interval_ms,
+                        history.ttl,
+                        json.dumps(self.event(self.delivery_fields(location=latest))),
+                        int(location.get("timestamp", time.time()) * 1000),
+                    ],
+                )
+
+        return [bool(stored) for stored in pipe.results]
+
+
+class LocationHistory:
+    """Capped per-order stream of courier locations.
+
+    COURIER_LOCATION_HISTORY = {
+        "MAX_POINTS": 1000,         # older points are trimmed
+        "MIN_INTERVAL_SECONDS": 0,  # downsampling, 0 keeps every point
+        "TTL_SECONDS": 86400,       # the stream expires after the last point
+    }
+    """
+
+    NAMESPACE = TrackingOrderStore.NAMESPACE
+
+    def __init__(self, cache: CacheService | None = None):
+        self.cache: CacheService = cache or CacheService()
+        config: dict = getattr(settings, "COURIER_LOCATION_HISTORY", {})
+        self.max_points: int = config.get("MAX_POINTS", 1000)
+        self.min_interval_ms: int = int(config.get("MIN_INTERVAL_SECONDS", 0) * 1000)
+        self.ttl: int = config.get("TTL_SECONDS", 60 * 60 * 24)
+
+    @staticmethod
+    def key(order_id: int | str) -> str:
+        return f"{order_id}:locations"
+
+    def range(
+        self,
+        order_id: int,
+        since: float | None = None,
+        until: float | None = None,
+        count: int | None = None,
+    ) -> list[dict]:
+        """Points timestamped between `since` and `until` (unix seconds, both included).
+
+        Oldest first.
+        """
+
+        entries = self.cache.get_stream(
+            namespace=self.NAMESPACE,
+            key=self.key(order_id),
+            start="-" if since is None else int(since * 1000),
+            end="+" if until is None else int(until * 1000),
+            count=count,
+        )
+
+        return [point for _, point in entries]
@@ -0,0 +1,188 @@
+"""
+Compare-and-set order status transitions.
+
+A status changes only if the expected previous status still holds, so two
+restaurants finishing at the same moment can not both miss each other:
+
+    Redis:    one Lua script checks the restaurant status, sets the new one
+              and tells whether all restaurants are cooked now.
+              Only the caller that cooked the LAST restaurant gets `all_cooked`.
+    Postgres: UPDATE orders SET status = <new> WHERE id = ... AND status IN <expected>
+
+    result = transition_restaurant(17, restaurant_id=1, expected=COOKING, new=COOKED)
+    if result.all_cooked:
+        transition_order(17, expected=(NOT_STARTED, COOKING), new=COOKED)
+
+    transition_orders([17, 18], expected=(NOT_STARTED, COOKING), new=COOKED)  # a batch
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Iterable
+
+from django.db import transaction
+
+from shared.cache import AsyncCacheService, CacheService
+
+from .enums import OrderStatus
+from .models import Order
+from .read_models import invalidate_order, invalidate_orders
+from .tracking import TrackingOrderStore
+
+# KEYS[1]  orders:<id>
+# ARGV[1]  status field of the restaurant
+# ARGV[2]  new status
+# ARGV[3]  cooked status
+# ARGV[4]  event, published to orders:<id>:events if the transition is applied
+# ARGV[5]  N - number of expected statuses, ARGV[6..5+N] expected statuses
+# rest     field, value pairs to set together with the status
+RESTAURANT_TRANSITION_LUA = """
+local current = redis.call("HGET", KEYS[1], ARGV[1])
+local expected_total = tonumber(ARGV[5])
+
+local allowed = false
+for i = 6, 5 + expected_total do
+    if current == ARGV[i] then
+        allowed = true
+    end
+end
+if not allowed then
+    return {0, 0}
+end
+
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+for i = 6 + expected_total, #ARGV, 2 do
+    redis.call("HSET", KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call("PUBLISH", KEYS[1] .. ":events", ARGV[4])
+
+if ARGV[2] ~= ARGV[3] then
+    return {1, 0}
+end
+
+local fields = redis.call("HGETALL", KEYS[1])
+for i = 1, #fields, 2 do
+    if string.match(fields[i], "^restaurants:.+:status$") and fields[i + 1] ~= ARGV[3] then
+        return {1, 0}
+    end
+end
+
+return {1, 1}
+"""
+
+
+@dataclass
+class RestaurantTransition:
+    applied: bool
+    all_cooked: bool
+
+
+def _statuses(value: OrderStatus | Iterable[OrderStatus]) -> list[OrderStatus]:
+    if isinstance(value, str):
+        return [value]
+
+    return list(value)
+
+
+def restaurant_transition_args(
+    restaurant_id: int | str,
+    expected: OrderStatus | Iterable[OrderStatus],
+    new: OrderStatus,
+    **fields,
+) -> list[str]:
+    expected_statuses = _statuses(expected)
+    [status_field] = TrackingOrderStore.restaurant_fields(restaurant_id, status=new)
+    extra = TrackingOrderStore.restaurant_fields(restaurant_id, **fields)
+    event = TrackingOrderStore.event({status_field: new, **extra})
+
+    args = [
+        status_field,
+        json.dumps(new),
+        json.dumps(OrderStatus.COOKED),
+        json.dumps(event),
+        str(len(expected_statuses)),
+        *(json.dumps(status) for status in expected_statuses),
+    ]
+    for name, value in extra.items():
+        args += [name, json.dumps(value)]
+
+    return args
+
+
+def transition_restaurant(
+    order_id: int,
+    restaurant_id: int | str,
+    expected: OrderStatus | Iterable[OrderStatus],
+    new: OrderStatus,
+    cache: CacheService | None = None,
+    **fields,
+) -> RestaurantTransition:
+    """Set the restaurant status if it is still one of `expected`.
+
+    `fields` (e.g. external_id) are set in the same atomic step.
+    """
+
+    cache = cache or CacheService()
+    applied, all_cooked = cache.run_script(
+        RESTAURANT_TRANSITION_LUA,
+        namespace=TrackingOrderStore.NAMESPACE,
+        key=str(order_id),
+        args=restaurant_transition_args(restaurant_id, expected, new, **fields),
+    )
+
+    return RestaurantTransition(applied=bool(applied), all_cooked=bool(all_cooked))
+
+
+async def atransition_restaurant(
+    order_id: int,
+    restaurant_id: int | str,
+    expected: OrderStatus | Iterable[OrderStatus],
+    new: OrderStatus,
+    cache: AsyncCacheService,
+    **fields,
+) -> RestaurantTransition:
+    applied, all_cooked = await cache.run_script(
+        RESTAURANT_TRANSITION_LUA,
+        namespace=TrackingOrderStore.NAMESPACE,
+        key=str(order_id),
+        args=restaurant_transition_args(restaurant_id, expected, new, **fields),
+    )
+
+    return RestaurantTransition(applied=bool(applied), all_cooked=bool(all_cooked))
+
+
+def transition_order(
+    order_id: int,
+    expected: OrderStatus | Iterable[OrderStatus],
+    new: OrderStatus,
+) -> bool:
+    """Conditional UPDATE, `False` if the order is not in the expected status anymore."""
+
+    updated = Order.objects.filter(id=order_id, status__in=_statuses(expected)).update(
+        status=new
+    )
+    if updated:
+        # update() sends no signals
+        invalidate_order(order_id)
+
+    return updated == 1
+
+
+def transition_orders(
+    order_ids: Iterable[int],
+    expected: OrderStatus | Iterable[OrderStatus],
+    new: OrderStatus,
+) -> list[int]:
+    """`transition_order()` of a batch in one UPDATE, the ids of the updated orders."""
+
+    with transaction.atomic():
+        updated = list(
+            Order.objects.select_for_update()
+            .filter(id__in=list(order_ids), status__in=_statuses(expected))
+            .values_list("id", flat=True)
+        )
+        if updated:
+            Order.objects.filter(id__in=updated).update(status=new)
+            invalidate_orders(updated)
+
+    return updated
@@ -1,35 +1,50 @@
-import csv
+import hashlib
 import json
-import io
+import logging
+import time
+from dataclasses import asdict
 from datetime import date
 from typing import Any
 
+from asgiref.sync import sync_to_async
 from django.views import View
-from django.http import JsonResponse
-from django.core.cache import cache
+from django.http import (
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.db import transaction
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import redirect
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.utils.http import parse_etags, urlencode
 
 from rest_framework import permissions, routers, serializers, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from shared.log import bind_order
+from shared.metrics import ViewMetricsMixin
+from shared.queries import query_budget
 from users.models import Role, User
+from . import importers, menu, pagination, read_models, streams, webhooks
 from .enums import DeliveryProvider
 from .models import Dish, Order, OrderItem, OrderStatus, Restaurant
 from .services import schedule_order
+from .tasks import import_dishes_file
+from .tracking import LocationHistory
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from shared.cache import CacheService
 from food.enums import OrderStatus
-from food.models import Order, TrackingOrder
-from dataclasses import asdict
+from food.models import Order
+
+logger = logging.getLogger(__name__)
 
 
 class DishSerializer(serializers.ModelSerializer):
@@ -47,7 +62,8 @@ class RestaurantSerializer(serializers.ModelSerializer):
 
 
 class OrderItemSerializer(serializers.Serializer):
-    dish = serializers.PrimaryKeyRelatedField(queryset=Dish.objects.all())
+    # a plain id, the dishes of all items are resolved at once in `OrderSerializer`
+    dish = serializers.IntegerField(source="dish_id", min_value=1)
     quantity = serializers.IntegerField(min_value=1, max_value=20)
 
 
@@ -70,9 +86,26 @@ class OrderSerializer(serializers.Serializer):
 
         return total
 
-    # validate_<any-fieldname>
-    # def validate_items(self, value: date):
-    #     raise ValidationError("Some error")
+    def validate_items(self, items: list[dict]) -> list[dict]:
+        """Resolve the dishes of every item with one query."""
+
+        dishes = Dish.objects.in_bulk({item["dish_id"] for item in items})
+
+        # the error of every item at its position, as PrimaryKeyRelatedField reports it
+        errors: list[dict] = []
+        for item in items:
+            try:
+                item["dish"] = dishes[item["dish_id"]]
+                errors.append({})
+            except KeyError:
+                errors.append(
+                    {"dish": [f'Invalid pk "{item["dish_id"]}" - object does not exist.']}
+                )
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        return items
 
     def validate_eta(self, value: date):
         if (value - date.today()).days < 1:
@@ -96,6 +129,15 @@ class IsAdmin(permissions.BasePermission):
             return False
 
 
+def visible_orders(user: User):
+    """Orders the user may look at: own orders, every order for admins."""
+
+    if user.role == Role.ADMIN:
+        return Order.objects.all()
+
+    return Order.objects.filter(user=user)
+
+
 class BaseFitlers:
     @staticmethod
     def camel_to_snake_case(value):
@@ -123,9 +165,10 @@ class BaseFitlers:
             try:
                 extractor = getattr(self, f"extract_{_key}")
             except AttributeError:
-                errors["queryParams"][
-                    key
-                ] = f"You forgot to define `extract_{_key}` method in your class `{self.__class__.__name__}`"
+                errors["queryParams"][key] = (
+                    f"You forgot to define `extract_{_key}` method "
+                    f"in your class `{self.__class__.__name__}`"
+                )
                 raise ValidationError(errors)
 
             try:
@@ -140,6 +183,46 @@ class BaseFitlers:
 
 
 class FoodFilters(BaseFitlers):
+    """
+    ?status=cooking&deliveryProvider=uber&etaFrom=2025-07-01&etaTo=2025-07-31
+    """
+
+    status: OrderStatus | None = None
+    delivery_provider: DeliveryProvider | None = None
+    eta_from: date | None = None
+    eta_to: date | None = None
+
+    def filter(self, orders):
+        if self.status is not None:
+            orders = orders.filter(status=self.status)
+        if self.delivery_provider is not None:
+            orders = orders.filter(delivery_provider=self.delivery_provider)
+        if self.eta_from is not None:
+            orders = orders.filter(eta__gte=self.eta_from)
+        if self.eta_to is not None:
+            orders = orders.filter(eta__lte=self.eta_to)
+
+        return orders
+
+    def extract_status(self, status: str) -> OrderStatus:
+        try:
+            return OrderStatus(status.lower())
+        except ValueError:
+            raise ValidationError(f"Status {status} is not supported")
+
+    def extract_eta_from(self, value: str) -> date:
+        return self._extract_date(value)
+
+    def extract_eta_to(self, value: str) -> date:
+        return self._extract_date(value)
+
+    @staticmethod
+    def _extract_date(value: str) -> date:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError(f"{value} is not a YYYY-MM-DD date")
+
     def extract_delivery_provider(
         self, provider: str | None = None
     ) -> DeliveryProvider | None:
@@ -154,20 +237,43 @@ class FoodFilters(BaseFitlers):
             else:
                 return _provider
 
-class UberWebhookView(View):
-    def post(self, request, *args, **kwargs):
-        data = json.loads(request.body)
-        cache.set("courier_location", data, timeout=50) 
-        return JsonResponse({'status': "ok"})
+class OrderEventsView(View):
+    """Server-Sent Events of one order instead of polling it, see `food.streams`.
 
+    Authenticated either with `?token=` from `POST /food/orders/<id>/events/token/`
+    (browser EventSource) or with the usual `Authorization: Bearer <jwt>` header.
+    """
 
-class CourierLocationView(View):
-    def get(self, request, *args, **kwargs):
-        location = cache.get("courier_location", {"lat": 0, "lng": 0})
-        return JsonResponse(location)
+    @staticmethod
+    def authenticate(request) -> User | None:
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+
+        return authenticated[0] if authenticated else None
+
+    async def get(self, request, id: int, *args, **kwargs):
+        token = request.GET.get("token")
+        if token is not None:
+            if not streams.is_valid_token(token, order_id=id):
+                return JsonResponse({"detail": "Invalid or expired token"}, status=401)
+        else:
+            user = await sync_to_async(self.authenticate)(request)
+            if user is None:
+                return JsonResponse({"detail": "Not authenticated"}, status=401)
 
+            if not await visible_orders(user).filter(id=id).aexists():
+                return JsonResponse({"detail": "Not found"}, status=404)
 
-class FoodAPIViewSet(viewsets.GenericViewSet):
+        return StreamingHttpResponse(
+            streams.order_events(id),
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+class FoodAPIViewSet(ViewMetricsMixin, viewsets.GenericViewSet):
     def get_permissions(self):
         match self.action:
             case "all_orders":
@@ -175,21 +281,67 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
             case _:
                 return [permissions.IsAuthenticated()]
 
-    @method_decorator(cache_page(100))
     @action(methods=["get"], detail=False)
-    def dishes(self, request: Request) -> Response:
-        restaurants = Restaurant.objects.all()
-        serializer = RestaurantSerializer(restaurants, many=True)
-        # import time
-        # time.sleep(3)
-        return Response(data=serializer.data)
+    @query_budget(3)  # a snapshot rebuild: the restaurants and their dishes
+    def dishes(self, request: Request) -> HttpResponse:
+        """Pre-rendered, pre-compressed menu snapshot (food.menu), 304 if unchanged."""
+
+        rendered = menu.get_menu(accept_encoding=request.headers.get("Accept-Encoding", ""))
+        headers = {
+            "ETag": rendered.etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "private, no-cache",
+        }
+
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if rendered.etag in if_none_match or "*" in if_none_match:
+            return HttpResponseNotModified(headers=headers)
+
+        if rendered.encoding is not None:
+            headers["Content-Encoding"] = rendered.encoding
+
+        return HttpResponse(rendered.body, content_type="application/json", headers=headers)
 
     # HTTP GET /food/orders/4
     @action(methods=["get"], detail=False, url_path=r"orders/(?P<id>\d+)")
+    @query_budget(3)
     def retrieve_order(self, request: Request, id: int) -> Response:
-        order = Order.objects.get(id=id)
-        serializer = OrderSerializer(order)
-        return Response(data=serializer.data)
+        """The order with its live restaurant and delivery state (food.read_models)."""
+
+        detail = read_models.get_order_detail(int(id))
+        if detail is None or (
+            request.user.role != Role.ADMIN and detail.user_id != request.user.pk
+        ):
+            raise NotFound()
+
+        return Response(data={**detail.order, "tracking": asdict(detail.tracking)})
+
+    # HTTP POST /food/orders/4/events/token/
+    @action(methods=["post"], detail=False, url_path=r"orders/(?P<id>\d+)/events/token")
+    @query_budget(2)
+    def order_events_token(self, request: Request, id: int) -> Response:
+        if not visible_orders(request.user).filter(id=id).exists():
+            raise NotFound()
+
+        return Response(data={"token": streams.issue_token(id)})
+
+    # HTTP GET /food/orders/4/locations/?since=1700000000&until=1700000600
+    @action(methods=["get"], detail=False, url_path=r"orders/(?P<id>\d+)/locations")
+    @query_budget(2)
+    def order_locations(self, request: Request, id: int) -> Response:
+        if not visible_orders(request.user).filter(id=id).exists():
+            raise NotFound()
+
+        since = request.query_params.get("since")
+        until = request.query_params.get("until")
+        try:
+            since = None if since is None else float(since)
+            until = None if until is None else float(until)
+        except ValueError:
+            raise ValidationError("since and until must be unix timestamps")
+
+        history = LocationHistory().range(order_id=id, since=since, until=until)
+        return Response(data=history)
 
     # HTTP POST /food/orders/
     def create_order(self, request: Request) -> Response:
@@ -207,45 +359,39 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
                 total=serializer.calculated_total,
             )
 
-            items = serializer.validated_data["items"]
-            for dish_order in items:
-                instance = OrderItem.objects.create(
-                    dish=dish_order["dish"],
-                    quantity=dish_order["quantity"],
-                    order=order,
-                )
-                print(f"New Dish Order Item is created: {instance.pk}")
-
-        print(f"New Food Order is created: {order.pk}. ETA: {order.eta}")
+            OrderItem.objects.bulk_create(
+                OrderItem(dish=item["dish"], quantity=item["quantity"], order=order)
+                for item in serializer.validated_data["items"]
+            )
 
-        schedule_order(order)
+        with bind_order(order.pk):
+            logger.info("Order is created", extra={"eta": str(order.eta)})
+            schedule_order(order)
 
         return Response(OrderSerializer(order).data, status=201)
 
     def all_orders(self, request: Request) -> Response:
-        # filters = FoodFilters(**request.query_params.dict())
-        # status: str | None = request.query_params.get("status")
-        # orders = (
-        #     Order.objects.all()
-        #     if filters.delivery_provider is None
-        #     else Order.objects.filter(delivery_provider=filters.delivery_provider)
-        # )
-
-        orders = Order.objects.all()
+        """Newest first, filtered by FoodFilters, paginated by food.pagination."""
 
-        paginator = LimitOffsetPagination()
-        # paginator.page_size = 2
-        # paginator.page_size_query_param = "size"
-        page = paginator.paginate_queryset(orders, request, view=self)
+        filters = FoodFilters(
+            **{
+                key: value
+                for key, value in request.query_params.dict().items()
+                if key not in pagination.PARAMS
+            }
+        )
+        orders = filters.filter(Order.objects.order_by("-id"))
 
-        if page is not None:
-            serializer = OrderSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+        paginator = pagination.get_paginator(request)
+        page = paginator.paginate_queryset(
+            orders.values(*read_models.ORDER_FIELDS), request, view=self
+        )
 
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        # the OrderSerializer shape, the page and all its items in 2 queries
+        return paginator.get_paginated_response(read_models.with_items(page))
 
     @action(methods=["get", "post"], detail=False, url_path=r"orders")
+    @query_budget(get=4, post=5)
     def orders(self, request: Request) -> Response:
         if request.method == "POST":
             return self.create_order(request)
@@ -253,6 +399,7 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
             return self.all_orders(request)
 
 
+@staff_member_required
 def import_dishes(request):
     if request.method != "POST":
         raise ValueError(f"Method {request.method} is not allowed on this resource")
@@ -261,60 +408,69 @@ def import_dishes(request):
     if csv_file is None:
         raise ValueError("No CSV File Provided")
 
-    decoded = csv_file.read().decode("utf-8")
-    reader = csv.DictReader(io.StringIO(decoded))
-    total = 0
-
-    for row in reader:
-        restaurant_name = row["restaurant"]
-        try:
-            rest = Restaurant.objects.get(name__icontains=restaurant_name.lower())
-        except Restaurant.DoesNotExist:
-            print(f"Skipping restaurant {restaurant_name}")
-        else:
-            print(f"Restaurant {rest} found")
-
-        Dish.objects.create(name=row["name"], price=int(row["price"]), restaurant=rest)
-        total += 1
-
-    print(f"{total} dishes uploaded to the database")
+    changelist = reverse("admin:food_dish_changelist")
 
-    return redirect(request.META.get("HTTP_REFERER", "/"))
+    if csv_file.size > importers.get_config().get("SYNC_MAX_BYTES", 1024 * 1024):
+        job_id = importers.save_upload(csv_file.chunks())
+        import_dishes_file.delay(job_id)
+        messages.info(request, f"{csv_file.name} is being imported in the background")
 
+        return redirect(f"{changelist}?{urlencode({'import_job': job_id})}")
 
-import json
+    result = importers.DishImporter().run(csv_file)
+    logger.info(
+        "Dishes imported",
+        extra={"dishes_created": result.created, "rows_skipped": result.skipped},
+    )
+    messages.info(
+        request, f"{result.created} dishes imported, {result.skipped} rows skipped"
+    )
 
+    return redirect(changelist)
 
-from shared.cache import CacheService
 
-from .models import Restaurant
-from .services import TrackingOrder, all_orders_cooked
+@staff_member_required
+def import_dishes_progress(request, job_id: str):
+    progress = importers.get_progress(job_id)
+    if progress is None:
+        return JsonResponse({"error": "No such import"}, status=404)
 
+    return JsonResponse(progress)
 
-from django.http.response import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
 
 @csrf_exempt
+@query_budget(0)
 def kfc_webhook(request):
-    data: dict = json.loads(json.dumps(request.POST))
+    """KFC tells that an order is finished, applied by the webhook consumers.
 
-    cache = CacheService()
-    kfc_cache_order: dict = cache.get(namespace="kfc_orders", key=data["id"])
-    restaurant = Restaurant.objects.get(name="KFC")
+    id=ext-2&status=finished  (a form, or the same as JSON)
 
-    # get internal order  from the mapping
-    # add logging if order wasn't found
-    # NOTE: don't return any 404, etc, since now the Client is KFC Company, not the User
-    order: Order = Order.objects.get(id=kfc_cache_order["internal_order_id"])
+    A retry of the same status is acknowledged and dropped.
+    NOTE: don't return any 404, etc, since now the Client is KFC Company, not the User
+    """
 
-    # because KFC returns webhook only if finished
-    if all_orders_cooked(order.pk):
-        order.status = OrderStatus.COOKED
-        order.save()
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = None
+    else:
+        data = request.POST
 
-    # Mention that idea if needed
-    # Order.update_from_provider_status(id_=order.internal_order_id, status="finished")
+    # a QueryDict is a dict too
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "id and status are required"}, status=400)
 
+    external_id, status = data.get("id"), data.get("status")
+    if not external_id or status not in webhooks.KFC_STATUSES:
+        return JsonResponse({"error": "id and status are required"}, status=400)
+
+    webhooks.ingest(
+        "kfc", f"{external_id}:{status}", {"id": str(external_id), "status": status}
+    )
 
     return JsonResponse({"message": "ok"})
 
@@ -323,23 +479,45 @@ router = routers.DefaultRouter()
 router.register(prefix="", viewset=FoodAPIViewSet, basename="food")
 
 @csrf_exempt
+@query_budget(0)
 def uber_webhook(request):
+    """One location or a batch of them from the delivery simulator.
+
+    Applied by the webhook consumers (food.webhooks).
+
+    {"order_id": 17, "lat": 46.48, "lng": 30.72}
+    {"locations": [{"order_id": 17, "lat": 46.48, "lng": 30.72, "timestamp": ...}, ...]}
+    """
+
     if request.method != "POST":
         return JsonResponse({"error": "Only POST allowed"}, status=405)
 
-    data = json.loads(request.body)
-    order_id = data["order_id"]
-    lat = data["lat"]
-    lng = data["lng"]
-
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get("orders", str(order_id)))
-    tracking_order.delivery["location"] = {"lat": lat, "lng": lng}
-    cache.set("orders", str(order_id), asdict(tracking_order))
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "order_id, lat and lng are required"}, status=400)
+
+    now = time.time()
+    try:
+        locations = [
+            (
+                int(point["order_id"]),
+                {
+                    "lat": float(point["lat"]),
+                    "lng": float(point["lng"]),
+                    "timestamp": float(point.get("timestamp", now)),
+                },
+            )
+            for point in data.get("locations", [data])
+        ]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return JsonResponse({"error": "order_id, lat and lng are required"}, status=400)
 
-    print(f"[WEBHOOK] Order {order_id} location updated: {lat}, {lng}")
+    # a retried batch has the same id, the simulator sends none: the same body
+    event_id = request.headers.get("X-Event-Id") or hashlib.sha1(request.body).hexdigest()
+    webhooks.ingest("uber", event_id, {"locations": locations})
 
-    return JsonResponse({"status": "ok"})
+    return JsonResponse({"status": "ok", "count": len(locations)})
 
 # /food/
 
@@ -0,0 +1,345 @@
+"""
+Provider webhooks: accepted in a round trip, applied in batches by consumers.
+
+    POST /webhooks/kfc/...  ->  validate  ->  ingest("kfc", "<id>:<status>", event)
+    POST /api/uber/webhook/ ->  validate  ->  ingest("uber", <X-Event-Id or body digest>, event)
+
+`ingest()` is one Lua script: SET NX of the event id (kept
+`DEDUPE_TTL_SECONDS`) and XADD to the stream of the provider, so a retried
+event, however many times and however concurrently, is added once:
+
+    webhooks:seen:kfc:ext-2:finished = 1 EX <ttl> NX
+    webhooks:kfc = XADD * value {"id": "ext-2", "status": "finished"}
+
+`WebhookConsumer` (`python manage.py consume_webhooks`) reads the streams
+in the `appliers` consumer group, applies a batch and acknowledges it:
+
+    kfc:  one pipeline of restaurant transitions (food.transitions),
+          one UPDATE of the cooked orders
+    uber: one pipeline of courier locations (TrackingOrderStore.append_locations)
+
+A batch that fails is applied again event by event, so one bad event does
+not hold the others. A failed event is retried when it is claimed again
+(`CLAIM_IDLE_SECONDS`), after `MAX_ATTEMPTS` deliveries it is moved to
+`webhooks:<provider>:dead` with the error. The entries of a consumer that
+died are claimed by another one the same way.
+
+The streams are trimmed below the oldest entry not acknowledged yet, never
+by length: an event the dedupe key rejects a retry of must not be lost
+before it is applied. While the consumers are down the streams grow.
+
+    WEBHOOKS = {
+        "DEDUPE_TTL_SECONDS": 86400,  # longer than the retries of a provider
+        "BATCH_SIZE": 500,
+        "CLAIM_IDLE_SECONDS": 60,
+        "MAX_ATTEMPTS": 5,
+        "DEAD_MAX_LENGTH": 10000,
+    }
+"""
+import json
+import logging
+import os
+import socket
+import time
+
+import redis
+from django.conf import settings
+
+from shared.cache import CacheService
+
+from .enums import OrderStatus
+from .tracking import TrackingOrder, TrackingOrderStore
+from .transitions import RESTAURANT_TRANSITION_LUA, restaurant_transition_args, transition_orders
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "webhooks"
+PROVIDERS = ("kfc", "uber")
+GROUP = "appliers"
+KFC_STATUSES = ("not started", "cooking", "cooked", "finished")
+
+# KEYS[1]  webhooks:seen:<provider>:<event id>
+# KEYS[2]  webhooks:<provider>
+# ARGV[1]  dedupe TTL, ARGV[2] event
+INGEST_LUA = """
+if not redis.call("SET", KEYS[1], 1, "NX", "EX", ARGV[1]) then
+    return 0
+end
+
+redis.call("XADD", KEYS[2], "*", "value", ARGV[2])
+return 1
+"""
+
+
+def _config() -> dict:
+    return settings.WEBHOOKS
+
+
+def stream_key(provider: str) -> str:
+    return f"{NAMESPACE}:{provider}"
+
+
+def ingest(provider: str, event_id: str, event: dict, cache: CacheService | None = None) -> bool:
+    """Add the event to the stream of the provider, `False` if it was added before."""
+
+    cache = cache or CacheService()
+
+    return bool(
+        cache.run_script(
+            INGEST_LUA,
+            namespace=NAMESPACE,
+            key=f"seen:{provider}:{event_id}",
+            extra_keys=[provider],
+            args=[_config()["DEDUPE_TTL_SECONDS"], json.dumps(event)],
+        )
+    )
+
+
+def _all_cooked(tracking_order: TrackingOrder) -> bool:
+    statuses = [restaurant.get("status") for restaurant in tracking_order.restaurants.values()]
+    return bool(statuses) and all(status == OrderStatus.COOKED for status in statuses)
+
+
+def apply_kfc(events: list[dict], cache: CacheService) -> None:
+    """KFC sends a webhook when the order is finished, it is cooked then."""
+
+    finished = [event for event in events if event["status"] == "finished"]
+    if not finished:
+        return
+
+    mappings = cache.get_many(namespace="kfc_orders", keys=[event["id"] for event in finished])
+    order_ids = []
+
+    with cache.pipeline() as pipe:
+        for event in finished:
+            mapping = mappings[event["id"]]
+            if mapping is None:
+                logger.warning("KFC order is not known", extra={"external_id": event["id"]})
+                continue
+
+            order_ids.append(mapping["internal_order_id"])
+            pipe.run_script(
+                RESTAURANT_TRANSITION_LUA,
+                namespace=TrackingOrderStore.NAMESPACE,
+                key=str(mapping["internal_order_id"]),
+                args=restaurant_transition_args(
+                    mapping["restaurant_id"],
+                    expected=(OrderStatus.NOT_STARTED, OrderStatus.COOKING),
+                    new=OrderStatus.COOKED,
+                ),
+            )
+
+    cooked, replayed = [], []
+    for order_id, (applied, all_cooked) in zip(order_ids, pipe.results):
+        if all_cooked:
+            cooked.append(order_id)
+        elif not applied:
+            replayed.append(order_id)
+
+    # a retried or a redelivered event: the restaurant is cooked already,
+    # the order is not if the batch has failed after the transition
+    if replayed:
+        with cache.pipeline() as pipe:
+            for order_id in replayed:
+                pipe.get_fields(namespace=TrackingOrderStore.NAMESPACE, key=str(order_id))
+        cooked += [
+            order_id
+            for order_id, fields in zip(replayed, pipe.results)
+            if _all_cooked(TrackingOrderStore.from_fields(fields))
+        ]
+
+    if cooked:
+        transition_orders(
+            cooked,
+            expected=(OrderStatus.NOT_STARTED, OrderStatus.COOKING),
+            new=OrderStatus.COOKED,
+        )
+
+
+def apply_uber(events: list[dict], cache: CacheService) -> None:
+    locations = [
+        (order_id, location) for event in events for order_id, location in event["locations"]
+    ]
+    TrackingOrderStore(cache).append_locations(locations)
+    logger.debug("Courier locations updated", extra={"count": len(locations)})
+
+
+APPLIERS = {"kfc": apply_kfc, "uber": apply_uber}
+
+
+class WebhookConsumer:
+    """One consumer of the `appliers` group, any number of them run at once."""
+
+    def __init__(
+        self,
+        name: str | None = None,
+        batch_size: int | None = None,
+        block_ms: int = 1000,
+        error_interval: float = 1.0,
+        cache: CacheService | None = None,
+    ):
+        config = _config()
+        self.cache: CacheService = cache or CacheService()
+        self.name: str = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size: int = batch_size or config["BATCH_SIZE"]
+        self.block_ms = block_ms
+        self.error_interval = error_interval
+        self.claim_idle_ms: int = config["CLAIM_IDLE_SECONDS"] * 1000
+        self.max_attempts: int = config["MAX_ATTEMPTS"]
+        # the entries this consumer has read but not acknowledged before a restart
+        self._recovering = True
+
+        for provider in PROVIDERS:
+            try:
+                self.cache.connection.xgroup_create(
+                    stream_key(provider), GROUP, id="0", mkstream=True
+                )
+            except redis.ResponseError as error:
+                if "BUSYGROUP" not in str(error):
+                    raise
+
+    def _read(self, last_id: str, block_ms: int | None) -> dict[str, list]:
+        response = self.cache.connection.xreadgroup(
+            GROUP,
+            self.name,
+            {stream_key(provider): last_id for provider in PROVIDERS},
+            count=self.batch_size,
+            block=block_ms,
+        )
+        return {stream.decode(): entries for stream, entries in response or []}
+
+    def _claim(self) -> dict[str, list]:
+        claimed = {}
+        for provider in PROVIDERS:
+            _, entries, *_ = self.cache.connection.xautoclaim(
+                stream_key(provider),
+                GROUP,
+                self.name,
+                min_idle_time=self.claim_idle_ms,
+                count=self.batch_size,
+            )
+            if entries:
+                claimed[stream_key(provider)] = entries
+
+        return claimed
+
+    def run_once(self, block_ms: int | None = None) -> int:
+        """Apply a batch of every stream, the number of the entries applied."""
+
+        batches = {}
+        if self._recovering:
+            batches = self._read("0", block_ms=None)
+            self._recovering = any(
+                fields for entries in batches.values() for _, fields in entries
+            )
+            if not self._recovering:
+                for stream, entries in batches.items():
+                    self._ack_trimmed(stream, entries)
+        if not self._recovering:
+            batches = self._claim() or self._read(">", block_ms=block_ms)
+
+        applied = 0
+        for stream, entries in batches.items():
+            if entries:
+                applied += self._apply(stream, entries)
+                self._trim(stream)
+
+        return applied
+
+    def _ack_trimmed(self, stream: str, entries: list) -> list:
+        """The pending entries trimmed before they were applied come without fields."""
+
+        trimmed = [entry_id for entry_id, fields in entries if not fields]
+        if trimmed:
+            logger.warning("%s webhook events of %s were trimmed unapplied", len(trimmed), stream)
+            self.cache.connection.xack(stream, GROUP, *trimmed)
+
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    def _apply(self, stream: str, entries: list) -> int:
+        entries = self._ack_trimmed(stream, entries)
+        if not entries:
+            return 0
+
+        provider = stream.removeprefix(f"{NAMESPACE}:")
+        events = [json.loads(fields[b"value"]) for _, fields in entries]
+        try:
+            APPLIERS[provider](events, self.cache)
+            applied = [entry_id for entry_id, _ in entries]
+        except Exception:
+            logger.exception("Webhook batch of %s is not applied, one by one now", provider)
+            applied = self._apply_one_by_one(stream, provider, entries, events)
+
+        if applied:
+            self.cache.connection.xack(stream, GROUP, *applied)
+
+        return len(applied)
+
+    def _apply_one_by_one(self, stream: str, provider: str, entries: list, events: list) -> list:
+        applied = []
+        for (entry_id, _), event in zip(entries, events):
+            try:
+                APPLIERS[provider]([event], self.cache)
+            except Exception as error:
+                self._record_failure(stream, provider, entry_id, event, error)
+            else:
+                applied.append(entry_id)
+
+        return applied
+
+    def _record_failure(
+        self, stream: str, provider: str, entry_id: bytes, event: dict, error: Exception
+    ) -> None:
+        """The event stays pending and is claimed again, `max_attempts` deliveries at most."""
+
+        [pending] = self.cache.connection.xpending_range(
+            stream, GROUP, min=entry_id, max=entry_id, count=1
+        )
+        attempts = pending["times_delivered"]
+        if attempts < self.max_attempts:
+            logger.warning("Webhook event of %s failed, attempt %s: %r", provider, attempts, error)
+            return
+
+        dead = f"{provider}:dead"
+        logger.error(
+            "Webhook event of %s failed %s times, moved to %s:%s",
+            provider,
+            attempts,
+            NAMESPACE,
+            dead,
+        )
+        self.cache.add_to_stream(
+            namespace=NAMESPACE,
+            key=dead,
+            value={"entry_id": entry_id.decode(), "event": event, "error": repr(error)},
+            max_length=_config()["DEAD_MAX_LENGTH"],
+        )
+        self.cache.connection.xack(stream, GROUP, entry_id)
+
+    def _trim(self, stream: str) -> None:
+        """Drop the entries below the oldest one not acknowledged yet."""
+
+        connection = self.cache.connection
+        pending = connection.xpending(stream, GROUP)
+        if pending["pending"]:
+            oldest = pending["min"]
+        else:
+            [group] = [
+                group
+                for group in connection.xinfo_groups(stream)
+                if group["name"] in (GROUP, GROUP.encode())
+            ]
+            oldest = group["last-delivered-id"]
+
+        connection.xtrim(stream, minid=oldest, approximate=False)
+
+    def serve(self) -> None:
+        while True:
+            try:
+                self.run_once(block_ms=self.block_ms)
+            except redis.RedisError as error:
+                logger.warning("Webhook stream read failed: %r", error)
+                time.sleep(self.error_interval)
+            except Exception:
+                logger.exception("Webhook batch is not applied, it is retried later")
+                time.sleep(self.error_interval)
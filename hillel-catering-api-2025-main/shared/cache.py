@@ -3,12 +3,53 @@ Structure:
     set(key: str, value: dict)
     get(key: str)
     delete(key: str)
+    add(key: str, value: dict, ttl) -> bool  # SET NX, e.g. a lock
+    incr(key: str) -> int                    # atomic counter, e.g. a version
+
+    set_many(mapping: dict[str, dict])
+    get_many(keys: list[str])
+    pipeline() -> several commands in one round trip
+
+    set_fields(key: str, mapping: dict)  # HSET, only the passed fields change
+    get_fields(key: str) -> dict         # HGETALL
+    set_blobs(key: str, mapping: dict[str, bytes])  # raw bytes, no JSON, e.g. gzip
+    get_blobs(key: str, fields: list) -> dict       # HMGET, only the needed fields
+    run_script(lua: str, key: str, args: list)  # EVALSHA, atomic on the server
+    get_stream(key: str, start, end) -> list     # XRANGE
+    add_to_stream(key: str, value: dict, max_length: int)  # XADD MAXLEN ~, a capped log
+    publish(key: str, value: dict)               # PUBLISH to the `namespace:key` channel
+
+Every `CacheService` of the process shares one connection pool,
+so creating the service is cheap and no TCP handshake happens per call.
+The Redis URL comes from `settings.CACHE_SERVICE_URL`.
+
+`AsyncCacheService` is the asyncio twin for long-living async processes
+(food.polling), so they do not hop to a thread for every command.
+
+Every command and pipeline reports its latency, and every read its hits
+and misses, per namespace to shared.metrics.
 """
 
+import functools
 import json
+import os
+import time
 from dataclasses import asdict, dataclass
+from threading import Lock
 import redis
-from typing import Any
+import redis.asyncio
+from redis.commands.core import AsyncScript, Script
+from typing import Any, Callable, Iterable
+
+from . import metrics
+
+DEFAULT_URL = "redis://localhost:6379/0"
+
+_connection_pool: redis.ConnectionPool | None = None
+_connection_pool_lock = Lock()
+_scripts: dict[str, Script] = {}
+_async_scripts: dict[str, AsyncScript] = {}
+
 
 @dataclass
 class Structure:
@@ -16,6 +57,212 @@ class Structure:
     name: str
 
 
+def get_cache_url() -> str:
+    from django.conf import settings
+
+    if settings.configured:
+        return getattr(settings, "CACHE_SERVICE_URL", DEFAULT_URL)
+
+    return os.getenv("CACHE_SERVICE_URL", DEFAULT_URL)
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """Return the process-wide connection pool, create it on the first call."""
+
+    global _connection_pool
+
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = redis.ConnectionPool.from_url(get_cache_url())
+
+    return _connection_pool
+
+
+def create_async_connection() -> redis.asyncio.Redis:
+    """A separate asyncio client, e.g. for one long-living pub/sub connection."""
+
+    return redis.asyncio.Redis.from_url(get_cache_url())
+
+
+def _get_script(connection: redis.Redis, lua: str) -> Script:
+    """Register the Lua source once, then it is called by its SHA."""
+
+    script = _scripts.get(lua)
+    if script is None:
+        script = _scripts[lua] = connection.register_script(lua)
+
+    return script
+
+
+def _loads(raw: bytes | None) -> Any:
+    return None if raw is None else json.loads(raw)
+
+
+def _dumps_fields(mapping: dict[str, Any]) -> dict[str, str]:
+    return {field: json.dumps(value) for field, value in mapping.items()}
+
+
+def _loads_fields(raw: dict[bytes, bytes]) -> dict[str, Any]:
+    return {field.decode(): json.loads(value) for field, value in raw.items()}
+
+
+def _is_hit(value: Any) -> bool:
+    # get_blobs of a missing hash is a dict of `None`s
+    if isinstance(value, dict):
+        return any(field is not None for field in value.values())
+    return value is not None
+
+
+def _hits(value: Any) -> tuple[int, int]:
+    return (1, 0) if _is_hit(value) else (0, 1)
+
+
+def _hits_of_many(values: dict[str, Any]) -> tuple[int, int]:
+    hits = sum(value is not None for value in values.values())
+    return hits, len(values) - hits
+
+
+def _measured(operation: str, hits: Callable[[Any], tuple[int, int]] | None = None):
+    """Latency, and hits/misses of a read, of a `CacheService` command per namespace."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, namespace: str, *args, **kwargs):
+            started = time.perf_counter()
+            result = method(self, namespace, *args, **kwargs)
+            metrics.observe_cache(namespace, operation, time.perf_counter() - started)
+            if hits is not None:
+                metrics.count_cache_reads(namespace, *hits(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class CachePipeline:
+    """Buffer commands and send them in one round trip.
+
+    with cache.pipeline() as pipe:
+        pipe.set(namespace='orders', key='17', value={...})
+        pipe.get(namespace='orders', key='17')
+
+    pipe.results -> [True, {...}]
+    """
+
+    def __init__(self, connection: redis.Redis, transaction: bool = False):
+        self._connection = connection
+        self._pipeline = connection.pipeline(transaction=transaction)
+        self._decoders: list[Callable[[Any], Any] | None] = []
+        # for the metrics: every namespace, and (result index, namespace) of every read
+        self._namespaces: set[str] = set()
+        self._reads: list[tuple[int, str]] = []
+        self.results: list[Any] = []
+
+    def __enter__(self) -> "CachePipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.execute()
+        else:
+            self._pipeline.reset()
+
+    def set(self, namespace: str, key: str, value: dict, ttl: int | None = None):
+        self._namespaces.add(namespace)
+        self._pipeline.set(
+            name=CacheService._build_key(namespace, key), value=json.dumps(value), ex=ttl
+        )
+        self._decoders.append(None)
+        return self
+
+    def get(self, namespace: str, key: str):
+        self._namespaces.add(namespace)
+        self._pipeline.get(CacheService._build_key(namespace, key))
+        self._decoders.append(_loads)
+        self._reads.append((len(self._decoders) - 1, namespace))
+        return self
+
+    def delete(self, namespace: str, key: str):
+        self._namespaces.add(namespace)
+        self._pipeline.delete(CacheService._build_key(namespace, key))
+        self._decoders.append(None)
+        return self
+
+    def set_fields(self, namespace: str, key: str, mapping: dict[str, Any]):
+        self._namespaces.add(namespace)
+        self._pipeline.hset(
+            CacheService._build_key(namespace, key), mapping=_dumps_fields(mapping)
+        )
+        self._decoders.append(None)
+        return self
+
+    def get_fields(self, namespace: str, key: str):
+        self._namespaces.add(namespace)
+        self._pipeline.hgetall(CacheService._build_key(namespace, key))
+        self._decoders.append(_loads_fields)
+        self._reads.append((len(self._decoders) - 1, namespace))
+        return self
+
+    def set_blobs(
+        self, namespace: str, key: str, mapping: dict[str, bytes], ttl: int | None = None
+    ):
+        """Replace the whole hash with raw (not JSON encoded) values."""
+
+        self._namespaces.add(namespace)
+        name = CacheService._build_key(namespace, key)
+        self._pipeline.delete(name)
+        self._pipeline.hset(name, mapping=mapping)  # type: ignore
+        self._decoders += [None, None]
+        if ttl is not None:
+            self._pipeline.expire(name, ttl)
+            self._decoders.append(None)
+        return self
+
+    def get_blobs(self, namespace: str, key: str, fields: list[str]):
+        self._namespaces.add(namespace)
+        self._pipeline.hmget(CacheService._build_key(namespace, key), fields)
+        self._decoders.append(lambda values: dict(zip(fields, values)))
+        self._reads.append((len(self._decoders) - 1, namespace))
+        return self
+
+    def publish(self, namespace: str, key: str, value: dict):
+        self._namespaces.add(namespace)
+        self._pipeline.publish(CacheService._build_key(namespace, key), json.dumps(value))
+        self._decoders.append(None)
+        return self
+
+    def run_script(
+        self, lua: str, namespace: str, key: str, args: list, extra_keys: Iterable[str] = ()
+    ):
+        self._namespaces.add(namespace)
+        keys = [CacheService._build_key(namespace, name) for name in (key, *extra_keys)]
+        _get_script(self._connection, lua)(keys=keys, args=args, client=self._pipeline)
+        self._decoders.append(None)
+        return self
+
+    def execute(self) -> list[Any]:
+        started = time.perf_counter()
+        raw_results = self._pipeline.execute()
+        self.results = [
+            decoder(result) if decoder else result
+            for decoder, result in zip(self._decoders, raw_results)
+        ]
+
+        # the namespaces a pipeline mixes are fixed by the code, so the label is bounded
+        metrics.observe_cache(
+            "+".join(sorted(self._namespaces)), "pipeline", time.perf_counter() - started
+        )
+        for index, namespace in self._reads:
+            metrics.count_cache_reads(namespace, *_hits(self.results[index]))
+
+        self._decoders = []
+        self._namespaces = set()
+        self._reads = []
+
+        return self.results
+
 
 class CacheService:
     """
@@ -24,14 +271,15 @@ class CacheService:
     """
 
     def __init__(self):
-        self.connection: redis.Redis = redis.Redis.from_url(
-            "redis://localhost:6379/0"
+        self.connection: redis.Redis = redis.Redis(
+            connection_pool=get_connection_pool()
         )
 
     @staticmethod
     def _build_key(namespace: str, key: str) -> str:
         return f"{namespace}:{key}"
 
+    @_measured("set")
     def set(self, namespace: str, key: str, value: dict, ttl: int | None = None):
         # if not isinstance(value, Structure):
         #     payload = asdict(value)
@@ -42,11 +290,164 @@ class CacheService:
             ex=ttl
         )
 
+    @_measured("get", hits=_hits)
     def get(self, namespace: str, key: str):
         result: str = self.connection.get(  # type: ignore
             self._build_key(namespace, key)
         )
 
-        return json.loads(result)
+        return _loads(result)  # type: ignore
+
+    @_measured("delete")
+    def delete(self, namespace: str, key: str):
+        self.connection.delete(self._build_key(namespace, key))
+
+    @_measured("add")
+    def add(self, namespace: str, key: str, value: Any, ttl: int | None = None) -> bool:
+        """Set the value only if the key does not exist, `False` otherwise."""
+
+        return bool(
+            self.connection.set(
+                self._build_key(namespace, key), json.dumps(value), ex=ttl, nx=True
+            )
+        )
+
+    @_measured("incr")
+    def incr(self, namespace: str, key: str) -> int:
+        """The value is a JSON number, so `get()` reads it back as well."""
+
+        return self.connection.incr(self._build_key(namespace, key))  # type: ignore
+
+    def set_many(
+        self, namespace: str, mapping: dict[str, dict], ttl: int | None = None
+    ) -> None:
+        """Set all values in one round trip (MSET has no TTL, so it is a pipeline)."""
+
+        with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(namespace=namespace, key=key, value=value, ttl=ttl)
+
+    @_measured("get_many", hits=_hits_of_many)
+    def get_many(self, namespace: str, keys: Iterable[str]) -> dict[str, Any]:
+        """Get all values in one round trip. Missing keys are mapped to `None`."""
+
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        results = self.connection.mget([self._build_key(namespace, key) for key in keys])
+
+        return {key: _loads(result) for key, result in zip(keys, results)}
+
+    @_measured("set_fields")
+    def set_fields(self, namespace: str, key: str, mapping: dict[str, Any]) -> None:
+        """Atomically set only the passed fields of the hash, others stay untouched."""
+
+        self.connection.hset(self._build_key(namespace, key), mapping=_dumps_fields(mapping))
+
+    @_measured("get_fields", hits=_hits)
+    def get_fields(self, namespace: str, key: str) -> dict[str, Any]:
+        return _loads_fields(
+            self.connection.hgetall(self._build_key(namespace, key))  # type: ignore
+        )
+
+    def set_blobs(
+        self, namespace: str, key: str, mapping: dict[str, bytes], ttl: int | None = None
+    ) -> None:
+        """Atomically replace the hash, readers never see a mix of old and new fields."""
+
+        with self.pipeline(transaction=True) as pipe:
+            pipe.set_blobs(namespace=namespace, key=key, mapping=mapping, ttl=ttl)
+
+    @_measured("get_blobs", hits=_hits)
+    def get_blobs(
+        self, namespace: str, key: str, fields: list[str]
+    ) -> dict[str, bytes | None]:
+        values = self.connection.hmget(self._build_key(namespace, key), fields)
+        return dict(zip(fields, values))  # type: ignore
+
+    def run_script(
+        self, lua: str, namespace: str, key: str, args: list, extra_keys: Iterable[str] = ()
+    ) -> Any:
+        """Run the Lua script, `key` is KEYS[1], `extra_keys` are KEYS[2...]."""
+
+        started = time.perf_counter()
+        keys = [self._build_key(namespace, name) for name in (key, *extra_keys)]
+        result = _get_script(self.connection, lua)(keys=keys, args=args, client=self.connection)
+        metrics.observe_cache(namespace, "run_script", time.perf_counter() - started)
+
+        return result
+
+    @_measured("get_stream")
+    def get_stream(
+        self,
+        namespace: str,
+        key: str,
+        start: str | int = "-",
+        end: str | int = "+",
+        count: int | None = None,
+    ) -> list[tuple[str, Any]]:
+        """Entries of a stream which values are stored in the `value` field."""
+
+        entries = self.connection.xrange(
+            self._build_key(namespace, key), min=start, max=end, count=count
+        )
+
+        return [
+            (entry_id.decode(), json.loads(fields[b"value"]))
+            for entry_id, fields in entries  # type: ignore
+        ]
+
+    @_measured("add_to_stream")
+    def add_to_stream(self, namespace: str, key: str, value: dict, max_length: int) -> str:
+        """Append to a stream of about `max_length` entries, the oldest are trimmed."""
+
+        entry_id = self.connection.xadd(
+            self._build_key(namespace, key),
+            {"value": json.dumps(value)},
+            maxlen=max_length,
+            approximate=True,
+        )
+
+        return entry_id.decode()  # type: ignore
+
+    @_measured("publish")
+    def publish(self, namespace: str, key: str, value: dict) -> int:
+        """Returns the number of subscribers that received the message."""
+
+        return self.connection.publish(  # type: ignore
+            self._build_key(namespace, key), json.dumps(value)
+        )
+
+    def pipeline(self, transaction: bool = False) -> CachePipeline:
+        return CachePipeline(self.connection, transaction=transaction)
+
+
+class AsyncCacheService:
+    """
+    cache = AsyncCacheService()
+    await cache.get_fields(namespace='orders', key='17') -> {...}
+    await cache.aclose()
+    """
+
+    def __init__(self, connection: redis.asyncio.Redis | None = None):
+        self.connection: redis.asyncio.Redis = connection or create_async_connection()
+
+    async def get_fields(self, namespace: str, key: str) -> dict[str, Any]:
+        return _loads_fields(
+            await self.connection.hgetall(CacheService._build_key(namespace, key))  # type: ignore
+        )
+
+    async def run_script(
+        self, lua: str, namespace: str, key: str, args: list, extra_keys: Iterable[str] = ()
+    ) -> Any:
+        keys = [CacheService._build_key(namespace, name) for name in (key, *extra_keys)]
+
+        script = _async_scripts.get(lua)
+        if script is None:
+            script = _async_scripts[lua] = self.connection.register_script(lua)  # type: ignore
+
+        return await script(keys=keys, args=args, client=self.connection)
 
-    def delete(self, namespace: str, key: str): ...
+    async def aclose(self) -> None:
+        await self.connection.aclose()
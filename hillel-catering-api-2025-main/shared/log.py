@@ -0,0 +1,160 @@
+"""
+Logging off the hot paths: a record is put into a queue, a listener thread
+formats and writes it.
+
+    LOGGING_CONFIG = "shared.log.configure"
+    LOG_LEVEL=INFO LOG_LEVELS="food.polling=DEBUG,shared.queries=WARNING" LOG_FORMAT=json
+
+    logger = logging.getLogger(__name__)
+
+    with bind_order(order.pk):                # the correlation field of every record
+        logger.info("Order is created", extra={"eta": str(order.eta)})
+
+    {"time": "2025-07-01T12:00:00.120", "level": "INFO", "logger": "food.views",
+     "message": "Order is created", "order_id": 17, "eta": "2025-07-02"}
+
+`configure()` applies `settings.LOGGING` and moves the handlers of the root
+logger behind a `QueueHandler`, so a request or a task only pays for a
+`queue.put()`. The order id is taken in the calling thread: from
+`extra={"order_id": ...}`, else from `bind_order()`. Celery tasks called
+with an `order_id` keyword are bound for their run.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.config
+import os
+import queue
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator
+
+from celery import signals
+
+_order_id: ContextVar[int | None] = ContextVar("log_order_id", default=None)
+_listener: QueueListener | None = None
+
+# the attributes of every LogRecord, the rest came with `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+@contextmanager
+def bind_order(order_id: int | None) -> Iterator[None]:
+    token = _order_id.set(order_id)
+    try:
+        yield
+    finally:
+        _order_id.reset(token)
+
+
+class OrderQueueHandler(QueueHandler):
+    """Adds the order id and renders the message and the traceback in the calling thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if getattr(record, "order_id", None) is None:
+            record.order_id = _order_id.get()
+
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # the arguments and the traceback may not be picklable or thread-safe
+        record.msg, record.args, record.exc_info = record.message, None, None
+
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "order_id": getattr(record, "order_id", None),
+        }
+        payload.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES and key not in payload
+        )
+        if record.exc_info and not record.exc_text:  # not through the queue
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+
+        return json.dumps(payload, default=str)
+
+
+def levels(default: str, overrides: str) -> dict[str, dict]:
+    """`"food.polling=DEBUG,shared=WARNING"` -> the `loggers` of `settings.LOGGING`."""
+
+    loggers = {name: {"level": default} for name in ("food", "users", "shared")}
+    for item in filter(None, (item.strip() for item in overrides.split(","))):
+        name, _, level = item.partition("=")
+        loggers[name.strip()] = {"level": level.strip().upper()}
+
+    return loggers
+
+
+def configure(config: dict) -> None:
+    """`LOGGING_CONFIG` of Django: `dictConfig()`, then the root handlers run in a thread."""
+
+    global _listener
+
+    logging.config.dictConfig(config)
+    if _listener is not None:
+        _listener.stop()
+
+    root = logging.getLogger()
+    handler = OrderQueueHandler(queue.SimpleQueue())
+    _listener = QueueListener(handler.queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [handler]
+    _listener.start()
+
+
+def _restart_in_child() -> None:
+    # a forked Celery worker has a copy of the queue, but not the thread
+    if _listener is None:
+        return
+
+    _listener.queue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, OrderQueueHandler):
+            handler.queue = _listener.queue
+    _listener._thread = None
+    _listener.start()
+
+
+def _stop() -> None:
+    # the records still in the queue are written
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+os.register_at_fork(after_in_child=_restart_in_child)
+atexit.register(_stop)
+
+
+@signals.setup_logging.connect
+def _keep_django_logging(**kwargs):
+    """Celery leaves the root logger of `settings.LOGGING` alone."""
+
+
+@signals.task_prerun.connect
+def _task_started(task=None, kwargs=None, **extra):
+    order_id = (kwargs or {}).get("order_id")
+    if order_id is not None:
+        task.request.log_order_token = _order_id.set(order_id)
+
+
+@signals.task_postrun.connect
+def _task_finished(task=None, **kwargs):
+    token = getattr(task.request, "log_order_token", None)
+    if token is not None:
+        _order_id.reset(token)
+        task.request.log_order_token = None
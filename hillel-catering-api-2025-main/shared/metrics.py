@@ -0,0 +1,216 @@
+"""
+Prometheus metrics of the API, the provider calls, the cache and Celery,
+served by `GET /metrics` in the text format:
+
+    api_request_duration_seconds{view="FoodAPIViewSet",action="dishes",status="200"}
+    provider_request_duration_seconds{provider="silpo",operation="create_order"}
+    provider_request_errors_total{provider="silpo",operation="create_order",error="ConnectTimeout"}
+    cache_requests_total{namespace="menu",result="hit"}
+    cache_operation_duration_seconds{namespace="menu",operation="get"}
+    celery_task_duration_seconds{task="food.services.order_in_kfc",queue="default",state="SUCCESS"}
+    celery_task_queue_wait_seconds{task="food.services.order_in_kfc",queue="default"}
+
+A sample is two `perf_counter()` calls and a histogram observe, about a
+microsecond: the labelled children are looked up in a dict, not through
+`labels()` and its lock.
+
+The web and Celery workers are separate processes. Set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the processes of a
+host, so every process writes its samples there and `/metrics` serves them
+all. With METRICS_TOKEN set, `/metrics` requires `Authorization: Bearer <token>`.
+"""
+
+import functools
+import inspect
+import os
+import time
+from typing import Any, Callable
+
+from celery import signals
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Redis answers in well under a millisecond
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+# a task may wait for a free worker for minutes
+QUEUE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Latency of the API views",
+    ["view", "action", "status"],
+)
+PROVIDER_DURATION = Histogram(
+    "provider_request_duration_seconds",
+    "Latency of the restaurant and delivery provider calls",
+    ["provider", "operation"],
+)
+PROVIDER_ERRORS = Counter(
+    "provider_request_errors_total",
+    "Failed restaurant and delivery provider calls",
+    ["provider", "operation", "error"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "CacheService reads by result",
+    ["namespace", "result"],
+)
+CACHE_DURATION = Histogram(
+    "cache_operation_duration_seconds",
+    "Latency of the CacheService commands and pipelines",
+    ["namespace", "operation"],
+    buckets=FAST_BUCKETS,
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Run time of the Celery tasks",
+    ["task", "queue", "state"],
+)
+TASK_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds",
+    "Time between publishing a Celery task and a worker starting it",
+    ["task", "queue"],
+    buckets=QUEUE_BUCKETS,
+)
+
+_children: dict[tuple, Any] = {}
+
+
+def child(metric, *labels: str):
+    """`metric.labels(*labels)`, cached."""
+
+    key = (metric, labels)
+    try:
+        return _children[key]
+    except KeyError:
+        _children[key] = value = metric.labels(*labels)
+        return value
+
+
+def observe_cache(namespace: str, operation: str, seconds: float) -> None:
+    child(CACHE_DURATION, namespace, operation).observe(seconds)
+
+
+def count_cache_reads(namespace: str, hits: int, misses: int) -> None:
+    if hits:
+        child(CACHE_REQUESTS, namespace, "hit").inc(hits)
+    if misses:
+        child(CACHE_REQUESTS, namespace, "miss").inc(misses)
+
+
+class ViewMetricsMixin:
+    """Latency of every action of a DRF viewset.
+
+    class FoodAPIViewSet(ViewMetricsMixin, viewsets.GenericViewSet): ...
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().dispatch(request, *args, **kwargs)
+
+        child(
+            REQUEST_DURATION,
+            type(self).__name__,
+            getattr(self, "action", None) or request.method.lower(),
+            str(response.status_code),
+        ).observe(time.perf_counter() - started)
+
+        return response
+
+
+def provider_call(provider: str, operation: str):
+    """Latency and errors of a provider client method, sync or async.
+
+    @classmethod
+    @provider_call("silpo", "create_order")
+    def create_order(cls, order): ...
+    """
+
+    def decorator(function: Callable):
+        duration = child(PROVIDER_DURATION, provider, operation)
+
+        def failed(error: Exception) -> None:
+            child(PROVIDER_ERRORS, provider, operation, type(error).__name__).inc()
+
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                except Exception as error:
+                    failed(error)
+                    raise
+                finally:
+                    duration.observe(time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception as error:
+                failed(error)
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def _task_queue(task) -> str:
+    return getattr(task, "queue", None) or task.app.conf.task_default_queue
+
+
+@signals.before_task_publish.connect
+def _stamp_published_at(headers: dict | None = None, **kwargs):
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+@signals.task_prerun.connect
+def _task_started(task=None, **kwargs):
+    request = task.request
+    published_at = getattr(request, "published_at", None)
+    if published_at is not None:  # not set for the eager tasks
+        child(TASK_QUEUE_WAIT, task.name, _task_queue(task)).observe(
+            max(time.time() - published_at, 0)
+        )
+    request.metrics_started = time.perf_counter()
+
+
+@signals.task_postrun.connect
+def _task_finished(task=None, state=None, **kwargs):
+    started = getattr(task.request, "metrics_started", None)
+    if started is not None:
+        child(TASK_DURATION, task.name, _task_queue(task), state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
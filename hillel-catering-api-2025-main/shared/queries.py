@@ -0,0 +1,250 @@
+"""
+SQL query budgets of the views and Celery tasks, and the N+1 detector.
+
+    @action(methods=["get", "post"], detail=False)
+    @query_budget(get=2, post=6)     # or @query_budget(3) for every method
+    def orders(self, request): ...
+
+    @celery_app.task(query_budget=4)
+    def order_delivery(order_id): ...
+
+`QueryBudgetMiddleware` and the Celery signals below count the queries of a
+sampled request or task (`settings.QUERY_BUDGET["SAMPLE_RATE"]`) and group
+them by shape: the SQL with its parameters and numbers masked, so
+`WHERE id = 1` and `WHERE id = 2` are one shape. A SELECT shape run
+`settings.QUERY_BUDGET["REPEATED"]` times or more is an N+1. A budget
+includes the JWT authentication query. Both an
+exceeded budget and an N+1 are printed; with `STRICT` (the tests) an
+exceeded budget raises `QueryBudgetExceeded`.
+
+In tests, check any block of code:
+
+    with assert_query_budget(3):
+        client.get("/food/orders/")
+
+A request or a task not sampled costs a `random()`; a query costs a
+context variable lookup.
+"""
+
+import logging
+import random
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery import signals
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+_NUMBERS = re.compile(r"\b\d+\b")
+_PLACEHOLDERS = re.compile(r"%s(, %s)+")
+_MAX_SHAPE_LENGTH = 300
+# the savepoints of `transaction.atomic()` inside the test transactions
+_NOT_COUNTED = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class QueryRecorder:
+    parent: "QueryRecorder | None" = None
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return self.shapes.total()
+
+    def repeated(self) -> dict[str, int]:
+        """The N+1s: shape -> times. Only reads, batches of a bulk insert are fine."""
+
+        times = settings.QUERY_BUDGET["REPEATED"]
+        return {
+            shape: count
+            for shape, count in self.shapes.items()
+            if count >= times and shape.startswith("SELECT")
+        }
+
+    def report(self, name: str, budget: int | None) -> str | None:
+        """What is wrong, None if nothing is."""
+
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries, the budget is {budget}")
+        for shape, count in self.repeated().items():
+            problems.append(f"{count} times: {shape[:_MAX_SHAPE_LENGTH]}")
+
+        return f"{name}: " + "; ".join(problems) if problems else None
+
+
+_recorder: ContextVar[QueryRecorder | None] = ContextVar("query_recorder", default=None)
+
+
+def shape(sql: str) -> str:
+    """`SELECT ... WHERE id IN (%s, %s) LIMIT 21` -> `SELECT ... WHERE id IN (%s...) LIMIT ?`"""
+
+    return _NUMBERS.sub("?", _PLACEHOLDERS.sub("%s...", sql))
+
+
+def _record(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is not None and not sql.startswith(_NOT_COUNTED):
+        key = shape(sql)
+        while recorder is not None:  # the enclosing recordings count it too
+            recorder.shapes[key] += 1
+            recorder = recorder.parent
+
+    return execute(sql, params, many, context)
+
+
+def _install(connection) -> None:
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+@connection_created.connect
+def _install_on_connect(connection=None, **kwargs):
+    # the connections of other threads, e.g. of `sync_to_async`
+    _install(connection)
+
+
+@contextmanager
+def recording(nested: bool = True) -> Iterator[QueryRecorder]:
+    """Count the queries of the block, by shape, and in the enclosing recording if `nested`."""
+
+    for connection in connections.all():
+        _install(connection)
+
+    recorder = QueryRecorder(parent=_recorder.get() if nested else None)
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def assert_query_budget(queries: int | None = None, allow_repeated: bool = False):
+    """Fail if the block runs more than `queries` queries, or an N+1."""
+
+    with recording() as recorder:
+        yield recorder
+
+    over = queries is not None and recorder.count > queries
+    if over or (not allow_repeated and recorder.repeated()):
+        raise QueryBudgetExceeded(recorder.report("the block", queries))
+
+
+def query_budget(queries: int | None = None, **methods: int) -> Callable:
+    """Declare the budget of a view, a viewset action or a method of it."""
+
+    def decorator(view: Callable) -> Callable:
+        view.query_budget = {"*": queries, **{method.lower(): n for method, n in methods.items()}}
+        return view
+
+    return decorator
+
+
+def _sampled() -> bool:
+    rate = settings.QUERY_BUDGET["SAMPLE_RATE"]
+    return rate >= 1 or random.random() < rate
+
+
+def _check(name: str, recorder: QueryRecorder, budget: int | None) -> None:
+    report = recorder.report(name, budget)
+    if report is None:
+        return
+
+    over = budget is not None and recorder.count > budget
+    if over and settings.QUERY_BUDGET["STRICT"]:
+        raise QueryBudgetExceeded(report)
+
+    logger.warning("SQL query budget: %s", report)
+
+
+def view_budget(request: HttpRequest) -> tuple[str, int | None]:
+    """The name of the view and its budget for the method of the request."""
+
+    match = request.resolver_match
+    if match is None:
+        return request.path, None
+
+    method = request.method.lower()
+    view = match.func
+    viewset = getattr(view, "cls", None)
+
+    if viewset is not None:
+        action = getattr(view, "actions", {}).get(method) or method
+        name = f"{viewset.__name__}.{action}"
+        view = getattr(viewset, action, None)
+    else:
+        name = match.view_name or view.__name__
+
+    budgets = getattr(view, "query_budget", {})
+    return name, budgets.get(method, budgets.get("*"))
+
+
+class QueryBudgetMiddleware:
+    """Count the queries of the sampled requests against the view budgets."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+
+        with recording() as recorder:
+            response = self.get_response(request)
+
+        name, budget = view_budget(request)
+        _check(name, recorder, budget)
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+
+        # the queries of `sync_to_async` are counted: it copies the context
+        with recording() as recorder:
+            response = await self.get_response(request)
+
+        name, budget = view_budget(request)
+        _check(name, recorder, budget)
+        return response
+
+
+@signals.task_prerun.connect
+def _task_started(task=None, **kwargs):
+    if _sampled():
+        # an eager task does not count against the budget of its request
+        task.request.query_recording = recording(nested=False)
+        task.request.query_recorder = task.request.query_recording.__enter__()
+
+
+@signals.task_postrun.connect
+def _task_finished(task=None, **kwargs):
+    recording_ = getattr(task.request, "query_recording", None)
+    if recording_ is None:
+        return
+
+    recording_.__exit__(None, None, None)
+    task.request.query_recording = None
+    _check(task.name, task.request.query_recorder, getattr(task, "query_budget", None))
@@ -0,0 +1,244 @@
+"""
+Slow SQL queries of the views and Celery tasks, with their plans, for the admins.
+
+    SLOW_QUERIES = {
+        "ENABLED": True,              # opt-in, nothing is installed otherwise
+        "THRESHOLD_MS": 200,          # a query this slow is kept
+        "EXPLAIN_RATE": 0.1,          # the share of slow SELECTs explained
+        "EXPLAIN_INTERVAL_SECONDS": 600,  # one plan per query shape per interval
+        "MAX_ENTRIES": 500,           # the oldest are trimmed
+    }
+
+A database execution wrapper times every query. A slow one goes to the
+capped `slow_queries:log` stream (CacheService) with the view
+(`FoodAPIViewSet.orders`) or the task (`food.services.order_delivery`) that
+ran it. A sampled slow SELECT is run again under
+`EXPLAIN (ANALYZE, BUFFERS)` on Postgres (`EXPLAIN QUERY PLAN` on SQLite),
+at most once per shape (shared.queries.shape) and interval: the plan costs
+as much as the query itself.
+
+    GET /admin/slow-queries/   # staff only, the newest first
+
+A query below the threshold costs two `perf_counter()` calls.
+"""
+
+import hashlib
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Any
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery import signals
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponseBadRequest
+from django.shortcuts import render
+
+from .cache import CacheService
+from .queries import shape, view_budget
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "slow_queries"
+EXPLAIN = {
+    "postgresql": "EXPLAIN (ANALYZE, BUFFERS) ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+# the request or the task name that runs the queries
+_source: ContextVar[HttpRequest | str | None] = ContextVar("slow_query_source", default=None)
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+
+def _config() -> dict:
+    return settings.SLOW_QUERIES
+
+
+def source_name() -> str | None:
+    source = _source.get()
+    if isinstance(source, HttpRequest):
+        return view_budget(source)[0]
+
+    return source
+
+
+def explain(connection, sql: str, params) -> str | None:
+    """The plan of a SELECT, None for other statements and databases."""
+
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith("SELECT"):
+        return None
+
+    token = _explaining.set(True)
+    try:
+        # a failed EXPLAIN must not break the transaction of the request
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except DatabaseError as error:
+        return f"EXPLAIN failed: {error}"
+    finally:
+        _explaining.reset(token)
+
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+def _should_explain(sql_shape: str, cache: CacheService) -> bool:
+    config = _config()
+    if random.random() >= config["EXPLAIN_RATE"]:
+        return False
+
+    digest = hashlib.sha1(sql_shape.encode()).hexdigest()
+    return cache.add(
+        namespace=NAMESPACE,
+        key=f"explained:{digest}",
+        value=1,
+        ttl=config["EXPLAIN_INTERVAL_SECONDS"],
+    )
+
+
+def _save(connection, sql: str, params, many: bool, seconds: float) -> None:
+    cache = CacheService()
+    sql_shape = shape(sql)
+
+    try:
+        plan = None
+        if not many and _should_explain(sql_shape, cache):
+            plan = explain(connection, sql, params)
+
+        cache.add_to_stream(
+            namespace=NAMESPACE,
+            key="log",
+            value={
+                "at": time.time(),
+                "duration_ms": round(seconds * 1000, 1),
+                "source": source_name(),
+                "database": connection.alias,
+                "sql": sql_shape,
+                "plan": plan,
+            },
+            max_length=_config()["MAX_ENTRIES"],
+        )
+    except redis.RedisError as error:
+        logger.warning("Slow query of %.3fs is not saved: %r", seconds, error)
+
+
+def _time(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    seconds = time.perf_counter() - started
+
+    if seconds * 1000 >= _config()["THRESHOLD_MS"]:
+        _save(context["connection"], sql, params, many, seconds)
+
+    return result
+
+
+def _install(connection) -> None:
+    if _time not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time)
+
+
+def install() -> None:
+    """Time the queries of the connections of this thread and of the new ones."""
+
+    for connection in connections.all():
+        _install(connection)
+    connection_created.connect(_install_on_connect)
+
+
+def _install_on_connect(connection=None, **kwargs):
+    _install(connection)
+
+
+def get_entries(count: int | None = None) -> list[dict]:
+    """The newest first."""
+
+    entries = CacheService().get_stream(namespace=NAMESPACE, key="log")
+    entries.reverse()
+
+    return [value for _, value in entries[:count]]
+
+
+class SlowQueryMiddleware:
+    """Names the view of the slow queries, installs the timing if enabled."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _config()["ENABLED"]:
+            raise MiddlewareNotUsed()
+        install()
+
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = _source.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _source.reset(token)
+
+    async def __acall__(self, request):
+        token = _source.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _source.reset(token)
+
+
+@signals.worker_process_init.connect
+@signals.worker_init.connect
+def _worker_started(**kwargs):
+    if _config()["ENABLED"]:
+        install()
+
+
+@signals.task_prerun.connect
+def _task_started(task=None, **kwargs):
+    task.request.slow_query_source = _source.set(task.name)
+
+
+@signals.task_postrun.connect
+def _task_finished(task=None, **kwargs):
+    token = getattr(task.request, "slow_query_source", None)
+    if token is not None:
+        _source.reset(token)
+
+
+@staff_member_required
+def slow_queries_view(request: HttpRequest):
+    try:
+        count = int(request.GET.get("count", 100))
+    except ValueError:
+        count = 0
+    # no more entries are kept anyway
+    if not 1 <= count <= _config()["MAX_ENTRIES"]:
+        return HttpResponseBadRequest(f"count must be from 1 to {_config()['MAX_ENTRIES']}")
+
+    entries: list[dict[str, Any]] = get_entries(count=count)
+    for entry in entries:
+        entry["at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["at"]))
+
+    return render(
+        request,
+        "admin/slow_queries.html",
+        {"title": "Slow SQL queries", "entries": entries, "config": _config()},
+    )
@@ -0,0 +1,195 @@
+"""
+Round trips and latency of the CacheService hot paths.
+
+    python -m tests.benchmarks.bench_cache                      # fakeredis
+    python -m tests.benchmarks.bench_cache --rtt-ms 0.5         # + simulated network
+    python -m tests.benchmarks.bench_cache --url redis://localhost:6379/0
+
+before: a new client per CacheService, one request per command
+after:  the shared connection pool, pipelines and get_many/set_many;
+        the kfc order runs `food.services.save_kfc_order` as it ships
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+import fakeredis
+import redis
+from redis.client import Pipeline
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from food.enums import OrderStatus  # noqa: E402
+from food.services import save_kfc_order  # noqa: E402
+from food.tracking import TrackingOrder, TrackingOrderStore  # noqa: E402
+from shared import cache as cache_module  # noqa: E402
+from shared.cache import CacheService  # noqa: E402
+
+ORDER = {
+    "restaurants": {
+        "1": {"external_id": "ext-1", "status": "cooked"},
+        "2": {"external_id": "ext-2", "status": "cooked"},
+    },
+    "delivery": {},
+}
+
+
+class RoundTrips:
+    """Count requests sent to Redis and optionally delay each of them."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.total = 0
+        self.counting = True
+
+    @contextmanager
+    def paused(self):
+        """Setup of an iteration, not a part of the measured path."""
+
+        self.counting = False
+        try:
+            yield
+        finally:
+            self.counting = True
+
+    @contextmanager
+    def patch(self):
+        execute_command = redis.Redis.execute_command
+        execute = Pipeline.execute
+        counter = self
+
+        def counted_execute_command(self, *args, **options):
+            if not isinstance(self, Pipeline):
+                counter.hit()
+            return execute_command(self, *args, **options)
+
+        def counted_execute(self, *args, **kwargs):
+            counter.hit()
+            return execute(self, *args, **kwargs)
+
+        redis.Redis.execute_command = counted_execute_command
+        Pipeline.execute = counted_execute
+        try:
+            yield self
+        finally:
+            redis.Redis.execute_command = execute_command
+            Pipeline.execute = execute
+
+    def hit(self):
+        if not self.counting:
+            return
+        self.total += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+
+def kfc_order_before(new_connection):
+    """`order_in_kfc` + `all_orders_cooked` as they used to talk to Redis."""
+
+    connection = new_connection()
+    connection.set("orders:17", json.dumps(ORDER))
+    connection.set("kfc_orders:ext-2", json.dumps({"internal_order_id": 17}))
+
+    connection = new_connection()  # all_orders_cooked() made its own service
+    json.loads(connection.get("orders:17"))
+
+    connection.set("orders:17", json.dumps(ORDER))
+
+
+def kfc_order_setup():
+    TrackingOrderStore().create(
+        order_id=17,
+        tracking_order=TrackingOrder(
+            restaurants={
+                "1": {"external_id": "ext-1", "status": OrderStatus.COOKED},
+                "2": {"external_id": None, "status": OrderStatus.NOT_STARTED},
+            }
+        ),
+    )
+
+
+def kfc_order_after():
+    result = save_kfc_order(
+        CacheService(),
+        order_id=17,
+        restaurant_id=2,
+        external_id="ext-2",
+        status=OrderStatus.COOKED,
+    )
+    assert result.applied and result.all_cooked
+
+
+def activations_before(new_connection, keys):
+    connection = new_connection()
+    for key in keys:
+        connection.get(f"activation:{key}")
+
+
+def activations_after(keys):
+    CacheService().get_many(namespace="activation", keys=keys)
+
+
+def run(label: str, counter: RoundTrips, iterations: int, call, setup=None) -> None:
+    timings = []
+    counter.total = 0
+
+    for _ in range(iterations):
+        if setup is not None:
+            with counter.paused():
+                setup()
+
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(
+        f"{label:<36} round trips/op: {counter.total / iterations:>5.1f}  "
+        f"p50: {statistics.median(timings):.3f}ms  "
+        f"p99: {timings[int(len(timings) * 0.99) - 1]:.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="real Redis, fakeredis if omitted")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.url:
+        pool = redis.ConnectionPool.from_url(args.url)
+
+        def new_connection():
+            return redis.Redis.from_url(args.url)
+
+    else:
+        server = fakeredis.FakeServer()
+        pool = fakeredis.FakeRedis(server=server).connection_pool
+
+        def new_connection():
+            return fakeredis.FakeRedis(server=server)
+
+    cache_module.get_connection_pool = lambda: pool
+    keys = [str(key) for key in range(20)]
+    counter = RoundTrips(rtt=args.rtt_ms / 1000)
+
+    with counter.patch():
+        run("kfc order, before", counter, args.iterations,
+            lambda: kfc_order_before(new_connection))
+        run("kfc order, after (CAS + mapping)", counter, args.iterations,
+            kfc_order_after, setup=kfc_order_setup)
+        run("20 activation keys, before", counter, args.iterations,
+            lambda: activations_before(new_connection, keys))
+        run("20 activation keys, after (get_many)", counter, args.iterations,
+            lambda: activations_after(keys))
+
+
+if __name__ == "__main__":
+    main()
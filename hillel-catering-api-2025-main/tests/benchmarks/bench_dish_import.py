@@ -0,0 +1,98 @@
+"""
+Dish import of a generated 100k-row dishes.csv.
+
+    python manage.py migrate
+    python -m tests.benchmarks.bench_dish_import --rows 100000
+
+before: a `Restaurant.objects.get(name__icontains=...)` and a
+        `Dish.objects.create` per row (only `--before-rows` of the file,
+        the total is extrapolated)
+after:  `food.importers.DishImporter`, one lookup map and chunked bulk_create
+
+The benchmark restaurants and their dishes are deleted at the end.
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from itertools import islice
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from food.importers import DishImporter  # noqa: E402
+from food.models import Dish, Restaurant  # noqa: E402
+
+PREFIX = "bench-restaurant"
+
+
+def restaurant_name(index: int) -> str:
+    # zero padded, so "...-1" does not match "...-10" by icontains
+    return f"{PREFIX}-{index:04d}"
+
+
+def generate(path: str, rows: int, restaurants: int) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "price", "restaurant"])
+        for index in range(rows):
+            writer.writerow(
+                [f"Dish {index}", random.randint(100, 5000), restaurant_name(index % restaurants)]
+            )
+
+
+def import_before(path: str, rows: int) -> None:
+    with open(path) as file:
+        for row in islice(csv.DictReader(file), rows):
+            restaurant = Restaurant.objects.get(name__icontains=row["restaurant"].lower())
+            Dish.objects.create(name=row["name"], price=int(row["price"]), restaurant=restaurant)
+
+
+def report(label: str, rows: int, seconds: float, queries: int, total_rows: int) -> None:
+    print(
+        f"{label:<8} rows: {rows:>7}  {seconds:>7.2f}s  {rows / seconds:>9.0f} rows/s  "
+        f"queries: {queries:>6}  for {total_rows} rows: ~{seconds * total_rows / rows:.1f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--restaurants", type=int, default=50)
+    parser.add_argument("--before-rows", type=int, default=2000)
+    parser.add_argument("--path", default=os.path.join(tempfile.gettempdir(), "dishes.csv"))
+    args = parser.parse_args()
+
+    generate(args.path, args.rows, args.restaurants)
+    Restaurant.objects.bulk_create(
+        Restaurant(name=restaurant_name(index), address="bench")
+        for index in range(args.restaurants)
+    )
+    print(f"{args.path}: {os.path.getsize(args.path) / 1024 / 1024:.1f} MB")
+
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            import_before(args.path, args.before_rows)
+            elapsed = time.perf_counter() - started
+        report("before", args.before_rows, elapsed, len(queries), args.rows)
+
+        with CaptureQueriesContext(connection) as queries, open(args.path, "rb") as file:
+            started = time.perf_counter()
+            result = DishImporter().run(file)
+            elapsed = time.perf_counter() - started
+        report("after", result.created, elapsed, len(queries), args.rows)
+    finally:
+        Restaurant.objects.filter(name__startswith=PREFIX).delete()
+
+
+if __name__ == "__main__":
+    main()
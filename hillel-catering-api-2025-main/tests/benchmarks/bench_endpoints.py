@@ -0,0 +1,343 @@
+"""
+Latency of the main API flows, saved as a JSON baseline and compared.
+
+    python -m tests.benchmarks.bench_endpoints run --output baseline.json
+    ...                                                       # change the code
+    python -m tests.benchmarks.bench_endpoints run --output current.json
+    python -m tests.benchmarks.bench_endpoints compare baseline.json current.json --threshold 10
+
+The app runs against a fresh test database (`test_<DJANGO_DB_NAME>`),
+fakeredis (or `--redis-url`) and the Silpo/KFC/Uber stand-ins of
+tests/providers in this process. Requests go through the whole Django
+stack (middleware, JWT authentication, routing) with the test client, not
+the network.
+
+Celery tasks are published to an in-memory broker, a client waits only for
+that. With `--eager` they run in the request, so creating an order includes
+the calls to the provider stand-ins.
+
+`compare` exits with 1 if a flow is slower than in the baseline by more
+than `--threshold` percent of `--metric`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client  # noqa: E402
+
+from food import menu  # noqa: E402
+from food.enums import OrderStatus  # noqa: E402
+from food.models import Dish, Order, Restaurant  # noqa: E402
+from food.tracking import TrackingOrder, TrackingOrderStore  # noqa: E402
+from shared.cache import CacheService  # noqa: E402
+from tests.benchmarks.harness import stand_ins, test_database, use_redis  # noqa: E402
+from users.models import Role, User  # noqa: E402
+from users.services import ActivationService  # noqa: E402
+
+PASSWORD = "bench-password"
+KFC_WEBHOOK_URL = "/webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/"
+LOCATIONS_PER_WEBHOOK = 50
+METRICS = ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+
+
+@dataclass
+class Flow:
+    name: str
+    request: Callable[[int], HttpResponse]  # the number of the iteration
+    status: int
+
+
+@dataclass
+class FlowResult:
+    requests: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    rps: float
+
+
+def token_client(email: str) -> Client:
+    """A test client with the JWT of `auth/token/`."""
+
+    response = Client().post("/auth/token/", {"email": email, "password": PASSWORD})
+    assert response.status_code == 200, response.content
+
+    return Client(headers={"Authorization": f"Bearer {response.json()['access']}"})
+
+
+def create_user(email: str, phone_number: str, role: Role = Role.CUSTOMER) -> User:
+    return User.objects.create(
+        email=email,
+        phone_number=phone_number,
+        password=make_password(PASSWORD),
+        role=role,
+        is_active=True,
+    )
+
+
+def seed(iterations: int, orders: int) -> list[Flow]:
+    cache = CacheService()
+    customer = create_user("customer@bench.com", "+38000001")
+    create_user("admin@bench.com", "+38000002", role=Role.ADMIN)
+    customer_client = token_client("customer@bench.com")
+    admin_client = token_client("admin@bench.com")
+
+    restaurants = Restaurant.objects.bulk_create(
+        Restaurant(name=name, address="Kyiv")
+        for name in ["Silpo", "KFC"] + [f"Restaurant {index}" for index in range(48)]
+    )
+    dishes = Dish.objects.bulk_create(
+        Dish(name=f"Dish {index}", price=100 + index, restaurant=restaurant)
+        for restaurant in restaurants
+        for index in range(40)
+    )
+    menu.bump_version()  # bulk_create sends no signals
+    kfc = restaurants[1]
+    order_items = [
+        {"dish": dishes[0].pk, "quantity": 2},  # Silpo
+        {"dish": dishes[40].pk, "quantity": 1},  # KFC
+        {"dish": dishes[41].pk, "quantity": 3},
+    ]
+
+    # the orders list
+    listed = Order.objects.bulk_create(
+        Order(user=customer, eta=date.today(), total=100) for _ in range(orders)
+    )
+
+    # a KFC order waiting for its webhook per iteration
+    for index, order in enumerate(listed[:iterations]):
+        tracking_order = TrackingOrder()
+        tracking_order.restaurants[str(kfc.pk)] = {
+            "external_id": f"kfc-{index}",
+            "status": OrderStatus.NOT_STARTED,
+        }
+        TrackingOrderStore(cache).create(order_id=order.pk, tracking_order=tracking_order)
+        cache.set(
+            namespace="kfc_orders",
+            key=f"kfc-{index}",
+            value={"internal_order_id": order.pk, "restaurant_id": kfc.pk},
+        )
+
+    # an inactive user and the key of the activation email per iteration
+    activation_keys = []
+    for index in range(iterations):
+        user = User.objects.create(
+            email=f"inactive{index}@bench.com", phone_number=f"+37{index:07d}"
+        )
+        key = str(uuid.uuid4())
+        ActivationService().save_activation_information(user_id=user.pk, activation_key=key)
+        activation_keys.append(key)
+
+    def locations(index: int) -> str:
+        return json.dumps(
+            {
+                "locations": [
+                    {"order_id": listed[(index + point) % orders].pk, "lat": 46.48, "lng": 30.72}
+                    for point in range(LOCATIONS_PER_WEBHOOK)
+                ]
+            }
+        )
+
+    return [
+        Flow(
+            "POST /food/orders/",
+            lambda index: customer_client.post(
+                "/food/orders/",
+                {
+                    "items": order_items,
+                    "eta": str(date.today() + timedelta(days=1)),
+                    "delivery_provider": "uber",
+                },
+                content_type="application/json",
+            ),
+            201,
+        ),
+        Flow(
+            "GET /food/dishes/",
+            lambda index: customer_client.get("/food/dishes/", HTTP_ACCEPT_ENCODING="gzip, br"),
+            200,
+        ),
+        Flow(
+            "GET /food/orders/ offset",
+            lambda index: admin_client.get("/food/orders/", {"limit": 100, "offset": 100}),
+            200,
+        ),
+        Flow(
+            "GET /food/orders/ cursor",
+            lambda index: admin_client.get("/food/orders/", {"pagination": "cursor", "limit": 100}),
+            200,
+        ),
+        Flow(
+            "POST kfc webhook",
+            lambda index: Client().post(
+                KFC_WEBHOOK_URL, {"id": f"kfc-{index}", "status": "finished"}
+            ),
+            200,
+        ),
+        Flow(
+            "POST uber webhook",
+            lambda index: Client().post(
+                "/api/uber/webhook/", locations(index), content_type="application/json"
+            ),
+            200,
+        ),
+        Flow(
+            "POST /users/",
+            lambda index: Client().post(
+                "/users/",
+                {
+                    "email": f"new{index}@bench.com",
+                    "phone_number": f"+36{index:07d}",
+                    "first_name": "John",
+                    "last_name": "Doe",
+                    "password": PASSWORD,
+                },
+            ),
+            201,
+        ),
+        Flow(
+            "POST /users/activate/",
+            lambda index: Client().post("/users/activate/", {"key": activation_keys[index]}),
+            204,
+        ),
+    ]
+
+
+def measure(flow: Flow, iterations: int, warmup: int) -> FlowResult:
+    timings = []
+
+    for index in range(warmup + iterations):
+        started = time.perf_counter()
+        response = flow.request(index)
+        elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code == flow.status, (
+            flow.name,
+            response.status_code,
+            response.content,
+        )
+
+        if index >= warmup:
+            timings.append(elapsed)
+
+    timings.sort()
+    mean = statistics.fmean(timings)
+
+    return FlowResult(
+        requests=iterations,
+        mean_ms=round(mean, 3),
+        p50_ms=round(statistics.median(timings), 3),
+        p95_ms=round(timings[int(len(timings) * 0.95) - 1], 3),
+        p99_ms=round(timings[int(len(timings) * 0.99) - 1], 3),
+        rps=round(1000 / mean, 1),
+    )
+
+
+def run(args) -> None:
+    # nothing consumes the tasks unless they run in the request,
+    # Celery reads the CELERY_* settings on the first task sent
+    settings.CELERY_BROKER_URL = "memory://"
+    settings.CELERY_RESULT_BACKEND = "cache+memory://"
+    settings.CELERY_TASK_ALWAYS_EAGER = args.eager
+    use_redis(args.redis_url)
+
+    with test_database(), stand_ins():
+        flows = seed(iterations=args.warmup + args.iterations, orders=args.orders)
+        results = {}
+        for flow in flows:
+            results[flow.name] = result = measure(flow, args.iterations, args.warmup)
+            print(
+                f"{flow.name:<28} p50: {result.p50_ms:>8.3f}ms  p95: {result.p95_ms:>8.3f}ms  "
+                f"p99: {result.p99_ms:>8.3f}ms  {result.rps:>8.1f} req/s"
+            )
+        vendor = connection.vendor
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "database": vendor,
+        "redis": args.redis_url or "fakeredis",
+        "eager": args.eager,
+        "iterations": args.iterations,
+        "flows": {name: asdict(result) for name, result in results.items()},
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    print(f"saved to {args.output}")
+
+
+def compare(args) -> int:
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    regressions = 0
+    print(f"{'flow':<28} {'baseline':>10} {'current':>10} {'change':>8}  ({args.metric})")
+
+    for name, before in baseline["flows"].items():
+        after = current["flows"].get(name)
+        if after is None:
+            print(f"{name:<28} {before[args.metric]:>10.3f} {'-':>10}   missing")
+            continue
+
+        change = (after[args.metric] - before[args.metric]) / before[args.metric] * 100
+        slower = change > args.threshold
+        regressions += slower
+        print(
+            f"{name:<28} {before[args.metric]:>10.3f} {after[args.metric]:>10.3f} "
+            f"{change:>+7.1f}%{'  REGRESSION' if slower else ''}"
+        )
+
+    for name in current["flows"].keys() - baseline["flows"].keys():
+        print(f"{name:<28} {'-':>10} {current['flows'][name][args.metric]:>10.3f}   new")
+
+    print(f"{regressions} flow(s) slower by more than {args.threshold}%")
+
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="measure the flows and save the results")
+    run_parser.add_argument("--output", default="bench_endpoints.json")
+    run_parser.add_argument("--iterations", type=int, default=200)
+    run_parser.add_argument("--warmup", type=int, default=20)
+    run_parser.add_argument("--orders", type=int, default=2000, help="in the orders list")
+    run_parser.add_argument("--redis-url", default=None, help="real Redis, fakeredis if omitted")
+    run_parser.add_argument("--eager", action="store_true", help="run Celery tasks in the request")
+
+    compare_parser = commands.add_parser("compare", help="flag the regressions of a run")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    compare_parser.add_argument("--metric", choices=METRICS, default="p50_ms")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Request latency under load with the logging off, written in the request
+thread, and written by the shared.log listener thread.
+
+    python -m tests.benchmarks.bench_logging --threads 8 --requests 500
+    python -m tests.benchmarks.bench_logging --write-delay-ms 1   # a blocked stdout pipe
+
+`--threads` clients post courier locations to the Uber webhook at once
+through the whole Django stack (test client, fakeredis); every request
+writes `--records` JSON records to `--log-file`. `--write-delay-ms` holds
+every write as a full pipe or a slow log driver does.
+
+off:   the food loggers at WARNING, nothing is written
+sync:  the handler in the request thread, as `print()` was
+queue: `settings.LOGGING` as it ships, a `queue.put()` per record
+"""
+
+import argparse
+import json
+import logging
+import logging.config
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from shared import log  # noqa: E402
+from tests.benchmarks.harness import use_redis  # noqa: E402
+
+LOCATIONS = json.dumps(
+    {"locations": [{"order_id": 1, "lat": 46.48, "lng": 30.72} for _ in range(10)]}
+)
+logger = logging.getLogger("food.bench")
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, filename: str, delay_ms: float):
+        super().__init__(filename)
+        self.delay = delay_ms / 1000
+
+    def emit(self, record):
+        super().emit(record)
+        if self.delay:
+            time.sleep(self.delay)
+
+
+def logging_config(log_file: str, level: str, delay_ms: float) -> dict:
+    config = {
+        **settings.LOGGING,
+        "handlers": {
+            "file": {
+                "()": SlowFileHandler,
+                "filename": log_file,
+                "delay_ms": delay_ms,
+                "formatter": "json",
+            },
+        },
+        "root": {"handlers": ["file"], "level": "WARNING"},
+    }
+    config["loggers"] = {**config["loggers"], "food": {"level": level}}
+
+    return config
+
+
+def apply(mode: str, args) -> None:
+    if mode == "queue":
+        log.configure(logging_config(args.log_file, "DEBUG", args.write_delay_ms))
+        return
+
+    level = "DEBUG" if mode == "sync" else "WARNING"
+    logging.config.dictConfig(logging_config(args.log_file, level, args.write_delay_ms))
+
+
+def run(mode: str, args) -> dict:
+    apply(mode, args)
+    client = Client()
+
+    def request(index: int) -> float:
+        started = time.perf_counter()
+        response = client.post("/api/uber/webhook/", LOCATIONS, content_type="application/json")
+        for record in range(args.records - 1):
+            logger.info("Courier location stored", extra={"record": record, "request": index})
+        elapsed = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, response.content
+
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(request, range(args.warmup)))
+
+        started = time.perf_counter()
+        timings = sorted(executor.map(request, range(args.requests)))
+        seconds = time.perf_counter() - started
+
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+        "p99": timings[int(len(timings) * 0.99) - 1],
+        "rps": len(timings) / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--records", type=int, default=5, help="written per request")
+    parser.add_argument("--log-file", default="/tmp/bench_logging.log")
+    parser.add_argument("--write-delay-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()  # the test client is an allowed host
+    use_redis()
+
+    print(
+        f"{args.threads} threads, {args.records} records per request to {args.log_file}, "
+        f"{args.write_delay_ms}ms per write"
+    )
+    for mode in ("off", "sync", "queue"):
+        result = run(mode, args)
+        print(
+            f"{mode:<6} p50: {result['p50']:>7.3f}ms  p95: {result['p95']:>7.3f}ms  "
+            f"p99: {result['p99']:>7.3f}ms  {result['rps']:>8.1f} req/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
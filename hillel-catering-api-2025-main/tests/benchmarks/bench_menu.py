@@ -0,0 +1,116 @@
+"""
+Latency and bytes on the wire of GET /food/dishes/.
+
+    python manage.py migrate
+    python -m tests.benchmarks.bench_menu                       # fakeredis
+    python -m tests.benchmarks.bench_menu --url redis://localhost:6379/0
+
+before: the menu data cached as JSON, deserialized and rendered by DRF
+        on every request
+after:  the pre-rendered snapshot of food.menu in the accepted encoding,
+        304 for a client that sends the ETag back
+
+Requests go through the view (authentication included), not the network.
+The benchmark restaurants and their dishes are deleted at the end.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import django
+import fakeredis
+import redis
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from rest_framework.permissions import IsAuthenticated  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+from rest_framework.views import APIView  # noqa: E402
+
+from food import menu  # noqa: E402
+from food.models import Dish, Restaurant  # noqa: E402
+from food.views import FoodAPIViewSet  # noqa: E402
+from shared import cache as cache_module  # noqa: E402
+from shared.cache import CacheService  # noqa: E402
+from users.models import User  # noqa: E402
+
+PREFIX = "bench-restaurant"
+
+
+class BeforeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(CacheService().get(namespace="bench_menu", key="data"))
+
+
+def run(label: str, view, user: User, iterations: int, **headers) -> None:
+    factory = APIRequestFactory()
+    timings, size, status = [], 0, None
+
+    for _ in range(iterations):
+        request = factory.get("/food/dishes/", **headers)
+        force_authenticate(request, user=user)
+
+        started = time.perf_counter()
+        response = view(request)
+        if hasattr(response, "render"):
+            response.render()
+        timings.append((time.perf_counter() - started) * 1000)
+        size, status = len(response.content), response.status_code
+
+    timings.sort()
+    print(
+        f"{label:<22} {status}  bytes: {size:>8}  "
+        f"p50: {statistics.median(timings):.3f}ms  "
+        f"p99: {timings[int(len(timings) * 0.99) - 1]:.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="real Redis, fakeredis if omitted")
+    parser.add_argument("--restaurants", type=int, default=50)
+    parser.add_argument("--dishes", type=int, default=40, help="per restaurant")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.url:
+        pool = redis.ConnectionPool.from_url(args.url)
+    else:
+        pool = fakeredis.FakeRedis(server=fakeredis.FakeServer()).connection_pool
+    cache_module.get_connection_pool = lambda: pool
+
+    restaurants = Restaurant.objects.bulk_create(
+        Restaurant(name=f"{PREFIX}-{index}", address="bench")
+        for index in range(args.restaurants)
+    )
+    Dish.objects.bulk_create(
+        Dish(name=f"Dish {index} with a longer name", price=100 + index, restaurant=restaurant)
+        for restaurant in restaurants
+        for index in range(args.dishes)
+    )
+    menu.bump_version()  # bulk_create sends no signals
+    user, _ = User.objects.get_or_create(email="bench@email.com", phone_number="+380960000")
+
+    try:
+        CacheService().set(namespace="bench_menu", key="data", value=menu.build_menu())
+        after = FoodAPIViewSet.as_view({"get": "dishes"})
+        etag = menu.get_menu().etag
+
+        run("before", BeforeView.as_view(), user, args.iterations)
+        run("after, identity", after, user, args.iterations)
+        run("after, gzip", after, user, args.iterations, HTTP_ACCEPT_ENCODING="gzip")
+        run("after, br", after, user, args.iterations, HTTP_ACCEPT_ENCODING="gzip, br")
+        run("after, If-None-Match", after, user, args.iterations, HTTP_IF_NONE_MATCH=etag)
+    finally:
+        Restaurant.objects.filter(name__startswith=PREFIX).delete()
+        user.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+How many orders per minute a deployment cooks and delivers.
+
+    make asgi worker_default worker_high silpo_tracker webhook_consumer   # one per shell
+    python -m tests.benchmarks.bench_order_pipeline --url http://localhost:8000 \\
+        --rates 0.5,1,2,5 --duration 60 --start-stand-ins
+
+For every rate (orders per second, Poisson arrivals) orders are submitted
+for `--duration` seconds by `--users` customers, each order with dishes of
+1 to `--max-restaurants` restaurants. The customers are created in the
+database of the deployment (the script needs its settings), their JWTs come
+from `auth/token/`. Every order is followed through its tracking data on
+`/food/orders/<id>/events`:
+
+    submitted   POST /food/orders/ has answered       (NOT_STARTED)
+    cooking     a restaurant has started cooking      (COOKING)
+    cooked      every restaurant has cooked           (COOKED)
+    delivery    a courier is on the way               (DELIVERY)
+
+`--start-stand-ins` serves the restaurants and the courier of tests/providers
+in this process on their usual ports (Silpo :8001, KFC :8002, Uber :8004),
+with the webhooks pointed to `--url`.
+
+A stage is saturated at a rate when less than `--min-reached` of the orders
+get there within `--timeout`, or when its p95 grows `--saturation-factor`
+times over the lowest rate. The report names the component behind the first
+saturated stage. The customers and their orders are deleted at the end.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import django
+import httpx
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+
+from food.enums import OrderStatus  # noqa: E402
+from food.models import Dish, Restaurant  # noqa: E402
+from food.services import PROVIDER_TASKS  # noqa: E402
+from users.models import User  # noqa: E402
+
+PASSWORD = "load-password"
+EMAIL_DOMAIN = "load.catering.com"
+STAGES = ("submitted", "cooking", "cooked", "delivery")
+COMPONENTS = {
+    "submitted": "API: web workers and the database",
+    "cooking": "restaurant tasks: Celery high_priority/default queues, Silpo/KFC APIs",
+    "cooked": "restaurant tracking: Silpo tracker, KFC webhook consumer",
+    "delivery": "delivery: Celery low_priority queue, Uber API, webhook consumer",
+}
+
+
+@dataclass
+class TrackedOrder:
+    submitted_at: float
+    order_id: int | None = None
+    error: str | None = None
+    # stage -> seconds since the order was submitted
+    reached: dict[str, float] = field(default_factory=dict)
+    tracking: dict = field(default_factory=lambda: {"restaurants": {}, "delivery": {}})
+
+    def update(self, event: dict) -> None:
+        """Apply the snapshot or a change.
+
+        {"restaurants": {"1": {"status": ...}}, "delivery": {}}
+        """
+
+        for restaurant_id, payload in event.get("restaurants", {}).items():
+            self.tracking["restaurants"].setdefault(restaurant_id, {}).update(payload)
+        self.tracking["delivery"].update(event.get("delivery", {}))
+
+        elapsed = time.perf_counter() - self.submitted_at
+        statuses = [payload.get("status") for payload in self.tracking["restaurants"].values()]
+
+        if any(status in (OrderStatus.COOKING, OrderStatus.COOKED) for status in statuses):
+            self.reached.setdefault("cooking", elapsed)
+        if statuses and all(status == OrderStatus.COOKED for status in statuses):
+            self.reached.setdefault("cooked", elapsed)
+        if self.tracking["delivery"].get("status") == OrderStatus.DELIVERY:
+            self.reached.setdefault("delivery", elapsed)
+
+    @property
+    def done(self) -> bool:
+        return "cooked" in self.reached and "delivery" in self.reached
+
+
+@dataclass
+class StepResult:
+    rate: float
+    orders: list[TrackedOrder]
+    seconds: float
+
+    def latencies(self, stage: str) -> list[float]:
+        return sorted(order.reached[stage] for order in self.orders if stage in order.reached)
+
+    def reached_share(self, stage: str) -> float:
+        return len(self.latencies(stage)) / len(self.orders) if self.orders else 0.0
+
+    def p95(self, stage: str) -> float | None:
+        latencies = self.latencies(stage)
+        return percentile(latencies, 0.95) if latencies else None
+
+    @property
+    def per_minute(self) -> float:
+        return sum(order.done for order in self.orders) / self.seconds * 60
+
+
+def percentile(values: list[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def start_stand_ins(url: str) -> None:
+    os.environ["KFC_WEBHOOK_URL"] = f"{url}/webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/"
+    os.environ["UBER_WEBHOOK_URL"] = f"{url}/api/uber/webhook/"
+
+    from tests.benchmarks.harness import start_stand_in
+    from tests.providers import kfc, silpo, uber
+
+    for app, port in ((silpo.app, 8001), (kfc.app, 8002), (uber.app, 8004)):
+        start_stand_in(app, port)
+
+
+def prepare(users: int) -> tuple[list[str], dict[str, list[int]]]:
+    """Customers and the dishes of every restaurant a provider task knows."""
+
+    emails = [f"customer{index}@{EMAIL_DOMAIN}" for index in range(users)]
+    User.objects.bulk_create(
+        (
+            User(
+                email=email,
+                phone_number=f"+39{index:07d}",
+                password=make_password(PASSWORD),
+                is_active=True,
+            )
+            for index, email in enumerate(emails)
+        ),
+        ignore_conflicts=True,
+    )
+
+    dishes = {}
+    for name in ("Silpo", "KFC"):
+        assert name.lower() in PROVIDER_TASKS
+        restaurant = Restaurant.objects.filter(name=name).first()
+        if restaurant is None:
+            restaurant = Restaurant.objects.create(name=name, address="Kyiv")
+        dishes[name] = list(restaurant.dishes.values_list("id", flat=True)[:10])
+        if not dishes[name]:
+            dishes[name] = [
+                Dish.objects.create(
+                    name=f"{name} dish {index}", price=100, restaurant=restaurant
+                ).pk
+                for index in range(3)
+            ]
+
+    return emails, dishes
+
+
+def cleanup() -> None:
+    # the orders and their items are deleted with the customers
+    User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+
+
+async def get_tokens(client: httpx.AsyncClient, url: str, emails: list[str]) -> list[str]:
+    async def token(email: str) -> str:
+        response = await client.post(
+            f"{url}/auth/token/", json={"email": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        return response.json()["access"]
+
+    return await asyncio.gather(*(token(email) for email in emails))
+
+
+async def follow(
+    client: httpx.AsyncClient, url: str, token: str, order: TrackedOrder, timeout: float
+) -> None:
+    try:
+        async with asyncio.timeout(timeout):
+            async with client.stream(
+                "GET",
+                f"{url}/food/orders/{order.order_id}/events",
+                headers={"Authorization": f"Bearer {token}"},
+            ) as response:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    order.update(json.loads(line.removeprefix("data: ")))
+                    if order.done:
+                        return
+    except TimeoutError:
+        pass  # the stages not reached stay missing
+    except httpx.HTTPError as error:
+        order.error = type(error).__name__
+
+
+async def submit(
+    client: httpx.AsyncClient,
+    args,
+    tokens: list[str],
+    dishes: dict[str, list[int]],
+) -> TrackedOrder:
+    token = random.choice(tokens)
+    restaurants = random.sample(
+        list(dishes), random.randint(1, min(args.max_restaurants, len(dishes)))
+    )
+    payload = {
+        "items": [
+            {"dish": random.choice(dishes[name]), "quantity": random.randint(1, 3)}
+            for name in restaurants
+        ],
+        "eta": str(date.today() + timedelta(days=1)),
+        "delivery_provider": "uber",
+    }
+    order = TrackedOrder(submitted_at=time.perf_counter())
+
+    try:
+        response = await client.post(
+            f"{args.url}/food/orders/", json=payload, headers={"Authorization": f"Bearer {token}"}
+        )
+    except httpx.HTTPError as error:
+        order.error = type(error).__name__
+        return order
+
+    if response.status_code != 201:
+        order.error = f"HTTP {response.status_code}"
+        return order
+
+    order.reached["submitted"] = time.perf_counter() - order.submitted_at
+    order.order_id = response.json()["id"]
+    await follow(client, args.url, token, order, args.timeout)
+
+    return order
+
+
+async def run_step(client, args, rate: float, tokens, dishes) -> StepResult:
+    tasks = []
+    started = time.perf_counter()
+
+    while time.perf_counter() - started < args.duration:
+        tasks.append(asyncio.create_task(submit(client, args, tokens, dishes)))
+        await asyncio.sleep(random.expovariate(rate))
+
+    orders = await asyncio.gather(*tasks)
+
+    return StepResult(rate=rate, orders=orders, seconds=time.perf_counter() - started)
+
+
+def report(step: StepResult) -> None:
+    errors = sum(order.error is not None for order in step.orders)
+    print(
+        f"\n{step.rate:g} orders/s: {len(step.orders)} orders, {errors} errors, "
+        f"{step.per_minute:.1f} cooked and delivered per minute"
+    )
+    print(f"  {'stage':<10} {'reached':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+
+    for stage in STAGES:
+        latencies = step.latencies(stage)
+        if not latencies:
+            print(f"  {stage:<10} {0:>7.0%}")
+            continue
+        print(
+            f"  {stage:<10} {step.reached_share(stage):>7.0%} "
+            f"{statistics.median(latencies):>8.2f} {percentile(latencies, 0.95):>8.2f} "
+            f"{percentile(latencies, 0.99):>8.2f}"
+        )
+
+
+def saturated_stage(step: StepResult, first: StepResult, args) -> str | None:
+    for stage in STAGES:
+        if step.reached_share(stage) < args.min_reached:
+            return stage
+
+        p95, first_p95 = step.p95(stage), first.p95(stage)
+        if step is not first and first_p95 and p95 > first_p95 * args.saturation_factor:
+            return stage
+
+    return None
+
+
+async def main(args) -> None:
+    if args.start_stand_ins:
+        start_stand_ins(args.url)
+
+    emails, dishes = await asyncio.to_thread(prepare, args.users)
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=100),
+        timeout=httpx.Timeout(connect=5, read=None, write=10, pool=None),
+    )
+
+    try:
+        tokens = await get_tokens(client, args.url, emails)
+        steps = []
+
+        for rate in args.rates:
+            step = await run_step(client, args, rate, tokens, dishes)
+            steps.append(step)
+            report(step)
+
+            stage = saturated_stage(step, steps[0], args)
+            if stage is not None:
+                print(f"\nfirst to saturate at {rate:g} orders/s: {stage} -> {COMPONENTS[stage]}")
+                break
+        else:
+            print(f"\nnothing saturated up to {args.rates[-1]:g} orders/s")
+
+        best = max(steps, key=lambda step: step.per_minute)
+        print(f"max throughput: {best.per_minute:.1f} orders per minute at {best.rate:g} orders/s")
+    finally:
+        await client.aclose()
+        if not args.keep:
+            await asyncio.to_thread(cleanup)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rates", default="0.5,1,2,5", help="orders per second, one step each")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of every step")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--max-restaurants", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to follow an order")
+    parser.add_argument("--min-reached", type=float, default=0.95)
+    parser.add_argument("--saturation-factor", type=float, default=2.0)
+    parser.add_argument("--start-stand-ins", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="keep the customers and orders")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+
+    asyncio.run(main(args))
@@ -0,0 +1,181 @@
+"""
+How many idle order streams (food.streams) one server process can hold.
+
+    make asgi                                   # one uvicorn process
+    ulimit -n 65535                             # in both shells
+    python -m tests.benchmarks.bench_order_stream --steps 1000,2000,5000,10000 \\
+        --server-pid $(pgrep -f "uvicorn config.asgi" | head -1)
+
+For every step the script opens streams up to the step size (spread over
+`--orders` orders), then publishes one update per order to Redis and
+measures how long it takes to reach every stream. A step is saturated
+when streams fail to connect or the p99 delivery exceeds `--max-p99-ms`.
+
+Streams are authenticated with the query string token, so the script
+needs the server's SECRET_KEY and CACHE_SERVICE_URL (config.settings).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import django
+import httpx
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from food import streams  # noqa: E402
+from food.tracking import TrackingOrderStore  # noqa: E402
+from shared.cache import CacheService  # noqa: E402
+
+BENCH_FIELD = "bench_sent_at"
+
+
+class Stream:
+    def __init__(self, order_id: int):
+        self.order_id = order_id
+        self.connected = asyncio.Event()
+        self.error: str | None = None
+        self.latencies: list[float] = []
+
+    async def run(self, client: httpx.AsyncClient, url: str) -> None:
+        try:
+            async with client.stream(
+                "GET",
+                f"{url}/food/orders/{self.order_id}/events",
+                params={"token": streams.issue_token(self.order_id)},
+            ) as response:
+                if response.status_code != 200:
+                    self.error = f"HTTP {response.status_code}"
+                    return
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+
+                    payload = json.loads(line.removeprefix("data: "))
+                    sent_at = payload["delivery"].get(BENCH_FIELD)
+                    if sent_at is None:  # the snapshot
+                        self.connected.set()
+                    else:
+                        self.latencies.append((time.time() - sent_at) * 1000)
+        except httpx.HTTPError as error:
+            self.error = type(error).__name__
+        finally:
+            self.connected.set()
+
+
+def rss_mb(pid: int | None) -> float | None:
+    if pid is None:
+        return None
+
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+    return None
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def publish_updates(order_ids: list[int]) -> None:
+    def publish():
+        with CacheService().pipeline() as pipe:
+            for order_id in order_ids:
+                pipe.publish(
+                    namespace=TrackingOrderStore.NAMESPACE,
+                    key=TrackingOrderStore.EVENTS.format(order_id=order_id),
+                    value={"restaurants": {}, "delivery": {BENCH_FIELD: time.time()}},
+                )
+
+    await asyncio.to_thread(publish)
+
+
+async def main(args) -> None:
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=None),
+        timeout=httpx.Timeout(connect=args.connect_timeout, read=None, write=10, pool=None),
+    )
+    connecting = asyncio.Semaphore(args.connect_concurrency)
+    order_ids = [args.first_order_id + index for index in range(args.orders)]
+    opened: list[Stream] = []
+    tasks: list[asyncio.Task] = []
+
+    async def open_stream(stream: Stream) -> None:
+        async with connecting:
+            tasks.append(asyncio.create_task(stream.run(client, args.url)))
+            await stream.connected.wait()
+
+    print(
+        f"{'streams':>8} {'failed':>7} {'connect s':>10} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}"
+    )
+
+    try:
+        for step in args.steps:
+            new = [Stream(order_ids[index % len(order_ids)]) for index in range(len(opened), step)]
+            started = time.perf_counter()
+            await asyncio.gather(*(open_stream(stream) for stream in new))
+            connect_seconds = time.perf_counter() - started
+            opened += new
+
+            alive = [stream for stream in opened if stream.error is None]
+            for stream in alive:
+                stream.latencies.clear()
+
+            await publish_updates(order_ids)
+            deadline = time.perf_counter() + args.max_p99_ms / 1000 * 5
+            while time.perf_counter() < deadline and not all(s.latencies for s in alive):
+                await asyncio.sleep(0.05)
+
+            latencies = [latency for stream in alive for latency in stream.latencies]
+            failed = len(opened) - len(alive) + sum(1 for s in alive if not s.latencies)
+            p50 = statistics.median(latencies) if latencies else float("nan")
+            p99 = percentile(latencies, 0.99) if latencies else float("nan")
+            rss = rss_mb(args.server_pid)
+
+            print(
+                f"{len(opened):>8} {failed:>7} {connect_seconds:>10.2f} {p50:>8.1f} "
+                f"{p99:>8.1f} {rss if rss is not None else float('nan'):>8.1f}"
+            )
+
+            if failed > len(opened) * 0.01 or not latencies or p99 > args.max_p99_ms:
+                print(f"saturated at {len(opened)} streams")
+                break
+        else:
+            print(f"not saturated at {len(opened)} streams, try bigger --steps")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.aclose()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument(
+        "--steps",
+        type=lambda value: [int(step) for step in value.split(",")],
+        default=[500, 1000, 2000, 5000, 10000],
+    )
+    parser.add_argument("--orders", type=int, default=100, help="streams are spread over them")
+    parser.add_argument("--first-order-id", type=int, default=1_000_000)
+    parser.add_argument("--server-pid", type=int, default=None, help="to report its RSS")
+    parser.add_argument("--max-p99-ms", type=float, default=1000.0)
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
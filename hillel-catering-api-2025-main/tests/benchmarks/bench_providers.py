@@ -0,0 +1,85 @@
+"""
+Requests per second against the local Silpo stand-in (tests/providers/silpo.py).
+
+    python -m tests.benchmarks.bench_providers --requests 2000 --workers 8 --concurrency 50
+
+before: module-level `httpx.get`, a new TCP connection per call
+after:  `silpo.Client` / `silpo.AsyncClient` over the pooled provider transport
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from food.providers import silpo
+from tests.benchmarks.harness import free_port, start_stand_in
+from tests.providers.silpo import app
+
+
+def measure(label: str, total: int, call) -> None:
+    started = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - started
+
+    print(f"{label:<32} {total / elapsed:>10.0f} req/s  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_stand_in(app, port)
+
+    class Client(silpo.Client):
+        BASE_URL = f"http://127.0.0.1:{port}/api/orders"
+
+    class AsyncClient(silpo.AsyncClient):
+        BASE_URL = Client.BASE_URL
+
+    order_id = Client.create_order(
+        silpo.OrderRequestBody(order=[silpo.OrderItem(dish="Salad", quantity=1)])
+    ).id
+
+    def unpooled_get(_=None):
+        response = httpx.get(f"{Client.BASE_URL}/{order_id}")
+        response.raise_for_status()
+
+    def pooled_get(_=None):
+        Client.get_order(order_id)
+
+    def threaded(call):
+        def run():
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                list(executor.map(call, range(args.requests)))
+
+        return run
+
+    async def gather():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def get_order():
+            async with semaphore:
+                await client.get_order(order_id)
+
+        try:
+            await asyncio.gather(*(get_order() for _ in range(args.requests)))
+        finally:
+            await client.aclose()
+
+    measure("before: httpx.get", args.requests, threaded(unpooled_get))
+    measure("after:  silpo.Client", args.requests, threaded(pooled_get))
+    measure("after:  silpo.AsyncClient", args.requests, lambda: asyncio.run(gather()))
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
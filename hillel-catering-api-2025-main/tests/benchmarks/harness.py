@@ -0,0 +1,115 @@
+"""
+The pieces a benchmark boots the app with.
+
+    with test_database(), stand_ins():   # a fresh test DB, the providers of tests/providers
+        use_redis(url=None)              # fakeredis, or a real Redis by URL
+        ...
+
+Django has to be set up before `test_database()` and `use_redis()`.
+"""
+
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import fakeredis
+import redis
+import uvicorn
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stand_in(app, port: int) -> uvicorn.Server:
+    """Serve a FastAPI app in a daemon thread of this process."""
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    return server
+
+
+def use_redis(url: str | None = None) -> None:
+    """Point every CacheService to a real Redis, or to fakeredis if there is no URL."""
+
+    from shared import cache
+
+    if url:
+        pool = redis.ConnectionPool.from_url(url)
+    else:
+        pool = fakeredis.FakeRedis(server=fakeredis.FakeServer()).connection_pool
+
+    cache.get_connection_pool = lambda: pool
+
+
+@contextmanager
+def test_database():
+    """A new test database (`test_<NAME>`), migrated, dropped at the end.
+
+    The test environment as pytest has it: the test client is an allowed
+    host, emails go to memory.
+    """
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield name
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def stand_ins(webhook_url: str | None = None):
+    """Silpo, KFC and Uber of tests/providers on free ports, the API clients pointed to them.
+
+    The Uber simulator posts courier locations to `webhook_url`,
+    keeps them to itself if there is none.
+    """
+
+    if webhook_url:
+        os.environ["UBER_WEBHOOK_URL"] = webhook_url
+    else:
+        # nobody listens, so nothing is flushed during the run
+        os.environ.setdefault("UBER_BATCH_INTERVAL", "3600")
+        os.environ.setdefault("UBER_BATCH_SIZE", "1000000")
+
+    from food.providers import kfc, silpo, uber
+    from tests.providers import kfc as kfc_stand_in
+    from tests.providers import silpo as silpo_stand_in
+    from tests.providers import uber as uber_stand_in
+
+    servers, previous = [], {}
+    for client, stand_in, path in (
+        (silpo.Client, silpo_stand_in, "api/orders"),
+        (kfc.Client, kfc_stand_in, "api/orders"),
+        (uber.UberClient, uber_stand_in, "api/deliveries"),
+    ):
+        port = free_port()
+        servers.append(start_stand_in(stand_in.app, port))
+        previous[client] = client.BASE_URL
+        client.BASE_URL = f"http://127.0.0.1:{port}/{path}"
+    silpo.AsyncClient.BASE_URL = silpo.Client.BASE_URL
+
+    try:
+        yield
+    finally:
+        for server in servers:
+            server.should_exit = True
+        for client, url in previous.items():
+            client.BASE_URL = url
+        silpo.AsyncClient.BASE_URL = silpo.Client.BASE_URL
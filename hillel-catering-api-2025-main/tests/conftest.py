@@ -0,0 +1,26 @@
+import fakeredis
+import fakeredis.aioredis
+import pytest
+
+from shared import cache
+
+
+@pytest.fixture
+def fake_redis(monkeypatch) -> fakeredis.FakeRedis:
+    """Point every `CacheService` (and asyncio client) to the same in-memory Redis."""
+
+    server = fakeredis.FakeServer()
+    connection = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(cache, "get_connection_pool", lambda: connection.connection_pool)
+    monkeypatch.setattr(
+        cache, "create_async_connection", lambda: fakeredis.aioredis.FakeRedis(server=server)
+    )
+
+    return connection
+
+
+@pytest.fixture(autouse=True)
+def query_budgets(settings):
+    """Every request and task is counted, an exceeded budget (shared.queries) fails the test."""
+
+    settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, "SAMPLE_RATE": 1, "STRICT": True}
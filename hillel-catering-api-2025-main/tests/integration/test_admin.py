@@ -0,0 +1,114 @@
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+
+from food.admin import EstimatedCountPaginator
+from food.models import Dish, Order, OrderItem, Restaurant
+
+# session, admin, order, items with their dishes, the order user (the widget and its label)
+CHANGE_VIEW_QUERIES = 6
+
+
+@pytest.fixture
+def admin_client(client: Client, django_user_model) -> Client:
+    admin = django_user_model.objects.create(
+        email="admin@email.com",
+        phone_number="+3809611",
+        is_staff=True,
+        is_superuser=True,
+        is_active=True,
+    )
+    client.force_login(admin)
+
+    return client
+
+
+def create_orders(django_user_model, orders: int, items: int = 2) -> list[Order]:
+    restaurant, _ = Restaurant.objects.get_or_create(name="Silpo", address="Kyiv")
+    dishes = Dish.objects.bulk_create(
+        Dish(name=f"Dish {index}", price=100 * index, restaurant=restaurant)
+        for index in range(items)
+    )
+    result = []
+    created = Order.objects.count()
+
+    for index in range(created, created + orders):
+        user = django_user_model.objects.create(
+            email=f"john{index}@email.com", phone_number=f"+38{index}"
+        )
+        order = Order.objects.create(user=user, eta=date.today())
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, dish=dish, quantity=1) for dish in dishes
+        )
+        result.append(order)
+
+    return result
+
+
+def count_queries(client: Client, url: str) -> int:
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/admin/food/order/",
+        "/admin/food/order/?status=not_started",
+        "/admin/food/orderitem/",
+        "/admin/food/dish/",
+        "/admin/food/dish/?price=0-100",
+    ],
+)
+def test_changelist_queries_do_not_grow_with_rows(admin_client: Client, django_user_model, url):
+    create_orders(django_user_model, 1)
+    one_row = count_queries(admin_client, url)
+
+    create_orders(django_user_model, 20)
+
+    assert count_queries(admin_client, url) == one_row
+
+
+@pytest.mark.django_db
+def test_order_changelist_skips_the_full_count(admin_client: Client, django_user_model):
+    create_orders(django_user_model, 3)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.get("/admin/food/order/?status=not_started")
+
+    assert response.status_code == 200
+    counts = [query["sql"] for query in queries if "COUNT(" in query["sql"].upper()]
+    assert len(counts) == 1  # the filtered one of the paginator, not the whole table
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("items", [1, 5])
+def test_order_change_view_has_no_dish_select(admin_client: Client, django_user_model, items):
+    [order] = create_orders(django_user_model, 1, items=items)
+    Dish.objects.create(name="Not in the order", price=1, restaurant=Restaurant.objects.get())
+    admin_client.get(f"/admin/food/order/{order.pk}/change/")  # content types are cached
+
+    with CaptureQueriesContext(connection) as queries:
+        response = admin_client.get(f"/admin/food/order/{order.pk}/change/")
+
+    assert response.status_code == 200
+    # autocomplete widgets render only the selected dish and user, not every row of the table
+    assert b"Not in the order" not in response.content
+    assert b"john1@email.com" not in response.content
+    # one lookup of the selected dish per item row (the autocomplete label)
+    assert len(queries) == CHANGE_VIEW_QUERIES + items
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator_falls_back_to_count():
+    # no planner estimate outside of Postgres
+    Restaurant.objects.create(name="Silpo", address="Kyiv")
+
+    assert EstimatedCountPaginator(Restaurant.objects.order_by("id"), 10).count == 1
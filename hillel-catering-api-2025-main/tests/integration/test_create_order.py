@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+
+import pytest
+from rest_framework.test import APIClient
+
+from food.models import Dish, Order, Restaurant
+
+# dishes SELECT, SAVEPOINT, order INSERT, items INSERT, RELEASE SAVEPOINT,
+# items SELECT of the response (the savepoint is BEGIN/COMMIT outside of tests)
+CREATE_ORDER_QUERIES = 6
+
+
+@pytest.fixture
+def client(django_user_model, monkeypatch) -> APIClient:
+    # providers and Celery are out of the scope of these tests
+    monkeypatch.setattr("food.views.schedule_order", lambda order: None)
+
+    client = APIClient()
+    client.force_authenticate(
+        django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    )
+
+    return client
+
+
+@pytest.fixture
+def dishes() -> list[Dish]:
+    restaurants = [
+        Restaurant.objects.create(name=name, address="Kyiv") for name in ("Silpo", "KFC")
+    ]
+
+    return Dish.objects.bulk_create(
+        Dish(name=f"Dish {index}", price=100 + index, restaurant=restaurants[index % 2])
+        for index in range(30)
+    )
+
+
+def order_payload(dishes: list[Dish]) -> dict:
+    return {
+        "items": [{"dish": dish.pk, "quantity": 2} for dish in dishes],
+        "eta": str(date.today() + timedelta(days=2)),
+        "delivery_provider": "uklon",
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("items", [1, 3, 30])
+def test_create_order_queries_do_not_grow_with_items(
+    client: APIClient, dishes: list[Dish], items: int, django_assert_num_queries
+):
+    with django_assert_num_queries(CREATE_ORDER_QUERIES):
+        response = client.post("/food/orders/", order_payload(dishes[:items]), format="json")
+
+    assert response.status_code == 201
+    assert [item["dish"] for item in response.json()["items"]] == [
+        dish.pk for dish in dishes[:items]
+    ]
+    order = Order.objects.get(pk=response.json()["id"])
+    assert order.total == sum(dish.price * 2 for dish in dishes[:items])
+    assert order.items.count() == items
+
+
+@pytest.mark.django_db
+def test_create_order_rejects_unknown_dish(client: APIClient, dishes: list[Dish]):
+    payload = order_payload(dishes[:1])
+    payload["items"].append({"dish": 999, "quantity": 1})
+
+    response = client.post("/food/orders/", payload, format="json")
+
+    assert response.status_code == 400
+    assert response.json() == {
+        "items": [{}, {"dish": ['Invalid pk "999" - object does not exist.']}]
+    }
+    assert not Order.objects.exists()
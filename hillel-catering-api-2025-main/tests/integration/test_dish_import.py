@@ -0,0 +1,109 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.client import Client
+
+from food.importers import DishImporter, ImportResult
+from food.models import Dish, Restaurant
+
+IMPORT_URL = "/admin/food/dish/import-dishes/"
+CSV = b"""name,price,restaurant
+Pizza,1200,silpo
+Sushi,2500,pizza day
+Pad Thai,1500,SILPO
+Burger,900,mcdonalds
+Broken,free,silpo
+"""
+
+
+@pytest.fixture
+def admin_client(client: Client, django_user_model) -> Client:
+    admin = django_user_model.objects.create(
+        email="admin@email.com",
+        phone_number="+3809611",
+        is_staff=True,
+        is_superuser=True,
+        is_active=True,
+    )
+    client.force_login(admin)
+
+    return client
+
+
+@pytest.fixture
+def restaurants() -> tuple[Restaurant, Restaurant]:
+    return (
+        Restaurant.objects.create(name="Silpo", address="Kyiv"),
+        Restaurant.objects.create(name="Pizza Day", address="Kyiv"),
+    )
+
+
+@pytest.fixture
+def eager_jobs(settings):
+    """Run Celery tasks in the request, with results in memory instead of the DB backend."""
+
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    settings.CELERY_RESULT_BACKEND = "cache+memory://"
+
+
+def upload(client: Client, content: bytes = CSV):
+    return client.post(IMPORT_URL, {"file": SimpleUploadedFile("dishes.csv", content)})
+
+
+@pytest.mark.django_db
+def test_import_resolves_restaurants_once(
+    admin_client: Client, restaurants, fake_redis, django_assert_max_num_queries
+):
+    silpo, pizza_day = restaurants
+
+    with django_assert_max_num_queries(10):
+        response = upload(admin_client, CSV + b"Salad,300,silpo\n" * 1000)
+
+    assert response.status_code == 302
+    assert Dish.objects.filter(restaurant=silpo).count() == 1002
+    assert list(Dish.objects.filter(restaurant=pizza_day).values_list("name", flat=True)) == [
+        "Sushi"
+    ]
+
+
+@pytest.mark.django_db
+def test_short_rows_are_skipped(restaurants, fake_redis):
+    content = CSV + b"Soup,400\nTea\n,100,silpo\n"
+
+    result = DishImporter().run(io.BytesIO(content))
+
+    assert result == ImportResult(created=3, skipped=5)
+
+
+@pytest.mark.django_db
+def test_large_file_is_imported_by_a_job(
+    admin_client: Client, restaurants, fake_redis, eager_jobs, settings, tmp_path
+):
+    settings.DISH_IMPORT = {"SYNC_MAX_BYTES": 0, "DIR": str(tmp_path)}
+
+    response = upload(admin_client)
+
+    assert response.status_code == 302
+    job_id = response.url.split("import_job=")[1]
+    progress = admin_client.get(f"{IMPORT_URL}{job_id}/").json()
+    assert progress == {
+        "status": "done",
+        "progress": 1.0,
+        "processed": 5,
+        "created": 3,
+        "skipped": 2,
+    }
+    assert list(tmp_path.iterdir()) == []
+    changelist = admin_client.get(response.url)
+    assert changelist.status_code == 200
+    assert b'id="import-progress"' in changelist.content
+
+
+@pytest.mark.django_db
+def test_import_is_only_for_staff(client: Client, django_user_model, restaurants):
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809622")
+    client.force_login(user)
+
+    assert upload(client).status_code == 302
+    assert not Dish.objects.exists()
@@ -0,0 +1,98 @@
+from datetime import date
+
+import pytest
+
+from food import services
+from food.enums import OrderStatus
+from food.models import Dish, Order, OrderItem, OrderItemRow, Restaurant
+from food.tracking import TrackingOrderStore
+
+
+class FakeTask:
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, **kwargs):
+        self.calls.append(kwargs)
+
+
+def create_order(django_user_model, restaurants: int) -> Order:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    order = Order.objects.create(user=user, eta=date.today())
+    names = ["Silpo", "KFC"] + [f"Restaurant {index}" for index in range(2, restaurants)]
+
+    for index, name in enumerate(names[:restaurants]):
+        restaurant = Restaurant.objects.create(name=name, address="Kyiv")
+        for number in range(3):
+            dish = Dish.objects.create(
+                name=f"{name} dish {number}", price=100 + number, restaurant=restaurant
+            )
+            OrderItem.objects.create(order=order, dish=dish, quantity=index + 1)
+
+    return order
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("restaurants", [1, 3, 10])
+def test_items_by_restaurant_is_one_query(
+    django_user_model, restaurants: int, django_assert_num_queries
+):
+    order = create_order(django_user_model, restaurants)
+
+    with django_assert_num_queries(1):
+        items_by_restaurant = order.items_by_restaurant()
+
+    assert len(items_by_restaurant) == restaurants
+    silpo, items = next(iter(items_by_restaurant.items()))
+    assert silpo == Restaurant.objects.get(name="Silpo")
+    assert items == [
+        OrderItemRow("Silpo dish 0", 1, 100),
+        OrderItemRow("Silpo dish 1", 1, 101),
+        OrderItemRow("Silpo dish 2", 1, 102),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("restaurants", [1, 3, 10])
+def test_schedule_order_is_one_query(
+    django_user_model, fake_redis, monkeypatch, restaurants: int, django_assert_num_queries
+):
+    order = create_order(django_user_model, restaurants)
+    silpo, kfc, delivery = FakeTask(), FakeTask(), FakeTask()
+    monkeypatch.setitem(services.PROVIDER_TASKS, "silpo", silpo)
+    monkeypatch.setitem(services.PROVIDER_TASKS, "kfc", kfc)
+    monkeypatch.setattr(services, "order_delivery", delivery)
+
+    with django_assert_num_queries(1):
+        services.schedule_order(order)
+
+    tracking_order = TrackingOrderStore().get(order.pk)
+    assert len(tracking_order.restaurants) == restaurants
+    assert all(
+        payload["status"] == OrderStatus.NOT_STARTED
+        for payload in tracking_order.restaurants.values()
+    )
+    assert silpo.calls == [
+        {
+            "order_id": order.pk,
+            "items": [
+                ("Silpo dish 0", 1, 100),
+                ("Silpo dish 1", 1, 101),
+                ("Silpo dish 2", 1, 102),
+            ],
+        }
+    ]
+    assert len(kfc.calls) == (1 if restaurants > 1 else 0)
+    assert delivery.calls == [{"order_id": order.pk}]
+
+
+def test_order_in_silpo_registers_dish_names(monkeypatch):
+    registered = {}
+    monkeypatch.setattr(
+        services, "register_silpo_order", lambda **kwargs: registered.update(kwargs)
+    )
+
+    # the rows come back from the Celery JSON serializer as lists
+    services.order_in_silpo(order_id=17, items=[["Salad", 2, 120]])
+
+    assert registered == {"order_id": 17, "items": [{"dish": "Salad", "quantity": 2}]}
@@ -0,0 +1,134 @@
+import gzip
+
+import brotli
+import pytest
+import redis
+from rest_framework.test import APIClient
+
+from food import menu
+from food.models import Dish, Restaurant
+from shared.cache import CacheService
+
+
+@pytest.fixture
+def client(django_user_model) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(
+        django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    )
+
+    return client
+
+
+@pytest.fixture
+def restaurants(django_capture_on_commit_callbacks, fake_redis) -> list[Restaurant]:
+    with django_capture_on_commit_callbacks(execute=True):
+        restaurants = [
+            Restaurant.objects.create(name=f"Restaurant {index}", address="Kyiv")
+            for index in range(5)
+        ]
+        Dish.objects.bulk_create(
+            Dish(name=f"Dish {index}", price=100, restaurant=restaurants[index % 5])
+            for index in range(20)
+        )
+
+    return restaurants
+
+
+def dish_names(response) -> set[str]:
+    return {dish["name"] for restaurant in response.json() for dish in restaurant["dishes"]}
+
+
+@pytest.mark.django_db
+def test_menu_is_built_once(client: APIClient, restaurants, django_assert_num_queries):
+    with django_assert_num_queries(2):  # restaurants + prefetched dishes
+        first = client.get("/food/dishes/")
+    with django_assert_num_queries(0):
+        second = client.get("/food/dishes/")
+
+    assert first.json() == second.json()
+    assert len(dish_names(first)) == 20
+
+
+@pytest.mark.django_db
+def test_menu_change_is_visible_right_away(
+    client: APIClient, restaurants, django_capture_on_commit_callbacks
+):
+    client.get("/food/dishes/")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Dish.objects.create(name="Borsch", price=200, restaurant=restaurants[0])
+    assert "Borsch" in dish_names(client.get("/food/dishes/"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        restaurants[0].delete()
+    assert "Borsch" not in dish_names(client.get("/food/dishes/"))
+
+
+@pytest.mark.django_db
+def test_stale_menu_is_served_while_another_worker_rebuilds(
+    client: APIClient, restaurants, django_assert_num_queries
+):
+    stale = client.get("/food/dishes/").json()
+    cache = CacheService()
+    cache.incr(namespace=menu.NAMESPACE, key=menu.VERSION)
+    cache.add(namespace=menu.NAMESPACE, key=menu.REBUILD_LOCK, value=1)
+
+    with django_assert_num_queries(0):
+        assert client.get("/food/dishes/").json() == stale
+
+    cache.delete(namespace=menu.NAMESPACE, key=menu.REBUILD_LOCK)
+    with django_assert_num_queries(2):
+        client.get("/food/dishes/")
+
+
+@pytest.mark.django_db
+def test_menu_is_sent_compressed(client: APIClient, restaurants):
+    plain = client.get("/food/dishes/")
+    gzipped = client.get("/food/dishes/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+    brotli_ = client.get("/food/dishes/", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+    no_brotli = client.get("/food/dishes/", HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+
+    assert "Content-Encoding" not in plain
+    assert gzipped["Content-Encoding"] == no_brotli["Content-Encoding"] == "gzip"
+    assert brotli_["Content-Encoding"] == "br"
+    assert gzip.decompress(gzipped.content) == plain.content
+    assert brotli.decompress(brotli_.content) == plain.content
+    assert len(brotli_.content) < len(gzipped.content) < len(plain.content)
+    assert len({plain["ETag"], gzipped["ETag"], brotli_["ETag"]}) == 3
+    assert gzipped["ETag"] == plain["ETag"][:-1] + '-gzip"'
+    assert "Accept-Encoding" in plain["Vary"]
+
+
+@pytest.mark.django_db
+def test_unchanged_menu_is_not_sent_again(
+    client: APIClient, restaurants, django_capture_on_commit_callbacks
+):
+    etag = client.get("/food/dishes/")["ETag"]
+
+    not_modified = client.get("/food/dishes/", HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Dish.objects.create(name="Borsch", price=200, restaurant=restaurants[0])
+
+    changed = client.get("/food/dishes/", HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_menu_is_sent_if_the_snapshot_is_not_stored(
+    client: APIClient, restaurants, monkeypatch
+):
+    def broken(*args, **kwargs):
+        raise redis.ConnectionError("Redis is gone")
+
+    monkeypatch.setattr(CacheService, "set_blobs", broken)
+    monkeypatch.setattr(CacheService, "delete", broken)
+
+    response = client.get("/food/dishes/")
+
+    assert response.status_code == 200
+    assert len(dish_names(response)) == 20
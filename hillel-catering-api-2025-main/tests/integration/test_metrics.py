@@ -0,0 +1,34 @@
+import pytest
+from django.test import Client
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def client(django_user_model, fake_redis) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(
+        django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    )
+
+    return client
+
+
+@pytest.mark.django_db
+def test_metrics_has_view_latency(client):
+    client.get("/food/dishes/")
+
+    response = Client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    assert (
+        'api_request_duration_seconds_count{action="dishes",status="200",view="FoodAPIViewSet"}'
+        in response.content.decode()
+    )
+
+
+def test_metrics_token(settings):
+    settings.METRICS_TOKEN = "secret"
+
+    assert Client().get("/metrics").status_code == 401
+    assert Client(headers={"Authorization": "Bearer secret"}).get("/metrics").status_code == 200
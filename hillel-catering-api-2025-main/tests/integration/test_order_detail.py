@@ -0,0 +1,68 @@
+import pytest
+from rest_framework.test import APIClient
+
+from food.enums import OrderStatus
+from food.models import Order
+from food.tracking import TrackingOrder, TrackingOrderStore
+from food.transitions import transition_order
+
+
+@pytest.fixture
+def order(django_user_model, fake_redis) -> Order:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    order = Order.objects.create(user=user, eta="2030-01-01", status=OrderStatus.COOKING)
+    TrackingOrderStore().create(
+        order_id=order.pk,
+        tracking_order=TrackingOrder(
+            restaurants={"1": {"external_id": "ext-1", "status": OrderStatus.COOKING}},
+            delivery={"location": {"lat": 1, "lng": 2}},
+        ),
+    )
+
+    return order
+
+
+def client_of(user) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(user)
+
+    return client
+
+
+@pytest.mark.django_db
+def test_detail_merges_db_and_tracking(order: Order, django_assert_num_queries):
+    client = client_of(order.user)
+
+    with django_assert_num_queries(2):  # the order, its items
+        first = client.get(f"/food/orders/{order.pk}/")
+    with django_assert_num_queries(0):
+        second = client.get(f"/food/orders/{order.pk}/")
+
+    assert first.json() == second.json()
+    assert first.json()["status"] == OrderStatus.COOKING
+    assert first.json()["tracking"] == {
+        "restaurants": {"1": {"external_id": "ext-1", "status": "cooking"}},
+        "delivery": {"location": {"lat": 1, "lng": 2}},
+    }
+
+
+@pytest.mark.django_db
+def test_status_write_drops_the_cached_order(order: Order, django_capture_on_commit_callbacks):
+    client = client_of(order.user)
+    client.get(f"/food/orders/{order.pk}/")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        transition_order(order.pk, expected=OrderStatus.COOKING, new=OrderStatus.COOKED)
+    assert client.get(f"/food/orders/{order.pk}/").json()["status"] == OrderStatus.COOKED
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = OrderStatus.DELIVERY
+        order.save()
+    assert client.get(f"/food/orders/{order.pk}/").json()["status"] == OrderStatus.DELIVERY
+
+
+@pytest.mark.django_db
+def test_detail_only_for_own_order(order: Order, django_user_model):
+    stranger = django_user_model.objects.create(email="jane@email.com", phone_number="+3809622")
+
+    assert client_of(stranger).get(f"/food/orders/{order.pk}/").status_code == 404
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+from food.enums import OrderStatus
+from food.models import Order
+from food.tracking import TrackingOrder, TrackingOrderStore
+
+
+@pytest.fixture
+def order(django_user_model, fake_redis) -> Order:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    order = Order.objects.create(user=user, eta="2030-01-01")
+    TrackingOrderStore().create(
+        order_id=order.pk,
+        tracking_order=TrackingOrder(
+            restaurants={"1": {"external_id": None, "status": OrderStatus.NOT_STARTED}}
+        ),
+    )
+
+    return order
+
+
+def events_token(user, order: Order):
+    client = APIClient()
+    client.force_authenticate(user)
+
+    return client.post(f"/food/orders/{order.pk}/events/token/")
+
+
+@pytest.mark.django_db
+def test_token_only_for_own_order(django_user_model, order: Order):
+    stranger = django_user_model.objects.create(email="jane@email.com", phone_number="+3809622")
+
+    assert events_token(stranger, order).status_code == 404
+    assert events_token(order.user, order).status_code == 200
+
+
+@pytest.mark.django_db
+def test_stream_with_query_token(order: Order):
+    token = events_token(order.user, order).json()["token"]
+
+    async def first_message(url: str):
+        response = await AsyncClient().get(url)
+        if response.status_code != 200:
+            return response.status_code, None
+
+        content = aiter(response.streaming_content)
+        message = await asyncio.wait_for(anext(content), timeout=5)
+        await content.aclose()
+
+        return response.status_code, message.decode()
+
+    url = f"/food/orders/{order.pk}/events"
+    other_url = f"/food/orders/{order.pk + 1}/events"
+
+    assert async_to_sync(first_message)(f"{url}?token=bad") == (401, None)
+    assert async_to_sync(first_message)(f"{other_url}?token={token}") == (401, None)
+
+    status, snapshot = async_to_sync(first_message)(f"{url}?token={token}")
+    assert status == 200
+    assert snapshot.startswith("event: snapshot\n")
+
+
+@pytest.mark.django_db
+def test_location_history_only_for_own_order(django_user_model, order: Order):
+    TrackingOrderStore().append_location(order.pk, {"lat": 1, "lng": 2, "timestamp": 1})
+    stranger = django_user_model.objects.create(email="jane@email.com", phone_number="+3809622")
+    client = APIClient()
+
+    client.force_authenticate(stranger)
+    assert client.get(f"/food/orders/{order.pk}/locations/").status_code == 404
+
+    client.force_authenticate(order.user)
+    response = client.get(f"/food/orders/{order.pk}/locations/")
+    assert response.status_code == 200
+    assert response.json() == [{"lat": 1, "lng": 2, "timestamp": 1}]
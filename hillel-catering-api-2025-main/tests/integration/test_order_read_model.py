@@ -0,0 +1,66 @@
+import pytest
+from rest_framework.test import APIClient
+
+from food.models import Dish, Order, OrderItem, Restaurant
+from food.views import OrderSerializer
+from users.models import Role
+
+
+@pytest.fixture
+def admin_client(django_user_model) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(
+        django_user_model.objects.create(
+            email="admin@email.com", phone_number="+3809611", role=Role.ADMIN
+        )
+    )
+
+    return client
+
+
+@pytest.fixture
+def orders(django_user_model) -> list[Order]:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809622")
+    restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+    dishes = Dish.objects.bulk_create(
+        Dish(name=f"Dish {index}", price=100, restaurant=restaurant) for index in range(3)
+    )
+    orders = Order.objects.bulk_create(
+        Order(user=user, eta="2030-01-01", total=300, delivery_provider="uber")
+        for _ in range(1000)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, dish=dish, quantity=index + 1)
+        for order in orders
+        for index, dish in enumerate(dishes)
+    )
+
+    return orders
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("limit", [10, 1000])
+def test_orders_page_queries(
+    admin_client: APIClient, orders: list[Order], limit: int, django_assert_num_queries
+):
+    with django_assert_num_queries(3):  # COUNT, the page, its items
+        response = admin_client.get("/food/orders/", {"limit": limit})
+    assert len(response.json()["results"]) == limit
+
+    with django_assert_num_queries(2):  # the page, its items
+        response = admin_client.get("/food/orders/", {"limit": limit, "pagination": "cursor"})
+    assert len(response.json()["results"]) == limit
+
+
+@pytest.mark.django_db
+def test_same_json_as_the_serializer(
+    admin_client: APIClient, orders: list[Order], fake_redis
+):
+    expected = [dict(OrderSerializer(order).data) for order in reversed(orders[-3:])]
+    for order in expected:
+        order["items"] = [dict(item) for item in order["items"]]
+
+    assert admin_client.get("/food/orders/", {"limit": 3}).json()["results"] == expected
+    detail = admin_client.get(f"/food/orders/{orders[-1].pk}/").json()
+    assert {key: value for key, value in detail.items() if key != "tracking"} == expected[0]
+    assert admin_client.get("/food/orders/999999/").status_code == 404
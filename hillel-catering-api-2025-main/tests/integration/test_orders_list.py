@@ -0,0 +1,89 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from food.enums import OrderStatus
+from food.models import Order
+from users.models import Role
+
+
+@pytest.fixture
+def admin_client(django_user_model) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(
+        django_user_model.objects.create(
+            email="admin@email.com", phone_number="+3809611", role=Role.ADMIN
+        )
+    )
+
+    return client
+
+
+@pytest.fixture
+def orders(django_user_model) -> list[Order]:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809622")
+
+    return Order.objects.bulk_create(
+        Order(
+            user=user,
+            eta=f"2030-01-{day:02d}",
+            status=OrderStatus.COOKING if day % 2 else OrderStatus.DELIVERED,
+            delivery_provider="uber" if day % 3 else "uklon",
+        )
+        for day in range(1, 11)
+    )
+
+
+def ids(response) -> list[int]:
+    return [order["id"] for order in response.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_filters(admin_client: APIClient, orders: list[Order]):
+    response = admin_client.get(
+        "/food/orders/",
+        {
+            "status": "cooking",
+            "deliveryProvider": "uber",
+            "etaFrom": "2030-01-02",
+            "etaTo": "2030-01-07",
+        },
+    )
+
+    assert response.status_code == 200
+    # odd days (cooking), not divisible by 3 (uber), between the 2nd and the 7th
+    assert ids(response) == [orders[6].pk, orders[4].pk]
+    assert response.json()["count"] == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [{"status": "lost"}, {"etaFrom": "tomorrow"}, {"deliveryProvider": "bolt"}, {"x": 1}],
+)
+def test_invalid_filters(admin_client: APIClient, orders: list[Order], params: dict):
+    assert admin_client.get("/food/orders/", params).status_code == 400
+
+
+@pytest.mark.django_db
+def test_cursor_pages_without_count_and_offset(admin_client: APIClient, orders: list[Order]):
+    seen, url = [], "/food/orders/?pagination=cursor&limit=3"
+
+    with CaptureQueriesContext(connection) as queries:
+        while url:
+            response = admin_client.get(url)
+            assert response.status_code == 200
+            seen += ids(response)
+            url = response.json()["next"]
+
+    assert seen == sorted((order.pk for order in orders), reverse=True)
+    assert not any("COUNT(" in query["sql"] or "OFFSET" in query["sql"] for query in queries)
+
+
+@pytest.mark.django_db
+def test_estimated_count_falls_back_to_exact_count(admin_client: APIClient, orders: list[Order]):
+    response = admin_client.get("/food/orders/", {"limit": 2, "count": "estimated"})
+
+    assert response.json()["count"] == 10
+    assert ids(response) == [orders[9].pk, orders[8].pk]
@@ -0,0 +1,99 @@
+import pytest
+from rest_framework.test import APIClient
+
+from food.models import Dish, Order, OrderItem, Restaurant
+from food.views import FoodAPIViewSet
+from shared import queries
+from shared.queries import QueryBudgetExceeded, assert_query_budget, shape
+from users.models import Role
+
+
+@pytest.fixture
+def orders(django_user_model) -> list[Order]:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+    dish = Dish.objects.create(name="Soup", price=100, restaurant=restaurant)
+    orders = Order.objects.bulk_create(Order(user=user, eta="2030-01-01") for _ in range(5))
+    OrderItem.objects.bulk_create(OrderItem(order=order, dish=dish, quantity=1) for order in orders)
+
+    return orders
+
+
+@pytest.fixture
+def admin_client(django_user_model, fake_redis) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(
+        django_user_model.objects.create(
+            email="admin@email.com", phone_number="+3809622", role=Role.ADMIN
+        )
+    )
+
+    return client
+
+
+def test_shape_masks_parameters_and_numbers():
+    assert shape('SELECT * FROM "orders" WHERE "id" IN (%s, %s, %s) LIMIT 21') == (
+        'SELECT * FROM "orders" WHERE "id" IN (%s...) LIMIT ?'
+    )
+    assert shape("SELECT * FROM t1 WHERE id = %s") == "SELECT * FROM t1 WHERE id = %s"
+
+
+@pytest.mark.django_db
+def test_n_plus_one_is_found(orders):
+    with pytest.raises(QueryBudgetExceeded, match="5 times: SELECT"):
+        with assert_query_budget():
+            for item in OrderItem.objects.all():
+                item.order.status
+
+    with assert_query_budget(1):
+        for item in OrderItem.objects.select_related("order"):
+            item.order.status
+
+
+@pytest.mark.django_db
+def test_enclosing_recordings_count_the_queries(orders):
+    with queries.recording() as outer:
+        with queries.recording() as inner:
+            Order.objects.count()
+        with queries.recording(nested=False) as detached:  # an eager Celery task
+            Order.objects.count()
+
+    assert (outer.count, inner.count, detached.count) == (1, 1, 1)
+
+
+@pytest.mark.django_db
+def test_orders_list_does_not_grow_with_the_orders(admin_client, orders):
+    with assert_query_budget(3):  # the count, the page, its items
+        response = admin_client.get("/food/orders/")
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 5
+
+
+@pytest.mark.django_db
+def test_exceeded_view_budget_fails(admin_client, orders, monkeypatch):
+    monkeypatch.setattr(FoodAPIViewSet.orders, "query_budget", {"get": 1, "*": None})
+
+    with pytest.raises(
+        QueryBudgetExceeded, match="FoodAPIViewSet.orders: 3 queries, the budget is 1"
+    ):
+        admin_client.get("/food/orders/")
+
+
+@pytest.mark.django_db
+def test_exceeded_budget_is_logged_if_not_strict(
+    admin_client, orders, monkeypatch, settings, caplog
+):
+    settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, "STRICT": False}
+    monkeypatch.setattr(FoodAPIViewSet.orders, "query_budget", {"*": 1})
+
+    assert admin_client.get("/food/orders/").status_code == 200
+    assert "FoodAPIViewSet.orders: 3 queries, the budget is 1" in caplog.text
+
+
+@pytest.mark.django_db
+def test_not_sampled_requests_are_not_counted(admin_client, orders, monkeypatch, settings):
+    settings.QUERY_BUDGET = {**settings.QUERY_BUDGET, "SAMPLE_RATE": 0}
+    monkeypatch.setattr(FoodAPIViewSet.orders, "query_budget", {"*": 1})
+
+    assert admin_client.get("/food/orders/").status_code == 200
@@ -0,0 +1,130 @@
+"""
+Query plans of the hot ORM queries against a seeded Postgres.
+
+    DJANGO_DB_HOST=localhost python -m pytest tests/integration/test_query_plans.py
+
+A query fails if its plan reads a table with more than
+`SEQ_SCAN_THRESHOLD` rows by a sequential scan, i.e. an index is missing
+or the query stopped matching it. Skipped on other databases: SQLite plans
+say nothing about production.
+"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+from django.db import connection
+from django.db.models import QuerySet
+
+from food.enums import OrderStatus
+from food.models import Dish, Order, OrderItem, Restaurant
+from food.views import FoodFilters
+from users.models import User
+
+SEQ_SCAN_THRESHOLD = 1000
+USERS = 2000
+RESTAURANTS = 2000
+ORDERS = 20_000
+DELIVERY_PROVIDERS = ("uklon", "uber")
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        connection.vendor != "postgresql", reason="query plans are checked on Postgres only"
+    ),
+]
+
+
+@pytest.fixture
+def seeded() -> User:
+    users = User.objects.bulk_create(
+        User(email=f"user{index}@email.com", phone_number=f"+38{index}") for index in range(USERS)
+    )
+    restaurants = Restaurant.objects.bulk_create(
+        [Restaurant(name="Silpo", address="Kyiv"), Restaurant(name="KFC", address="Kyiv")]
+        + [Restaurant(name=f"Restaurant {index}", address="Kyiv") for index in range(RESTAURANTS)]
+    )
+    dishes = Dish.objects.bulk_create(
+        Dish(name=f"Dish {index}", price=100, restaurant=restaurant)
+        for index, restaurant in enumerate(restaurants)
+    )
+    statuses = list(OrderStatus)
+    orders = Order.objects.bulk_create(
+        Order(
+            user=users[index % USERS],
+            status=statuses[index % len(statuses)],
+            delivery_provider=DELIVERY_PROVIDERS[index % 2],
+            eta=date.today() + timedelta(days=index % 365),
+        )
+        for index in range(ORDERS)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, dish=dishes[index % len(dishes)], quantity=1)
+        for index, order in enumerate(orders)
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    return users[0]
+
+
+def hot_queries(user: User) -> dict[str, QuerySet]:
+    today = date.today()
+
+    return {
+        "restaurant by name": Restaurant.objects.filter(name="Silpo"),
+        "user by email": User.objects.filter(email=user.email),
+        "orders of a user": Order.objects.filter(user=user).order_by("-id")[:100],
+        "order by id": Order.objects.filter(id=ORDERS // 2),
+        "order items": OrderItem.objects.filter(order_id__in=[1, 2, 3]),
+        "orders by status": FoodFilters(status="cooking").filter(
+            Order.objects.order_by("-id")
+        )[:100],
+        "orders by provider": FoodFilters(deliveryProvider="uber").filter(
+            Order.objects.order_by("-id")
+        )[:100],
+        "orders by status and eta": FoodFilters(
+            status="cooking", etaFrom=str(today), etaTo=str(today + timedelta(days=7))
+        ).filter(Order.objects.order_by("-id"))[:100],
+    }
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """Tables read by a sequential scan above the threshold, the whole plan tree."""
+
+    found = []
+    if plan["Node Type"] == "Seq Scan" and table_rows(plan["Relation Name"]) > SEQ_SCAN_THRESHOLD:
+        found.append(plan["Relation Name"])
+
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+
+    return found
+
+
+def table_rows(table: str) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [table])
+        return int(cursor.fetchone()[0])
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "restaurant by name",
+        "user by email",
+        "orders of a user",
+        "order by id",
+        "order items",
+        "orders by status",
+        "orders by provider",
+        "orders by status and eta",
+    ],
+)
+def test_hot_query_uses_an_index(seeded: User, name: str):
+    queryset = hot_queries(seeded)[name]
+
+    [explain] = json.loads(queryset.explain(format="json"))
+
+    assert seq_scans(explain["Plan"]) == [], f"{name}: {queryset.query}"
@@ -0,0 +1,112 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from food.models import Order
+from shared import slow_queries
+from users.models import Role
+
+
+@pytest.fixture
+def enabled(settings, fake_redis):
+    """Every query is slow, every SELECT is explained."""
+
+    settings.SLOW_QUERIES = {
+        **settings.SLOW_QUERIES,
+        "ENABLED": True,
+        "THRESHOLD_MS": 0,
+        "EXPLAIN_RATE": 1,
+    }
+    slow_queries.install()
+
+    yield
+
+    connection.execute_wrappers.remove(slow_queries._time)
+    slow_queries.connection_created.disconnect(slow_queries._install_on_connect)
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create(
+        email="admin@email.com",
+        phone_number="+3809611",
+        role=Role.ADMIN,
+        is_staff=True,
+        is_active=True,
+    )
+
+
+@pytest.mark.django_db
+def test_slow_select_is_saved_with_its_plan(enabled):
+    list(Order.objects.filter(id=1))
+
+    [entry] = slow_queries.get_entries()
+
+    assert entry["sql"].startswith('SELECT "orders"')
+    assert entry["sql"].endswith('WHERE "orders"."id" = %s')
+    assert entry["source"] is None
+    assert "SEARCH orders USING INTEGER PRIMARY KEY" in entry["plan"]
+
+
+@pytest.mark.django_db
+def test_one_plan_per_query_shape(enabled):
+    list(Order.objects.filter(id=1))
+    list(Order.objects.filter(id=2))
+
+    plans = [entry["plan"] for entry in slow_queries.get_entries()]
+
+    assert plans[1] is not None and plans[0] is None
+
+
+@pytest.mark.django_db
+def test_writes_are_not_explained(admin, enabled):
+    Order.objects.filter(user=admin).update(total=10)
+
+    assert [entry["plan"] for entry in slow_queries.get_entries()] == [None]
+
+
+@pytest.mark.django_db
+def test_fast_queries_are_not_saved(enabled, settings):
+    settings.SLOW_QUERIES = {**settings.SLOW_QUERIES, "THRESHOLD_MS": 10_000}
+
+    Order.objects.count()
+
+    assert slow_queries.get_entries() == []
+
+
+@pytest.mark.django_db
+def test_source_is_the_view(admin, enabled):
+    client = APIClient()  # its middleware is loaded after SLOW_QUERIES is enabled
+    client.force_authenticate(admin)
+
+    client.get("/food/orders/")
+
+    assert {entry["source"] for entry in slow_queries.get_entries()} == {"FoodAPIViewSet.orders"}
+
+
+@pytest.mark.django_db
+def test_admins_browse_the_slow_queries(admin, enabled, client):
+    list(Order.objects.filter(id=1))
+    client.force_login(admin)
+
+    response = client.get("/admin/slow-queries/")
+
+    assert response.status_code == 200
+    assert "SEARCH orders USING INTEGER PRIMARY KEY" in response.content.decode()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("count", ["many", "0", "100000"])
+def test_count_of_the_slow_queries_is_validated(admin, enabled, client, count):
+    client.force_login(admin)
+
+    assert client.get("/admin/slow-queries/", {"count": count}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_only_staff_browse_the_slow_queries(client, django_user_model):
+    client.force_login(
+        django_user_model.objects.create(email="john@email.com", phone_number="+3809622")
+    )
+
+    assert client.get("/admin/slow-queries/").status_code == 302
@@ -0,0 +1,255 @@
+import pytest
+from django.test.client import Client
+
+from food.enums import OrderStatus
+from food.models import Order, Restaurant
+from food.tracking import LocationHistory, TrackingOrder, TrackingOrderStore
+from food.webhooks import WebhookConsumer
+from shared.cache import CacheService
+
+KFC_WEBHOOK_URL = "/webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/"
+
+
+@pytest.fixture
+def consumer(fake_redis) -> WebhookConsumer:
+    return WebhookConsumer(name="test")
+
+
+@pytest.fixture
+def kfc_order(django_user_model, fake_redis) -> Order:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    silpo = Restaurant.objects.create(name="Silpo", address="Kyiv")
+    kfc = Restaurant.objects.create(name="KFC", address="Kyiv")
+    order = Order.objects.create(user=user, eta="2030-01-01", status=OrderStatus.COOKING)
+
+    TrackingOrderStore().create(
+        order_id=order.pk,
+        tracking_order=TrackingOrder(
+            restaurants={
+                str(silpo.pk): {"external_id": "ext-1", "status": OrderStatus.COOKED},
+                str(kfc.pk): {"external_id": "ext-2", "status": OrderStatus.COOKING},
+            }
+        ),
+    )
+    CacheService().set(
+        namespace="kfc_orders",
+        key="ext-2",
+        value={"internal_order_id": order.pk, "restaurant_id": kfc.pk},
+    )
+
+    return order
+
+
+@pytest.mark.django_db
+def test_kfc_webhook_cooks_the_order(client: Client, kfc_order: Order, consumer):
+    response = client.post(KFC_WEBHOOK_URL, data={"id": "ext-2", "status": "finished"})
+
+    kfc_order.refresh_from_db()
+    assert response.status_code == 200
+    assert kfc_order.status == OrderStatus.COOKING  # not applied yet
+
+    assert consumer.run_once() == 1
+
+    kfc_order.refresh_from_db()
+    assert kfc_order.status == OrderStatus.COOKED
+
+
+@pytest.mark.django_db
+def test_kfc_webhook_retry_is_ignored(client: Client, kfc_order: Order, consumer):
+    client.post(KFC_WEBHOOK_URL, data={"id": "ext-2", "status": "finished"})
+    consumer.run_once()
+    Order.objects.filter(id=kfc_order.pk).update(status=OrderStatus.DELIVERY)
+
+    response = client.post(KFC_WEBHOOK_URL, data={"id": "ext-2", "status": "finished"})
+
+    assert response.status_code == 200
+    assert consumer.run_once() == 0
+
+    kfc_order.refresh_from_db()
+    assert kfc_order.status == OrderStatus.DELIVERY
+
+
+@pytest.mark.django_db
+def test_kfc_retry_storm_is_added_once(client: Client, kfc_order: Order, consumer):
+    for _ in range(50):
+        response = client.post(
+            KFC_WEBHOOK_URL,
+            data={"id": "ext-2", "status": "finished"},
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+
+    assert CacheService().connection.xlen("webhooks:kfc") == 1
+    assert consumer.run_once() == 1
+
+
+@pytest.mark.django_db
+def test_kfc_webhook_rejects_unknown_status(client: Client, fake_redis):
+    response = client.post(KFC_WEBHOOK_URL, data={"id": "ext-2", "status": "eaten"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_kfc_webhook_for_an_unknown_order_is_acknowledged(client: Client, consumer):
+    client.post(KFC_WEBHOOK_URL, data={"id": "ext-404", "status": "finished"})
+
+    assert consumer.run_once() == 1
+    assert CacheService().connection.xpending("webhooks:kfc", "appliers")["pending"] == 0
+
+
+@pytest.mark.django_db
+def test_failed_batch_is_applied_again_after_a_restart(
+    client: Client, kfc_order: Order, consumer, monkeypatch
+):
+    client.post(KFC_WEBHOOK_URL, data={"id": "ext-2", "status": "finished"})
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("the database is gone")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("food.webhooks.transition_orders", broken)
+        assert consumer.run_once() == 0
+
+    # the restaurant is cooked already, the order is cooked from the pending entry
+    assert WebhookConsumer(name="test").run_once() == 1
+
+    kfc_order.refresh_from_db()
+    assert kfc_order.status == OrderStatus.COOKED
+
+
+@pytest.mark.django_db
+def test_bad_event_does_not_hold_its_batch(client: Client, kfc_order: Order, consumer, settings):
+    settings.WEBHOOKS = {**settings.WEBHOOKS, "CLAIM_IDLE_SECONDS": 0, "MAX_ATTEMPTS": 2}
+    # a mapping written before the restaurant id was kept
+    CacheService().set(namespace="kfc_orders", key="ext-old", value={"internal_order_id": 1})
+    client.post(KFC_WEBHOOK_URL, data={"id": "ext-old", "status": "finished"})
+    client.post(KFC_WEBHOOK_URL, data={"id": "ext-2", "status": "finished"})
+
+    consumer = WebhookConsumer(name="test")
+    assert consumer.run_once() == 1
+
+    kfc_order.refresh_from_db()
+    assert kfc_order.status == OrderStatus.COOKED
+
+    # claimed again, the second delivery is the last one
+    assert consumer.run_once() == 0
+    connection = CacheService().connection
+    assert connection.xpending("webhooks:kfc", "appliers")["pending"] == 0
+    [(_, dead)] = CacheService().get_stream(namespace="webhooks", key="kfc:dead")
+    assert dead["event"] == {"id": "ext-old", "status": "finished"}
+    assert "KeyError" in dead["error"]
+
+
+def test_restart_with_trimmed_pending_entries(client: Client, consumer):
+    client.post(
+        "/api/uber/webhook/",
+        data={"order_id": 17, "lat": 1, "lng": 2},
+        content_type="application/json",
+    )
+    [(_, [(entry_id, _)])] = consumer._read(">", block_ms=None).items()
+    CacheService().connection.xdel("webhooks:uber", entry_id)  # trimmed, never applied
+    client.post(
+        "/api/uber/webhook/",
+        data={"order_id": 18, "lat": 3, "lng": 4},
+        content_type="application/json",
+    )
+
+    restarted = WebhookConsumer(name="test")
+    restarted.run_once()
+    restarted.run_once()
+
+    assert TrackingOrderStore().get(18).delivery["location"] == {"lat": 3, "lng": 4}
+    assert CacheService().connection.xpending("webhooks:uber", "appliers")["pending"] == 0
+
+
+def test_applied_entries_are_trimmed(client: Client, consumer):
+    for step in range(3):
+        client.post(
+            "/api/uber/webhook/",
+            data={"order_id": 17, "lat": step, "lng": 2},
+            content_type="application/json",
+        )
+
+    consumer.run_once()
+
+    assert CacheService().connection.xlen("webhooks:uber") <= 1
+
+
+def test_entries_of_a_dead_consumer_are_claimed(client: Client, consumer, settings):
+    settings.WEBHOOKS = {**settings.WEBHOOKS, "CLAIM_IDLE_SECONDS": 0}
+    client.post(
+        "/api/uber/webhook/",
+        data={"order_id": 17, "lat": 1, "lng": 2},
+        content_type="application/json",
+    )
+    consumer._read(">", block_ms=None)  # read, then the consumer is gone
+
+    assert WebhookConsumer(name="other").run_once() == 1
+    assert TrackingOrderStore().get(17).delivery["location"] == {"lat": 1, "lng": 2}
+
+
+def test_uber_webhook_stores_the_location(client: Client, consumer):
+    for step in range(3):
+        response = client.post(
+            "/api/uber/webhook/",
+            data={"order_id": 17, "lat": 46.48 + step, "lng": 30.72},
+            content_type="application/json",
+        )
+        assert response.status_code == 200
+
+    assert consumer.run_once() == 3
+    assert TrackingOrderStore().get(17).delivery["location"] == {"lat": 48.48, "lng": 30.72}
+    assert [point["lat"] for point in LocationHistory().range(17)] == [46.48, 47.48, 48.48]
+
+
+def test_uber_webhook_rejects_incomplete_location(client: Client, fake_redis):
+    response = client.post(
+        "/api/uber/webhook/", data={"order_id": 17}, content_type="application/json"
+    )
+
+    assert response.status_code == 400
+
+
+def test_uber_webhook_rejects_malformed_json(client: Client, fake_redis):
+    response = client.post("/api/uber/webhook/", data="{", content_type="application/json")
+
+    assert response.status_code == 400
+
+
+def test_uber_webhook_retry_is_added_once(client: Client, consumer):
+    for _ in range(3):
+        client.post(
+            "/api/uber/webhook/",
+            data={"order_id": 17, "lat": 1, "lng": 2, "timestamp": 10},
+            content_type="application/json",
+            headers={"X-Event-Id": "batch-1"},
+        )
+
+    assert consumer.run_once() == 1
+    assert LocationHistory().range(17) == [{"lat": 1, "lng": 2, "timestamp": 10}]
+
+
+def test_uber_webhook_stores_a_batch(client: Client, consumer):
+    response = client.post(
+        "/api/uber/webhook/",
+        data={
+            "locations": [
+                {"order_id": 17, "lat": 1, "lng": 2, "timestamp": 10},
+                {"order_id": 18, "lat": 3, "lng": 4, "timestamp": 10},
+                {"order_id": 17, "lat": 5, "lng": 6, "timestamp": 11},
+            ]
+        },
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response.json()["count"] == 3
+
+    consumer.run_once()
+    assert TrackingOrderStore().get(17).delivery["location"] == {"lat": 5, "lng": 6}
+    assert LocationHistory().range(17) == [
+        {"lat": 1, "lng": 2, "timestamp": 10},
+        {"lat": 5, "lng": 6, "timestamp": 11},
+    ]
+    assert LocationHistory().range(18) == [{"lat": 3, "lng": 4, "timestamp": 10}]
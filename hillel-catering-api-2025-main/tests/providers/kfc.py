@@ -1,5 +1,6 @@
+import asyncio
+import os
 import random
-import time
 import uuid
 from typing import Literal
 
@@ -9,8 +10,8 @@ from pydantic import BaseModel
 
 OrderStatus = Literal["not started", "cooking", "cooked", "finished"]
 STORAGE: dict[str, OrderStatus] = {}
-CATERING_API_WEBHOOK_URL = (
-    "http://api:8000/webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/"
+CATERING_API_WEBHOOK_URL = os.getenv(
+    "KFC_WEBHOOK_URL", "http://api:8000/webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/"
 )
 
 
@@ -29,7 +30,8 @@ class OrderRequestBody(BaseModel):
 async def update_order_status(order_id: str):
     ORDER_STATUSES: tuple[OrderStatus, ...] = ("cooking", "cooked", "finished")
     for status in ORDER_STATUSES:
-        time.sleep(random.randint(4, 6))
+        # not time.sleep: the event loop serves the other orders meanwhile
+        await asyncio.sleep(random.randint(4, 6))
         STORAGE[order_id] = status
         print(f"KFC: [{order_id}] --> {status}")
 
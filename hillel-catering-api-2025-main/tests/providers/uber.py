@@ -1,27 +1,215 @@
-import requests
+"""
+Uber delivery simulator.
+
+One process, one event loop: every delivery is a coroutine that moves a
+courier along its route, so thousands of deliveries cost thousands of
+sleeping coroutines instead of thousands of processes.
+
+    POST   /api/deliveries         {"order_id": 17, "points": 10, "speed": 2.0}
+    GET    /api/deliveries/17      {"id": 17, "status": "moving", "location": {...}}
+    DELETE /api/deliveries/17
+
+Locations of all couriers are buffered and posted to the webhook in
+batches (every UBER_BATCH_INTERVAL seconds or UBER_BATCH_SIZE points):
+
+    POST /api/uber/webhook/
+    {"locations": [{"order_id": 17, "lat": ..., "lng": ..., "timestamp": ...}, ...]}
+
+    UBER_POINTS=10            points of a route, when the request has none
+    UBER_SPEED=1.0            points per second of one courier
+    UBER_BATCH_SIZE=500
+    UBER_BATCH_INTERVAL=1.0
+    UBER_WEBHOOK_URL=http://localhost:8000/api/uber/webhook/
+"""
+
+import asyncio
+import os
+import random
 import time
-import sys
-
-WEBHOOK_URL = "http://host.docker.internal:8000/api/uber/webhook/"
-
-def simulate_uber_delivery(order_id: int):
-    print(f"[UBER] Starting delivery for order {order_id} -> {WEBHOOK_URL}")
-    
-    lat, lng = 46.4825, 30.7233
-    for i in range(10):
-        data = {
-            "order_id": order_id,
-            "latitude": lat + i * 0.0001,
-            "longitude": lng + i * 0.0001,
-            "status": "moving"
-        }
-        try:
-            resp = requests.post(WEBHOOK_URL, json=data)
-            print(f"[UBER] Sent update #{i+1}, status: {resp.status_code}")
-        except Exception as e:
-            print(f"[UBER] Error sending update: {e}")
-        time.sleep(1)
-
-if __name__ == "__main__":
-    order_id = int(sys.argv[1]) if len(sys.argv) > 1 else 1
-    simulate_uber_delivery(order_id)
\ No newline at end of file
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Literal
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+DeliveryStatus = Literal["moving", "delivered", "cancelled"]
+START = (46.4825, 30.7233)
+STEP = 0.0001  # degrees between two points
+
+
+@dataclass(frozen=True)
+class SimulatorConfig:
+    webhook_url: str = os.getenv(
+        "UBER_WEBHOOK_URL", "http://localhost:8000/api/uber/webhook/"
+    )
+    points: int = int(os.getenv("UBER_POINTS", 10))
+    speed: float = float(os.getenv("UBER_SPEED", 1.0))
+    batch_size: int = int(os.getenv("UBER_BATCH_SIZE", 500))
+    batch_interval: float = float(os.getenv("UBER_BATCH_INTERVAL", 1.0))
+
+
+@dataclass
+class Delivery:
+    order_id: int
+    status: DeliveryStatus = "moving"
+    location: dict = field(default_factory=dict)
+    task: asyncio.Task | None = None
+
+
+class DeliverySimulator:
+    """
+    simulator = DeliverySimulator(SimulatorConfig(speed=5.0))
+    simulator.start(order_id=17, points=100)
+    ...
+    await simulator.aclose()  # stops the couriers and posts the last batch
+    """
+
+    def __init__(self, config: SimulatorConfig, client: httpx.AsyncClient | None = None):
+        self.config = config
+        # one pool of keep-alive connections for every batch
+        self.client = client or httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            timeout=httpx.Timeout(connect=1.0, read=10.0, write=10.0, pool=10.0),
+        )
+        self.deliveries: dict[int, Delivery] = {}
+        self.sent = 0
+        self._buffer: list[dict] = []
+        self._full = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+
+    def start(
+        self, order_id: int, points: int | None = None, speed: float | None = None
+    ) -> Delivery:
+        self.stop(order_id)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+        delivery = self.deliveries[order_id] = Delivery(order_id=order_id)
+        delivery.task = asyncio.create_task(
+            self._drive(delivery, points or self.config.points, speed or self.config.speed)
+        )
+
+        return delivery
+
+    def stop(self, order_id: int) -> bool:
+        delivery = self.deliveries.get(order_id)
+        if delivery is None or delivery.task is None or delivery.task.done():
+            return False
+
+        delivery.task.cancel()
+        delivery.status = "cancelled"
+        return True
+
+    async def _drive(self, delivery: Delivery, points: int, speed: float) -> None:
+        interval = 1 / speed
+        lat, lng = START
+        heading_lat, heading_lng = random.uniform(-1, 1), random.uniform(-1, 1)
+
+        # couriers started together do not report at the same moment
+        await asyncio.sleep(random.uniform(0, interval))
+
+        for step in range(points):
+            delivery.location = {
+                "lat": round(lat + heading_lat * STEP * step, 6),
+                "lng": round(lng + heading_lng * STEP * step, 6),
+            }
+            self._emit(
+                {"order_id": delivery.order_id, **delivery.location, "timestamp": time.time()}
+            )
+            if step < points - 1:
+                await asyncio.sleep(interval)
+
+        delivery.status = "delivered"
+
+    def _emit(self, point: dict) -> None:
+        self._buffer.append(point)
+        if len(self._buffer) >= self.config.batch_size:
+            self._full.set()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.config.batch_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._buffer:
+            batch = self._buffer[: self.config.batch_size]
+            del self._buffer[: self.config.batch_size]
+            if len(self._buffer) < self.config.batch_size:
+                self._full.clear()
+
+            try:
+                response = await self.client.post(
+                    self.config.webhook_url, json={"locations": batch}
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as error:
+                # a stale location is useless, the next batch has newer ones
+                print(f"UBER: {len(batch)} locations are lost: {error!r}")
+            else:
+                self.sent += len(batch)
+
+    async def aclose(self) -> None:
+        tasks = [d.task for d in self.deliveries.values() if d.task is not None]
+        if self._flusher is not None:
+            tasks.append(self._flusher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        await self.flush()
+        await self.client.aclose()
+
+
+simulator: DeliverySimulator | None = None
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    global simulator
+
+    simulator = DeliverySimulator(SimulatorConfig())
+    yield
+    await simulator.aclose()
+
+
+app = FastAPI(title="Uber API", lifespan=lifespan)
+
+
+class DeliveryRequestBody(BaseModel):
+    order_id: int
+    points: int | None = Field(default=None, gt=0)
+    speed: float | None = Field(default=None, gt=0)
+
+
+def serialize(delivery: Delivery) -> dict:
+    return {"id": delivery.order_id, "status": delivery.status, "location": delivery.location}
+
+
+@app.post("/api/deliveries")
+async def start_delivery(body: DeliveryRequestBody):
+    delivery = simulator.start(body.order_id, points=body.points, speed=body.speed)
+    print(f"UBER: [{body.order_id}] --> moving")
+
+    return serialize(delivery)
+
+
+@app.get("/api/deliveries/{order_id}")
+async def get_delivery(order_id: int):
+    if order_id not in simulator.deliveries:
+        raise HTTPException(status_code=404, detail="No such delivery")
+
+    return serialize(simulator.deliveries[order_id])
+
+
+@app.delete("/api/deliveries/{order_id}")
+async def stop_delivery(order_id: int):
+    if not simulator.stop(order_id):
+        raise HTTPException(status_code=404, detail="No moving delivery")
+
+    return serialize(simulator.deliveries[order_id])
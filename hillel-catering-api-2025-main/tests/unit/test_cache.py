@@ -0,0 +1,75 @@
+from shared.cache import CacheService
+
+
+def test_services_share_connection_pool(fake_redis):
+    first, second = CacheService(), CacheService()
+
+    assert first.connection.connection_pool is second.connection.connection_pool
+
+
+def test_get_missing_key(fake_redis):
+    assert CacheService().get(namespace="orders", key="404") is None
+
+
+def test_set_many_get_many(fake_redis):
+    cache = CacheService()
+
+    cache.set_many(namespace="orders", mapping={"1": {"a": 1}, "2": {"b": 2}}, ttl=60)
+
+    assert cache.get_many(namespace="orders", keys=["1", "2", "3"]) == {
+        "1": {"a": 1},
+        "2": {"b": 2},
+        "3": None,
+    }
+    assert 0 < fake_redis.ttl("orders:1") <= 60
+
+
+def test_pipeline(fake_redis):
+    cache = CacheService()
+
+    with cache.pipeline() as pipe:
+        pipe.set(namespace="orders", key="1", value={"a": 1})
+        pipe.get(namespace="orders", key="1")
+        pipe.delete(namespace="orders", key="1")
+        pipe.get(namespace="orders", key="1")
+
+    assert pipe.results == [True, {"a": 1}, 1, None]
+
+
+def test_add_only_missing_key(fake_redis):
+    cache = CacheService()
+
+    assert cache.add(namespace="locks", key="menu", value=1, ttl=30) is True
+    assert cache.add(namespace="locks", key="menu", value=2, ttl=30) is False
+    assert cache.get(namespace="locks", key="menu") == 1
+
+
+def test_incr(fake_redis):
+    cache = CacheService()
+
+    assert [cache.incr(namespace="menu", key="version") for _ in range(2)] == [1, 2]
+    assert cache.get(namespace="menu", key="version") == 2
+
+
+def test_blobs_are_replaced_as_a_whole(fake_redis):
+    cache = CacheService()
+
+    cache.set_blobs(namespace="menu", key="snapshot", mapping={"a": b"\x1f\x8b", "b": b"1"})
+    cache.set_blobs(namespace="menu", key="snapshot", mapping={"a": b"2"}, ttl=60)
+
+    assert cache.get_blobs(namespace="menu", key="snapshot", fields=["a", "b"]) == {
+        "a": b"2",
+        "b": None,
+    }
+    assert 0 < fake_redis.ttl("menu:snapshot") <= 60
+
+
+def test_add_to_stream_is_capped(fake_redis):
+    cache = CacheService()
+
+    for index in range(300):
+        cache.add_to_stream(namespace="log", key="entries", value={"index": index}, max_length=100)
+
+    entries = cache.get_stream(namespace="log", key="entries")
+    assert 100 <= len(entries) < 300
+    assert entries[-1][1] == {"index": 299}
@@ -0,0 +1,84 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+from types import SimpleNamespace
+
+import pytest
+
+from shared import log
+
+
+@pytest.fixture
+def written():
+    """Records of the `test.log` logger, through the queue and the listener thread."""
+
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(log.JsonFormatter())
+    handler = log.OrderQueueHandler(queue.SimpleQueue())
+    listener = QueueListener(handler.queue, target)
+
+    logger = logging.getLogger("test.log")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    listener.start()
+
+    def read() -> list[dict]:
+        listener.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield logger, read
+
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def test_records_carry_the_bound_order(written):
+    logger, read = written
+
+    with log.bind_order(17):
+        logger.info("Order is created for %s", "john", extra={"eta": "2030-01-01"})
+    logger.info("No order", extra={"order_id": 5})
+    logger.info("Nothing")
+
+    first, second, third = read()
+    assert first["message"] == "Order is created for john"
+    assert (first["order_id"], first["eta"], first["logger"]) == (17, "2030-01-01", "test.log")
+    assert second["order_id"] == 5
+    assert third["order_id"] is None
+
+
+def test_traceback_is_rendered_in_the_calling_thread(written):
+    logger, read = written
+
+    try:
+        raise ValueError("broken")
+    except ValueError:
+        logger.exception("Failed")
+
+    [record] = read()
+    assert record["message"] == "Failed"
+    assert "ValueError: broken" in record["exc"]
+
+
+def test_levels_per_module():
+    assert log.levels("INFO", " food.polling=debug, shared=WARNING ,") == {
+        "food": {"level": "INFO"},
+        "users": {"level": "INFO"},
+        "shared": {"level": "WARNING"},
+        "food.polling": {"level": "DEBUG"},
+    }
+
+
+def test_task_with_an_order_id_is_bound():
+    task = SimpleNamespace(request=SimpleNamespace())
+
+    log._task_started(task=task, kwargs={"order_id": 3, "items": []})
+    assert log._order_id.get() == 3
+
+    log._task_finished(task=task)
+    assert log._order_id.get() is None
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from food.providers import kfc, silpo, uber
+from shared import metrics
+from shared.cache import CacheService
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_cache_hits_and_misses_per_namespace(fake_redis):
+    cache = CacheService()
+    hits = sample("cache_requests_total", namespace="metrics_test", result="hit")
+    misses = sample("cache_requests_total", namespace="metrics_test", result="miss")
+    gets = sample(
+        "cache_operation_duration_seconds_count", namespace="metrics_test", operation="get"
+    )
+
+    cache.set(namespace="metrics_test", key="1", value={"a": 1})
+    cache.get(namespace="metrics_test", key="1")
+    cache.get(namespace="metrics_test", key="2")
+    cache.get_many(namespace="metrics_test", keys=["1", "2", "3"])
+
+    assert sample("cache_requests_total", namespace="metrics_test", result="hit") == hits + 2
+    assert sample("cache_requests_total", namespace="metrics_test", result="miss") == misses + 3
+    assert (
+        sample("cache_operation_duration_seconds_count", namespace="metrics_test", operation="get")
+        == gets + 2
+    )
+
+
+def test_cache_pipeline_counts_its_reads(fake_redis):
+    cache = CacheService()
+    hits = sample("cache_requests_total", namespace="metrics_pipe", result="hit")
+    misses = sample("cache_requests_total", namespace="metrics_pipe", result="miss")
+
+    with cache.pipeline() as pipe:
+        pipe.set(namespace="metrics_pipe", key="1", value={"a": 1})
+        pipe.get(namespace="metrics_pipe", key="1")
+        pipe.get(namespace="metrics_pipe", key="2")
+
+    assert sample("cache_requests_total", namespace="metrics_pipe", result="hit") == hits + 1
+    assert sample("cache_requests_total", namespace="metrics_pipe", result="miss") == misses + 1
+
+
+def test_provider_call_counts_errors_by_type():
+    @metrics.provider_call("test_provider", "fail")
+    def fail():
+        raise ConnectionError("down")
+
+    calls = sample(
+        "provider_request_duration_seconds_count", provider="test_provider", operation="fail"
+    )
+
+    with pytest.raises(ConnectionError):
+        fail()
+
+    assert sample(
+        "provider_request_errors_total",
+        provider="test_provider",
+        operation="fail",
+        error="ConnectionError",
+    ) == 1
+    assert (
+        sample(
+            "provider_request_duration_seconds_count", provider="test_provider", operation="fail"
+        )
+        == calls + 1
+    )
+
+
+def test_provider_call_of_a_coroutine():
+    @metrics.provider_call("test_provider", "async_ok")
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(ok()) == "ok"
+    assert sample(
+        "provider_request_duration_seconds_count", provider="test_provider", operation="async_ok"
+    ) == 1
+
+
+@pytest.mark.parametrize(
+    "method",
+    [
+        silpo.Client.create_order,
+        silpo.Client.get_order,
+        silpo.AsyncClient.create_order,
+        silpo.AsyncClient.get_order,
+        kfc.Client.create_order,
+        uber.UberClient.start_delivery,
+        uber.UberClient.stop_delivery,
+    ],
+)
+def test_provider_clients_are_measured(method):
+    assert hasattr(method, "__wrapped__")
+
+
+def test_sample_overhead():
+    samples = 100_000
+    duration = metrics.child(metrics.PROVIDER_DURATION, "test_provider", "overhead")
+
+    started = time.perf_counter()
+    for _ in range(samples):
+        duration.observe(time.perf_counter() - started)
+    elapsed = time.perf_counter() - started
+
+    # a few microseconds per sample, with room for slow CI machines
+    assert elapsed / samples < 5e-6
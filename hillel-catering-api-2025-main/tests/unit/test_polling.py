@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import httpx
+import redis
+import pytest
+from asgiref.sync import async_to_sync
+
+from food.enums import OrderStatus
+from food.models import Order, Restaurant
+from food.polling import (
+    SILPO_DEAD_KEY,
+    SILPO_FAILURES_KEY,
+    SILPO_TRACKING_KEY,
+    SilpoTracker,
+    register_silpo_order,
+)
+from food.providers import silpo
+from food.tracking import TrackingOrder, TrackingOrderStore
+
+
+def silpo_stand_in(statuses: list[str]) -> httpx.MockTransport:
+    """Answer `not started` on creation, then walk through `statuses`."""
+
+    remaining = iter(statuses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, json={"id": "ext-1", "status": "not started"})
+
+        return httpx.Response(200, json={"id": "ext-1", "status": next(remaining)})
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture
+def silpo_order(django_user_model, fake_redis) -> tuple[Order, Restaurant]:
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+    order = Order.objects.create(user=user, eta="2030-01-01")
+
+    tracking_order = TrackingOrder(
+        restaurants={
+            str(restaurant.pk): {"external_id": None, "status": OrderStatus.NOT_STARTED}
+        }
+    )
+    TrackingOrderStore().create(order_id=order.pk, tracking_order=tracking_order)
+
+    return order, restaurant
+
+
+@pytest.mark.django_db
+def test_register_silpo_order(fake_redis):
+    register_silpo_order(order_id=17, items=[{"dish": "Salad", "quantity": 2}])
+
+    registered = fake_redis.hgetall(SILPO_TRACKING_KEY)
+
+    assert json.loads(registered[b"17"]) == [{"dish": "Salad", "quantity": 2}]
+
+
+@pytest.mark.django_db
+def test_track_until_cooked(silpo_order):
+    order, restaurant = silpo_order
+    http = httpx.AsyncClient(transport=silpo_stand_in(["cooking", "cooked"]))
+    tracker = SilpoTracker(client=silpo.AsyncClient(http=http), poll_interval=0)
+
+    async_to_sync(tracker.track)(order.pk, [{"dish": "Salad", "quantity": 2}])
+
+    order.refresh_from_db()
+    tracking_order = TrackingOrderStore().get(order.pk)
+
+    assert order.status == OrderStatus.COOKED
+    assert tracking_order.restaurants[str(restaurant.pk)] == {
+        "external_id": "ext-1",
+        "status": OrderStatus.COOKED,
+    }
+
+
+@pytest.mark.django_db
+def test_failing_order_is_moved_to_dead_letters(silpo_order, fake_redis):
+    order, _ = silpo_order
+    fake_redis.delete(f"orders:{order.pk}")  # the tracking order is gone for good
+    register_silpo_order(order_id=order.pk, items=[{"dish": "Salad", "quantity": 2}])
+    http = httpx.AsyncClient(transport=silpo_stand_in([]))
+    tracker = SilpoTracker(client=silpo.AsyncClient(http=http), poll_interval=0, max_attempts=2)
+
+    async def fail_twice():
+        for _ in range(2):
+            await tracker._track_and_release(order.pk, [{"dish": "Salad", "quantity": 2}])
+        await tracker.cache.aclose()
+
+    async_to_sync(fail_twice)()
+
+    dead = json.loads(fake_redis.hget(SILPO_DEAD_KEY, str(order.pk)))
+
+    assert fake_redis.hget(SILPO_TRACKING_KEY, str(order.pk)) is None
+    assert fake_redis.hget(SILPO_FAILURES_KEY, str(order.pk)) is None
+    assert dead["error"] == "ValueError('No Silpo in orders processing')"
+
+
+@pytest.mark.django_db
+def test_scan_survives_redis_errors(fake_redis, monkeypatch):
+    tracker = SilpoTracker(client=silpo.AsyncClient(http=httpx.AsyncClient()), scan_interval=0)
+    scans = 0
+
+    async def flaky_hgetall(key):
+        nonlocal scans
+        scans += 1
+        if scans == 1:
+            raise redis.ConnectionError("Redis restarted")
+        raise asyncio.CancelledError  # stop serving after the second scan
+
+    monkeypatch.setattr(tracker.cache.connection, "hgetall", flaky_hgetall)
+
+    with pytest.raises(asyncio.CancelledError):
+        async_to_sync(tracker.serve)()
+
+    assert scans == 2
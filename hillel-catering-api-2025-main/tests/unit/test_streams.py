@@ -0,0 +1,121 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+
+from food.enums import OrderStatus
+from food.streams import OrderEventHub, order_events
+from food.tracking import TrackingOrder, TrackingOrderStore
+from food.transitions import transition_restaurant
+
+SILPO = "1"
+TIMEOUT = 10.0
+
+
+def run(scenario):
+    """Run the coroutine function, a hanging stream fails the test instead of the suite."""
+
+    async def bounded():
+        task = asyncio.create_task(scenario())
+        done, _ = await asyncio.wait({task}, timeout=TIMEOUT)
+        if not done:
+            task.cancel()
+            raise TimeoutError(f"the scenario did not finish in {TIMEOUT}s")
+
+        return task.result()
+
+    return async_to_sync(bounded)()
+
+
+def create_order(order_id: int = 17) -> TrackingOrderStore:
+    store = TrackingOrderStore()
+    store.create(
+        order_id=order_id,
+        tracking_order=TrackingOrder(
+            restaurants={SILPO: {"external_id": None, "status": OrderStatus.NOT_STARTED}}
+        ),
+    )
+
+    return store
+
+
+def test_hub_fans_out_one_channel(fake_redis):
+    store = create_order()
+
+    async def scenario():
+        hub = OrderEventHub()
+        async with hub.subscribe(17) as first, hub.subscribe(17) as second:
+            async with hub.subscribe(18) as other:
+                assert fake_redis.pubsub_numsub("orders:17:events") == [
+                    (b"orders:17:events", 1)
+                ]
+
+                await asyncio.to_thread(
+                    store.update_restaurant, 17, SILPO, status=OrderStatus.COOKING
+                )
+
+                events = [
+                    await asyncio.wait_for(queue.get(), timeout=2)
+                    for queue in (first, second)
+                ]
+                assert other.empty()
+
+        assert hub.subscribers == {}
+        await hub.close()
+
+        return events
+
+    events = run(scenario)
+
+    assert events == [
+        'event: update\ndata: {"restaurants": {"1": {"status": "cooking"}}, "delivery": {}}\n\n'
+    ] * 2
+
+
+def test_stream_sends_snapshot_updates_and_heartbeat(fake_redis):
+    store = create_order()
+
+    async def scenario():
+        hub = OrderEventHub()
+        stream = order_events(17, hub=hub, heartbeat=0.2)
+
+        snapshot = await anext(stream)
+        await asyncio.to_thread(
+            transition_restaurant,
+            17,
+            SILPO,
+            expected=OrderStatus.NOT_STARTED,
+            new=OrderStatus.COOKING,
+            external_id="ext-1",
+        )
+        # rejected by compare-and-set, so nothing is published
+        await asyncio.to_thread(
+            transition_restaurant,
+            17,
+            SILPO,
+            expected=OrderStatus.NOT_STARTED,
+            new=OrderStatus.COOKED,
+        )
+        await asyncio.to_thread(
+            store.append_location, 17, {"lat": 1, "lng": 2, "timestamp": 1}
+        )
+
+        messages = [snapshot] + [await anext(stream) for _ in range(3)]
+        await stream.aclose()
+        await hub.close()
+
+        return messages
+
+    snapshot, cooking, location, ping = run(scenario)
+
+    assert snapshot.startswith("event: snapshot\n")
+    assert '"status": "not_started"' in snapshot
+    assert cooking == (
+        "event: update\n"
+        'data: {"restaurants": {"1": {"status": "cooking", "external_id": "ext-1"}}, '
+        '"delivery": {}}\n\n'
+    )
+    assert location == (
+        "event: update\n"
+        'data: {"restaurants": {}, "delivery": {"location": {"lat": 1, "lng": 2}}}\n\n'
+    )
+    assert ping == ": ping\n\n"
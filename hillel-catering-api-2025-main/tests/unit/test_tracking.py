@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from food.enums import OrderStatus
+from food.tracking import LocationHistory, TrackingOrder, TrackingOrderStore
+
+SILPO, KFC = "1", "2"
+
+
+def test_store_round_trip(fake_redis):
+    store = TrackingOrderStore()
+    tracking_order = TrackingOrder(
+        restaurants={
+            SILPO: {"external_id": None, "status": OrderStatus.NOT_STARTED},
+            KFC: {"external_id": "ext-2", "status": OrderStatus.COOKING},
+        },
+        delivery={"provider": "uber", "location": {"lat": 1.0, "lng": 2.0}},
+    )
+
+    store.create(order_id=17, tracking_order=tracking_order)
+
+    assert store.get(17) == tracking_order
+
+
+def test_update_single_field(fake_redis):
+    store = TrackingOrderStore()
+    store.create(
+        order_id=17,
+        tracking_order=TrackingOrder(
+            restaurants={SILPO: {"external_id": "ext-1", "status": OrderStatus.COOKING}}
+        ),
+    )
+
+    result = store.update_restaurant(17, SILPO, read_back=True, status=OrderStatus.COOKED)
+
+    assert result.restaurants[SILPO] == {"external_id": "ext-1", "status": OrderStatus.COOKED}
+    assert fake_redis.hget("orders:17", "restaurants:1:status") == b'"cooked"'
+
+
+def test_parallel_updates_do_not_overwrite_each_other(fake_redis):
+    """Silpo, KFC and the courier write the same order at the same time."""
+
+    store = TrackingOrderStore()
+    store.create(
+        order_id=17,
+        tracking_order=TrackingOrder(
+            restaurants={
+                SILPO: {"external_id": None, "status": OrderStatus.NOT_STARTED},
+                KFC: {"external_id": None, "status": OrderStatus.NOT_STARTED},
+            }
+        ),
+    )
+    points = 200
+
+    def silpo_updates():
+        for step in range(points):
+            store.update_restaurant(17, SILPO, external_id="silpo", status=f"silpo-{step}")
+
+    def kfc_updates():
+        for step in range(points):
+            store.update_restaurant(17, KFC, external_id="kfc", status=f"kfc-{step}")
+
+    def courier_updates():
+        for step in range(points):
+            store.append_location(17, {"lat": step, "lng": step, "timestamp": step})
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(job) for job in (silpo_updates, kfc_updates, courier_updates)]
+        for future in futures:
+            future.result()
+
+    tracking_order = store.get(17)
+
+    assert tracking_order.restaurants == {
+        SILPO: {"external_id": "silpo", "status": f"silpo-{points - 1}"},
+        KFC: {"external_id": "kfc", "status": f"kfc-{points - 1}"},
+    }
+    assert tracking_order.delivery["location"] == {"lat": points - 1, "lng": points - 1}
+    assert "history" not in tracking_order.delivery
+    assert len(LocationHistory().range(17)) == points
+
+
+def test_location_history_is_capped(fake_redis, settings):
+    settings.COURIER_LOCATION_HISTORY = {"MAX_POINTS": 10}
+    store = TrackingOrderStore()
+
+    for step in range(25):
+        store.append_location(17, {"lat": step, "lng": step, "timestamp": step})
+
+    history = LocationHistory().range(17)
+
+    assert [point["lat"] for point in history] == list(range(15, 25))
+    assert store.get(17).delivery == {"location": {"lat": 24, "lng": 24}}
+    assert fake_redis.ttl("orders:17:locations") > 0
+
+
+def test_location_history_is_downsampled(fake_redis, settings):
+    settings.COURIER_LOCATION_HISTORY = {"MIN_INTERVAL_SECONDS": 60}
+    store = TrackingOrderStore()
+
+    assert store.append_location(17, {"lat": 1, "lng": 1, "timestamp": 1})
+    assert not store.append_location(17, {"lat": 2, "lng": 2, "timestamp": 2})
+
+    assert len(LocationHistory().range(17)) == 1
+    assert store.get(17).delivery["location"] == {"lat": 2, "lng": 2}
+
+
+def test_location_history_time_range(fake_redis):
+    store = TrackingOrderStore()
+    store.append_location(17, {"lat": 1, "lng": 1, "timestamp": 1000})
+    store.append_location(17, {"lat": 2, "lng": 2, "timestamp": 1002})
+
+    history = LocationHistory()
+
+    assert [point["lat"] for point in history.range(17, since=1001)] == [2]
+    assert [point["lat"] for point in history.range(17, until=1001)] == [1]
+    assert history.range(18) == []
+
+
+def test_batch_is_downsampled_by_the_point_time(fake_redis, settings):
+    settings.COURIER_LOCATION_HISTORY = {"MIN_INTERVAL_SECONDS": 60}
+    store = TrackingOrderStore()
+
+    # applied at once, recorded a minute apart
+    stored = store.append_locations(
+        [(17, {"lat": step, "lng": step, "timestamp": 1000 + step * 30}) for step in range(5)]
+    )
+
+    assert stored == [True, False, True, False, True]
+    assert [point["lat"] for point in LocationHistory().range(17)] == [0, 2, 4]
+
+
+def test_late_point_is_dropped(fake_redis):
+    store = TrackingOrderStore()
+    store.append_location(17, {"lat": 2, "lng": 2, "timestamp": 2000})
+
+    assert not store.append_location(17, {"lat": 1, "lng": 1, "timestamp": 1000})
+    assert not store.append_location(17, {"lat": 2, "lng": 2, "timestamp": 2000})  # again
+
+    assert LocationHistory().range(17) == [{"lat": 2, "lng": 2, "timestamp": 2000}]
+    assert store.get(17).delivery["location"] == {"lat": 2, "lng": 2}
@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+
+from food.enums import OrderStatus
+from food.models import Order
+from food.tracking import TrackingOrder, TrackingOrderStore
+from food.transitions import transition_order, transition_orders, transition_restaurant
+from shared.cache import CacheService
+
+SILPO, KFC = "1", "2"
+
+
+def create_tracking_order(order_id: int, silpo: OrderStatus, kfc: OrderStatus):
+    TrackingOrderStore().create(
+        order_id=order_id,
+        tracking_order=TrackingOrder(
+            restaurants={
+                SILPO: {"external_id": "ext-1", "status": silpo},
+                KFC: {"external_id": "ext-2", "status": kfc},
+            }
+        ),
+    )
+
+
+def test_transition_rejected_when_status_has_changed(fake_redis):
+    create_tracking_order(17, silpo=OrderStatus.COOKED, kfc=OrderStatus.COOKING)
+
+    result = transition_restaurant(
+        17, SILPO, expected=OrderStatus.COOKING, new=OrderStatus.COOKED
+    )
+
+    assert not result.applied
+    assert not result.all_cooked
+
+
+def test_transition_sets_extra_fields(fake_redis):
+    create_tracking_order(17, silpo=OrderStatus.NOT_STARTED, kfc=OrderStatus.COOKING)
+
+    result = transition_restaurant(
+        17,
+        SILPO,
+        expected=OrderStatus.NOT_STARTED,
+        new=OrderStatus.COOKING,
+        external_id="ext-new",
+    )
+
+    assert result.applied
+    assert TrackingOrderStore().get(17).restaurants[SILPO] == {
+        "external_id": "ext-new",
+        "status": OrderStatus.COOKING,
+    }
+
+
+def test_only_last_restaurant_completes_the_order(fake_redis):
+    """Silpo and KFC finish at the same moment, exactly one of them wins."""
+
+    for order_id in range(50):
+        create_tracking_order(order_id, silpo=OrderStatus.COOKING, kfc=OrderStatus.COOKING)
+        barrier = Barrier(2)
+
+        def cook(restaurant_id: str):
+            cache = CacheService()
+            barrier.wait()
+            return transition_restaurant(
+                order_id,
+                restaurant_id,
+                expected=OrderStatus.COOKING,
+                new=OrderStatus.COOKED,
+                cache=cache,
+            )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(cook, (SILPO, KFC)))
+
+        assert all(result.applied for result in results)
+        assert [result.all_cooked for result in results].count(True) == 1
+
+
+@pytest.mark.django_db
+def test_transition_order(django_user_model):
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    order = Order.objects.create(user=user, eta="2030-01-01", status=OrderStatus.COOKING)
+
+    assert not transition_order(order.pk, expected=OrderStatus.NOT_STARTED, new=OrderStatus.COOKED)
+    assert transition_order(
+        order.pk,
+        expected=(OrderStatus.NOT_STARTED, OrderStatus.COOKING),
+        new=OrderStatus.COOKED,
+    )
+
+    order.refresh_from_db()
+    assert order.status == OrderStatus.COOKED
+
+
+@pytest.mark.django_db
+def test_transition_orders(django_user_model):
+    user = django_user_model.objects.create(email="john@email.com", phone_number="+3809611")
+    cooking, delivery = (
+        Order.objects.create(user=user, eta="2030-01-01", status=status)
+        for status in (OrderStatus.COOKING, OrderStatus.DELIVERY)
+    )
+
+    updated = transition_orders(
+        [cooking.pk, delivery.pk, 404],
+        expected=(OrderStatus.NOT_STARTED, OrderStatus.COOKING),
+        new=OrderStatus.COOKED,
+    )
+
+    assert updated == [cooking.pk]
+    assert dict(Order.objects.values_list("id", "status")) == {
+        cooking.pk: OrderStatus.COOKED,
+        delivery.pk: OrderStatus.DELIVERY,
+    }
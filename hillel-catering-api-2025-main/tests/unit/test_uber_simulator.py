@@ -0,0 +1,54 @@
+import asyncio
+import json
+
+import httpx
+
+from tests.providers.uber import DeliverySimulator, SimulatorConfig
+
+
+def test_simulator_posts_batched_locations():
+    batches: list[list[dict]] = []
+
+    def webhook(request: httpx.Request) -> httpx.Response:
+        batches.append(json.loads(request.content)["locations"])
+        return httpx.Response(200, json={"status": "ok"})
+
+    async def scenario():
+        simulator = DeliverySimulator(
+            SimulatorConfig(webhook_url="http://api/webhook/", batch_size=100, batch_interval=0.05),
+            client=httpx.AsyncClient(transport=httpx.MockTransport(webhook)),
+        )
+        for order_id in range(1000):
+            simulator.start(order_id, points=3, speed=50)
+
+        await asyncio.wait_for(
+            asyncio.gather(*(d.task for d in simulator.deliveries.values())), timeout=5
+        )
+        await simulator.aclose()
+
+        return simulator
+
+    simulator = asyncio.run(scenario())
+
+    points = [point for batch in batches for point in batch]
+    assert simulator.sent == len(points) == 3000
+    assert all(len(batch) <= 100 for batch in batches)
+    assert {d.status for d in simulator.deliveries.values()} == {"delivered"}
+    route = [p["timestamp"] for p in points if p["order_id"] == 7]
+    assert route == sorted(route) and len(route) == 3
+
+
+def test_stopped_delivery_sends_nothing_more():
+    async def scenario():
+        simulator = DeliverySimulator(
+            SimulatorConfig(webhook_url="http://api/webhook/"),
+            client=httpx.AsyncClient(transport=httpx.MockTransport(lambda _: httpx.Response(200))),
+        )
+        delivery = simulator.start(17, points=100, speed=1)
+        stopped = simulator.stop(17)
+        await asyncio.gather(delivery.task, return_exceptions=True)
+        await simulator.aclose()
+
+        return stopped, delivery.status, simulator.sent
+
+    assert asyncio.run(scenario()) == (True, "cancelled", 0)
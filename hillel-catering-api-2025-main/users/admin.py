@@ -5,4 +5,6 @@ from .models import User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    readonly_fields = ("id", "password", "last_login", "is_active")
\ No newline at end of file
+    readonly_fields = ("id", "password", "last_login", "is_active")
+    # the order user autocomplete (food.admin)
+    search_fields = ("email", "phone_number")
\ No newline at end of file
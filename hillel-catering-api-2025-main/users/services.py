@@ -38,12 +38,12 @@ class ActivationService:
 
         return None
 
-    def send_user_activation_email(self, activation_key: str):
+    def send_user_activation_email(self, activation_key: uuid.UUID | str):
         if self.email is None:
             raise ValueError(f"No email specified for user activation process")
 
         # SMTP Client Send Email Request
-        activation_link = f"https://frontend.catering.com/activation/{activation_key.strip()}"
+        activation_link = f"https://frontend.catering.com/activation/{activation_key}"
         
         send_activation_email.delay(
             email=self.email,
@@ -1,7 +1,11 @@
+import logging
+
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 @shared_task
 def send_activation_email(email: str, activation_link: str):
     subject = 'User Activation'
@@ -11,7 +15,7 @@ def send_activation_email(email: str, activation_link: str):
 
     try:
         send_mail(subject, message, from_email, recipient_list)
-        print(f"Activation email sent to {email}")
-    except Exception as e:
-        print(f"Failed to send activation email to {email}: {str(e)}")
+        logger.info("Activation email sent", extra={"email": email})
+    except Exception:
+        logger.exception("Activation email is not sent", extra={"email": email})
         raise
\ No newline at end of file
@@ -11,6 +11,8 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from django.conf import settings
+from shared.metrics import ViewMetricsMixin
+from shared.queries import query_budget
 from .models import User
 from .services import ActivationService
 from .tasks import send_activation_email
@@ -45,7 +47,7 @@ class UserActivationSerializer(serializers.Serializer):
     key = serializers.UUIDField()
 
 
-class UsersAPIViewSet(viewsets.GenericViewSet):
+class UsersAPIViewSet(ViewMetricsMixin, viewsets.GenericViewSet):
     authentication_classes = [JWTAuthentication]
 
     def get_permissions(self):
@@ -56,9 +58,11 @@ class UsersAPIViewSet(viewsets.GenericViewSet):
         else:
             return [permissions.IsAuthenticated()]
 
+    @query_budget(1)
     def list(self, request: Request):
         return Response(UserSerializer(request.user).data, status=200)
 
+    @query_budget(3)  # the unique email and phone number, the insert
     def create(self, request: Request):
         serializer = UserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -79,6 +83,7 @@ class UsersAPIViewSet(viewsets.GenericViewSet):
     
 
     @action(methods=["POST"], detail=False)
+    @query_budget(2)
     def activate(self, request: Request) -> Response:
         serializer = UserActivationSerializer(data=request.data)
         serializer.is_valid()